@@ -9,6 +9,8 @@ from evennia import Command as BaseCommand
 from evennia import create_object
 from evennia import default_cmds
 import random
+from world.dev.fatesheet import fate_sheet
+from world.nounindex import refresh
 
 
 class Command(BaseCommand):
@@ -456,3 +458,51 @@ class CmdAbilities(Command):
         str, agi, mag = self.caller.get_abilities()
         string = "STR: %s, AGI: %s, MAG: %s" % (str, agi, mag)
         self.caller.msg(string)
+
+
+class CmdSheet(Command):
+    """Show a Fate sheet
+    Usage:
+        +sheet
+        +sheet <character>
+
+    Displays your Fate sheet: aspects, skills, stunts, stress and
+    consequences.  Staff may look at anyone's sheet.
+    """
+    key = "+sheet"
+    aliases = ["sheet"]
+    lock = "cmd:all()"
+    help_category = "General"
+
+    def func(self):
+        """implements the functionality of CmdSheet"""
+        target = self.caller
+        if self.args.strip():
+            if not self.caller.check_permstring("Builder"):
+                self.caller.msg("You can only see your own sheet.")
+                return
+            target = self.caller.search(self.args.strip(), global_search=True)
+            if not target:
+                return
+        self.caller.msg(fate_sheet(target).render())
+
+
+class CmdName(default_cmds.CmdName):
+    __doc__ = default_cmds.CmdName.__doc__
+
+    def at_post_cmd(self):
+        """reindex the renamed object in its room's noun index"""
+        name = self.rhs.split(";")[0].strip() if self.rhs else ""
+        if name:
+            for obj in self.caller.search(name, quiet=True) or []:
+                refresh(obj)
+
+
+class CmdSetObjAlias(default_cmds.CmdSetObjAlias):
+    __doc__ = default_cmds.CmdSetObjAlias.__doc__
+
+    def at_post_cmd(self):
+        """reindex the object with its new aliases in its room's noun index"""
+        if self.lhs:
+            for obj in self.caller.search(self.lhs, quiet=True) or []:
+                refresh(obj)
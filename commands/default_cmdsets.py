@@ -18,6 +18,7 @@ from evennia import default_cmds
 from evennia import CmdSet
 from commands import command
 from commands import CmdAbilities
+from commands.command import CmdName, CmdSetObjAlias, CmdSheet
 from evennia.contrib.mail import CmdMail
 from world.jobs.cmdbuckets import CmdBuckets
 from world.jobs.cmdjobs import CmdJobs
@@ -41,6 +42,9 @@ class CharacterCmdSet(default_cmds.CharacterCmdSet):
         # any commands you add below will overload the default ones.
         #
         self.add(CmdAbilities())
+        self.add(CmdSheet())
+        self.add(CmdName())
+        self.add(CmdSetObjAlias())
         self.add(CmdMail())
         self.add(CmdBuckets())
         self.add(CmdJobs())
@@ -1,6 +1,8 @@
 from evennia import Command
 from evennia import CmdSet
 from evennia import default_cmds
+from world import combat
+from world import spatial
 
 class MechCmdSet(CmdSet):
     """
@@ -12,6 +14,7 @@ class MechCmdSet(CmdSet):
         "Called once, when cmdset is first created"
         #self.add(default_cmds.CharacterCmdSet)
         self.add(CmdShoot())
+        self.add(CmdScan())
         # self.add(CmdLaunch())
 
 class CmdShoot(Command):
@@ -21,26 +24,67 @@ class CmdShoot(Command):
     Usage:
         shoot [target]
 
-    This will fire your mech's main gun.  If no
-    target is given you will shoot in the air.
+    This will fire your mech's main gun at the end of the
+    combat round.  The target may be here or any mech in
+    range (see scan).  If no target is given you will shoot
+    in the air.
     """
     key = "shoot"
     aliases = ["fire", "fire!"]
 
     def func(self):
-        "This actually does the shooting"
+        "This declares the shot for the round"
 
         caller = self.caller
-        location = caller.location
 
         if not self.args:
             # no argument given to command - shoot in the air
-            message = "BOOM! The mech fires its gun in the air!"
-            location.msg_contents(message)
+            combat.declare(caller, "shoot")
+            caller.msg("You raise your gun. It fires at the end of the round.")
             return
 
         # We have an argument, search for target
-        target = caller.search(self.args)
+        candidates = [obj for obj in caller.location.contents if combat.can_target(caller, obj)] + \
+            [mech for dist, mech in spatial.in_range(caller, combat.WEAPON_RANGE)]
+        target = caller.search(self.args, candidates=candidates)
         if target:
-            message = "BOOM! The mech fires its gun at %s" % target.key
-            location.msg_contents(message)
+            combat.declare(caller, "shoot", target)
+            caller.msg("You take aim at %s. You fire at the end of the round." % target.key)
+
+
+class CmdScan(Command):
+    """
+    Scanning for other mechs
+
+    Usage:
+        scan [range]
+
+    Lists the mechs within range of yours, nearest first.
+    Without a range, your weapon range is used.
+    """
+    key = "scan"
+
+    def func(self):
+        "This lists the mechs in range"
+
+        caller = self.caller
+        radius = combat.WEAPON_RANGE
+        if self.args.strip():
+            try:
+                radius = float(self.args.strip())
+            except ValueError:
+                radius = None
+            if radius is None or radius != radius or not 0 <= radius <= spatial.MAX_SCAN_RANGE:
+                caller.msg("Usage: scan [range], a range from 0 to %s." % spatial.MAX_SCAN_RANGE)
+                return
+
+        if spatial.mech_grid().position(caller) is None:
+            caller.msg("Your scanner shows nothing: this area isn't on the map.")
+            return
+        found = spatial.in_range(caller, radius)
+        if not found:
+            caller.msg("No mechs within %g." % radius)
+            return
+        lines = ["Mechs within %g:" % radius]
+        lines += ["  %-20s %6.1f  %s" % (mech.key, dist, mech.location.key) for dist, mech in found]
+        caller.msg("\n".join(lines))
@@ -22,7 +22,9 @@ def at_server_start():
     This is called every time the server starts up, regardless of
     how it was shut down.
     """
-    pass
+    # runs after a reload too, so at_server_reload_start needn't repeat it
+    from world.jobs.warmup import warm_up
+    warm_up()
 
 
 def at_server_stop():
@@ -37,14 +39,20 @@ def at_server_reload_start():
     """
     This is called only when server starts back up after a reload.
     """
-    pass
+    # the cache warm-up started by at_server_start skips whatever is restored here
+    import world.jobs.jobindex
+    from world.utilities import snapshot
+    from evennia.utils import logger
+    loaded, stale = snapshot.restore()
+    logger.log_info("Snapshot --> restored %s, rebuilding %s" % (loaded, stale))
 
 
 def at_server_reload_stop():
     """
     This is called only time the server stops before a reload.
     """
-    pass
+    from world.utilities import snapshot
+    snapshot.save()
 
 
 def at_server_cold_start():
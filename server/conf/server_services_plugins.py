@@ -21,4 +21,6 @@ def start_plugin_services(server):
 
     server - a reference to the main server application.
     """
-    pass
+    # worker processes for +job/reports
+    from world.jobs.jobworkers import WORKER_POOL
+    WORKER_POOL.setServiceParent(server.services)
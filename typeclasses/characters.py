@@ -8,6 +8,26 @@ creation commands.
 
 """
 from evennia import DefaultCharacter
+from world.utilities.lrucache import LRUCache
+from world.statblock import STAT_ATTRIBUTE, STAT_DEFAULTS, stat_block
+from world.dev.fatesheet import fate_sheet
+
+# Rendered appearances, keyed (character id, looker class, (key, desc, combat_score, contents)).
+# See Character.return_appearance; appearance_cache_stats() gives the hit rate.
+APPEARANCE_CACHE = LRUCache(maxsize=1000)
+LOOKER_CLASSES = ("staff", "player", None)
+
+
+def looker_class(looker):
+    """The permission class an appearance is cached for: builders see dbrefs, players don't."""
+    if looker is None:
+        return None
+    return "staff" if looker.check_permstring("Builder") else "player"
+
+
+def appearance_cache_stats():
+    """Size and hit rate of the appearance cache, see LRUCache.stats()"""
+    return APPEARANCE_CACHE.stats()
 
 
 class Character(DefaultCharacter):
@@ -29,16 +49,32 @@ class Character(DefaultCharacter):
                     pre_logout_location Attribute and move it back on the grid.
     at_post_puppet - Echoes "AccountName has entered the game" to the room.
 
+    return_appearance is cached per character (and, if appearance_by_permission
+    is set, per looker permission class).  A cached text is only used while the
+    character's key, desc and combat_score, and the ids and keys of what it
+    carries, are what they were when it was rendered.  Carried items are part
+    of the key rather than cleared by the move hooks, as items created
+    straight into the inventory or renamed never pass through those.
+
     """
+    appearance_by_permission = True
     def at_object_creation(self):
         "This is called when object is first created, only."
-        self.db.strength = 5
-        self.db.agility = 4
-        self.db.magic = 2
+        self.attributes.add(STAT_ATTRIBUTE, STAT_DEFAULTS)
+
+    @property
+    def stats(self):
+        """The character's StatBlock (strength, agility, magic), see world.statblock"""
+        return stat_block(self)
+
+    @property
+    def fate(self):
+        """The character's FateSheet, see world.dev.fatesheet"""
+        return fate_sheet(self)
 
     def get_abilities(self):
         """Simple access method to return ability scores as a tuple (str, agi, mag,)"""
-        return self.db.strength, self.db.agility, self.db.magic
+        return tuple(self.stats)
 
 
     def return_appearance(self, looker):
@@ -46,6 +82,24 @@ class Character(DefaultCharacter):
         The return from this method is what
         looker sees when looking at this object.
         """
+        key = self._appearance_key(looker_class(looker) if self.appearance_by_permission else None)
+        text = APPEARANCE_CACHE.get(key)
+        if text is None:
+            text = APPEARANCE_CACHE.set(key, self._render_appearance(looker))
+        return text
+
+    def _appearance_key(self, cls):
+        # a new key, desc, combat score or carried item gives a new key, so stale texts are never found
+        contents = tuple((obj.id, obj.key) for obj in self.contents)
+        return self.id, cls, (self.key, self.db.desc, self.db.combat_score, contents)
+
+    def invalidate_appearance(self):
+        """Forget every cached appearance of this character."""
+        for cls in LOOKER_CLASSES:
+            APPEARANCE_CACHE.pop(self._appearance_key(cls))
+
+    def _render_appearance(self, looker):
+        """The appearance text, with the combat score after the first line."""
         text = super(Character, self).return_appearance(looker)
         cscore = " (combat score: %s)" % self.db.combat_score
         if "\n" in text:
@@ -2,6 +2,7 @@
 
 from objects import Object
 from commands.mechcommands import MechCmdSet
+from world import spatial
 
 class Mech(Object):
     """
@@ -12,3 +13,14 @@ class Mech(Object):
         self.cmdset.add_default(MechCmdSet)
         self.locks.add("puppet:all()")
         self.db.desc = "This is a huge mech.  It has missles and stuff."
+        spatial.mech_moved(self)
+
+    def at_after_move(self, source_location, *args, **kwargs):
+        "Keep the mech's map position up to date (see world.spatial)"
+        super(Mech, self).at_after_move(source_location, *args, **kwargs)
+        spatial.mech_moved(self)
+
+    def at_object_delete(self):
+        "Take the mech off the map"
+        spatial.mech_removed(self)
+        return super(Mech, self).at_object_delete()
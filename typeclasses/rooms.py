@@ -5,8 +5,13 @@ Rooms are simple containers that has no location of their own.
 
 """
 
+from twisted.internet import reactor
 from evennia import DefaultRoom
+from evennia.utils.utils import make_iter
 from commands.default_cmdsets import ChargenCmdset
+from world.nounindex import noun_index
+
+STRINGS = (str, type(u""))
 
 
 class Room(DefaultRoom):
@@ -18,8 +23,94 @@ class Room(DefaultRoom):
 
     See examples/object.py for a list of
     properties and methods available on all Objects.
+
+    Rooms keep a noun index of their contents for natural
+    language commands (see world.nounindex), updated here as
+    objects come and go.
+
+    A room can buffer its output: with buffer_output on (the
+    class default, or the buffer_output Attribute of one room),
+    the plain text messages sent with msg_contents within
+    output_latency seconds (the output_latency Attribute, if
+    set) are collected and each occupant gets them as one
+    packet.  Each message still goes only to the occupants it
+    would have reached at once, and in the order sent.  Messages
+    with a mapping, extra keyword arguments (options=...) or a
+    non-text payload are sent at once, after whatever is
+    already waiting.
     """
-    pass
+    buffer_output = False
+    output_latency = 0.1
+
+    def at_object_receive(self, moved_obj, source_location, *args, **kwargs):
+        "Index an object arriving in the room"
+        super(Room, self).at_object_receive(moved_obj, source_location, *args, **kwargs)
+        if self.ndb.noun_index is not None:
+            self.ndb.noun_index.add(moved_obj)
+
+    def at_object_leave(self, moved_obj, target_location, *args, **kwargs):
+        "Drop an object leaving the room from the index"
+        super(Room, self).at_object_leave(moved_obj, target_location, *args, **kwargs)
+        if self.ndb.noun_index is not None:
+            self.ndb.noun_index.remove(moved_obj)
+
+    def output_buffered(self):
+        "True if this room buffers msg_contents"
+        flag = self.db.buffer_output
+        return self.buffer_output if flag is None else bool(flag)
+
+    def msg_contents(self, text=None, exclude=None, from_obj=None, mapping=None, **kwargs):
+        "Send text to the room's contents, or buffer it if the room buffers output"
+        if not self.output_buffered() or mapping or kwargs or not isinstance(text, STRINGS):
+            self.flush_output()
+            return super(Room, self).msg_contents(text, exclude=exclude, from_obj=from_obj,
+                                                  mapping=mapping, **kwargs)
+        exclude = make_iter(exclude) if exclude else []
+        queue = self.ndb.output_queue
+        if queue is None:
+            queue = self.ndb.output_queue = {}
+        for obj in self.contents:
+            if obj in exclude:
+                continue
+            packets = queue.setdefault(obj.id, (obj, []))[1]
+            if packets and packets[-1][0] == from_obj:
+                packets[-1][1].append(text)
+            else:
+                packets.append((from_obj, [text]))
+        if self.ndb.output_flush is None:
+            latency = self.db.output_latency
+            self.ndb.output_flush = reactor.callLater(self.output_latency if latency is None else latency,
+                                                      self.flush_output)
+
+    def flush_output(self):
+        """
+        Send every buffered message now, one packet per occupant (more
+        only if the messages came from different senders).
+
+        :return: number of packets sent
+        """
+        call = self.ndb.output_flush
+        if call is not None and call.active():
+            call.cancel()
+        self.ndb.output_flush = None
+        queue = self.ndb.output_queue
+        self.ndb.output_queue = None
+        sent = 0
+        for obj, packets in (queue or {}).values():
+            for from_obj, texts in packets:
+                obj.msg(text="\n".join(texts), from_obj=from_obj)
+                sent += 1
+        return sent
+
+    def at_server_reload(self):
+        "Don't lose buffered output on a reload"
+        self.flush_output()
+        super(Room, self).at_server_reload()
+
+    def at_server_shutdown(self):
+        "Don't lose buffered output on a shutdown"
+        self.flush_output()
+        super(Room, self).at_server_shutdown()
 
 class ChargenRoom(Room):
     """
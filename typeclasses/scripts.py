@@ -12,7 +12,9 @@ just overloads its hooks to have it perform its function.
 
 """
 
+from collections import OrderedDict
 from evennia import DefaultScript
+from world import combat
 
 
 class Script(DefaultScript):
@@ -89,3 +91,43 @@ class Script(DefaultScript):
 
     """
     pass
+
+
+class Battle(Script):
+    """
+    The fight going on in a room; see world.combat.
+
+    Actions are declared with declare() and kept (in ndb) until the end of
+    the round, when at_repeat resolves them all at once.
+    """
+    def at_script_creation(self):
+        self.key = combat.BATTLE_KEY
+        self.desc = "Combat rounds"
+        self.interval = combat.ROUND_SECONDS
+        self.start_delay = True
+        self.persistent = True
+        self.db.round = 0
+        self.db.idle = 0
+
+    def at_start(self):
+        if self.ndb.actions is None:
+            self.ndb.actions = OrderedDict()
+
+    def declare(self, action):
+        """Declare an action for this round, replacing the actor's earlier one."""
+        if self.ndb.actions is None:
+            self.ndb.actions = OrderedDict()
+        self.ndb.actions.pop(action.actor.id, None)
+        self.ndb.actions[action.actor.id] = action
+
+    def at_repeat(self):
+        actions = list(self.ndb.actions.values()) if self.ndb.actions else []
+        self.ndb.actions = OrderedDict()
+        if not actions:
+            self.db.idle += 1
+            if self.db.idle >= combat.IDLE_ROUNDS:
+                self.stop()
+            return
+        self.db.idle = 0
+        self.db.round += 1
+        combat.run_round(self.obj, self.db.round, actions)
@@ -1,3 +1,117 @@
+"""
+Natural language command parsing
+
+NaturalCommand splits "put the red apple in the box" into articles, nouns and a preposition.  The grammar for a
+preposition list is compiled once and shared by every command class using that list (see grammar()).
+"""
+import re
+from collections import namedtuple
+from commands.command import Command
+from world.nounindex import noun_index, resolve_sentence
+
+ARTICLES = ("the", "an", "a")
+
+# The parts of a sentence, None where a part is missing
+Sentence = namedtuple("Sentence", ("article1", "noun1", "preposition", "article2", "noun2"))
+NO_SENTENCE = Sentence(None, None, None, None, None)
+
+
+class Grammar(object):
+    """
+    The compiled sentence regex for one preposition list.
+
+    Prepositions are tried longest first, so that "on top of" is found rather than "on".  first_words holds the first
+    word of every preposition: a sentence none of whose words is in it can't contain a preposition, and is split
+    without running the prepositional regex at all.
+    """
+
+    def __init__(self, prepositions):
+        ordered = sorted(set(prepositions), key=lambda prep: (-len(prep), prep))
+        self.prepositions = tuple(prepositions)
+        self.first_words = frozenset(prep.split()[0] for prep in ordered)
+        self.regex = re.compile(r"^\s?\b(?P<article1>the|an|a)?\b\s?(?P<noun1>.*?\w+)\s?\b(?P<preposition>" +
+                                r"|".join(re.escape(prep) for prep in ordered) +
+                                r")\b\s?\b(?P<article2>the|an|a)?\b\s+(?P<noun2>.*?\w+)$")
+
+    def parse(self, args):
+        """
+        Split args (already lower case) into a Sentence, or None if they don't form one.
+        """
+        words = args.split()
+        if not words:
+            return None
+        if not self.first_words.isdisjoint(words):
+            match = self.regex.match(args)
+            if match:
+                return Sentence(*match.group("article1", "noun1", "preposition", "article2", "noun2"))
+        return self.parse_plain(words, args)
+
+    @staticmethod
+    def parse_plain(words, args):
+        """
+        Split a sentence without a preposition: an optional article and a noun ending in a word character.
+        """
+        last = args.rstrip()[-1]
+        if not (last.isalnum() or last == "_"):
+            return None
+        if words[0] in ARTICLES and len(words) > 1:
+            return Sentence(words[0], args.strip()[len(words[0]):].strip(), None, None, None)
+        return Sentence(None, args.strip(), None, None, None)
+
+
+GRAMMARS = {}
+
+
+def grammar(prepositions):
+    """
+    The Grammar for a preposition list, compiled on first use.
+    """
+    key = tuple(prepositions)
+    ret = GRAMMARS.get(key)
+    if ret is None:
+        ret = GRAMMARS[key] = Grammar(key)
+    return ret
+
+
+def parse_sentence(args, prepositions):
+    """
+    Split args into a Sentence (NO_SENTENCE if they don't form one).
+    """
+    return grammar(prepositions).parse((args or "").lower()) or NO_SENTENCE
+
+
+def parse_batch(commands, prepositions=None, location=None):
+    """
+    Parse many argument strings at once, e.g. a tick's worth of NPC commands.
+
+    The grammar is looked up once for the whole batch and a string repeated within the batch is only parsed once.
+    With a location, both nouns of every sentence are also matched against that location's noun index (built at
+    most once), giving for each string a tuple (sentence, noun1 ids, noun2 ids), the ids as tuples of object ids (None
+    for a noun the sentence doesn't have).
+
+    :param commands: iterable of argument strings
+    :param prepositions: preposition list shared by the batch (default: NaturalCommand.prepositions)
+    :param location: optional room to resolve nouns in
+    :return: list of Sentence, or of (Sentence, ids, ids) with a location, in the order given
+    """
+    compiled = grammar(prepositions or NaturalCommand.prepositions)
+    index = noun_index(location) if location is not None else None
+    seen = {}
+    ret = []
+    for args in commands:
+        args = (args or "").lower()
+        parsed = seen.get(args)
+        if parsed is None:
+            parsed = compiled.parse(args) or NO_SENTENCE
+            if index is not None:
+                parsed = (parsed,
+                          tuple(sorted(index.match(parsed.noun1))) if parsed.noun1 else None,
+                          tuple(sorted(index.match(parsed.noun2))) if parsed.noun2 else None)
+            seen[args] = parsed
+        ret.append(parsed)
+    return ret
+
+
 class NaturalCommand(Command):
     """
     A command that may be specified with with a preposition, e.g. put apple in box.  The regular expression is designed
@@ -16,18 +130,20 @@ class NaturalCommand(Command):
         article2 = The article (if any) following the preposition
         noun2 = The noun following the preposition
 
-    In the even that there is no preposition, the first regex fails and no sentence group is created.  This is tested
-    and if self.sentence is None, a second regex is tried which excludes the preposition criteria.  All sentence groups
-    are defined by the end, even if None, so that the command function can test for their presence (or absence) when
-    applying grammatical rules (such as resolved nouns being the same, or no second noun being defined).
+    In the event that there is no preposition (none of the words starts one, or the prepositional regex fails), the
+    sentence is split into an optional article and a noun only.  self.sentence holds all five groups as a Sentence
+    tuple, and every group is also set as an attribute, even if None, so that the command function can test for their
+    presence (or absence) when applying grammatical rules (such as resolved nouns being the same, or no second noun
+    being defined).  Arguments that don't form a sentence at all leave every group None.
 
-    Nouns need to be resolved to objects via the self.caller.search() function, in order for the command to apply to
-    objects.  The parser simply finds references to objects, not the objects themselves.
+    Nouns need to be resolved to objects in order for the command to apply to objects.  The parser simply finds
+    references to objects, not the objects themselves; self.resolve() matches both nouns (and their adjectives)
+    against the noun index of the caller's room in one pass, see world.nounindex.
     """
 
     # This is the default preposition list
     prepositions = ["above", "after", "against", "along", "around", "as", "at", "before", "behind", "below",
-                    "beneath", "beside", "between", "by", "close to", "down", "except", "excluding", "for"
+                    "beneath", "beside", "between", "by", "close to", "down", "except", "excluding", "for",
                     "from", "in", "inside", "into", "near", "near to", "next to", "of", "off", "on", "onto",
                     "on to", "opposite", "outside", "over", "on top of", "out of", "past", "round", "than",
                     "through", "till", "to", "touching", "toward", "towards", "together with", "under",
@@ -36,43 +152,43 @@ class NaturalCommand(Command):
 
     def parse(self):
 
-        # This sets the sentence components to none
-        self.article1 = None
-        self.noun1 = None
-        self.preposition = None
-        self.article2 = None
-        self.noun2 = None
+        # Split the sentence with the grammar compiled for this class's prepositions.  Every component is set, to None
+        # if it isn't in the sentence.
+        self.sentence = parse_sentence(self.args, self.prepositions)
+        self.article1, self.noun1, self.preposition, self.article2, self.noun2 = self.sentence
+
+    def resolve(self):
+        """
+        The objects noun1 and noun2 refer to, as a tuple of two lists (None for a noun the sentence doesn't have).
+        """
+        return resolve_sentence(self.caller, self.sentence)
+
 
-        # This is the prepositional regex
+def benchmark(number=20000):
+    """
+    Parses per second of parse_sentence() against building and matching the regex on every parse, as parse() did.
+    """
+    from timeit import timeit
+    prepositions = NaturalCommand.prepositions
+    samples = ["the red apple", "put the apple in the box", "sword", "climb on top of the old wall",
+               "an apple from the tree"]
+
+    def old_parse(args):
         regex = r"^\s?\b(?P<article1>the|an|a)?\b\s?(?P<noun1>.*?\w+)\s?\b(?P<preposition>" + \
-                r"|".join(self.prepositions) + r")\b\s?\b(?P<article2>the|an|a)?\b\s+(?P<noun2>.*?\w+)$"
-        self.sentence = re.match(regex, self.args.lower())
-
-        if not self.sentence:
-            # This is the non-prepositional regex
-            regex =  r"^\s?\b(?P<article1>the|an|a)?\b\s?(?P<noun1>.*?\w+)$"
-            self.sentence = re.match(regex, self.args.lower())
-
-        # Sentence components are set by attempting to set each group in turn.  If any group doesn't exist, an
-        # IndexError exception is raised and the nex group is tried.  I'd rather change this out for a less "cludgy"
-        # solution, but just now I can't find how to iterate the group titles, only the values.
-        try:
-            self.article1 = self.sentence.group("article1")
-        except IndexError:
-            pass
-        try:
-            self.noun1 = self.sentence.group("noun1")
-        except IndexError:
-            pass
-        try:
-            self.preposition = self.sentence.group("preposition")
-        except IndexError:
-            pass
-        try:
-            self.article2 = self.sentence.group("article2")
-        except IndexError:
-            pass
-        try:
-            self.noun2 = self.sentence.group("noun2")
-        except IndexError:
-            pass
\ No newline at end of file
+                r"|".join(prepositions) + r")\b\s?\b(?P<article2>the|an|a)?\b\s+(?P<noun2>.*?\w+)$"
+        sentence = re.match(regex, args.lower())
+        if not sentence:
+            regex = r"^\s?\b(?P<article1>the|an|a)?\b\s?(?P<noun1>.*?\w+)$"
+            sentence = re.match(regex, args.lower())
+        return sentence
+
+    old = timeit(lambda: [old_parse(args) for args in samples], number=number)
+    new = timeit(lambda: [parse_sentence(args, prepositions) for args in samples], number=number)
+    batch = timeit(lambda: parse_batch(samples, prepositions), number=number)
+    parses = number * len(samples)
+    return {"regex per parse": parses / old, "compiled grammar": parses / new, "parse_batch": parses / batch}
+
+
+if __name__ == "__main__":
+    for name, rate in sorted(benchmark().items()):
+        print("%-18s %10.0f parses/s" % (name, rate))
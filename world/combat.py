@@ -0,0 +1,195 @@
+"""
+Combat rounds
+
+Fighting happens in rounds.  Commands like shoot don't act at once; they declare an action with the Battle script
+of the room, which is created by the first declaration and runs a round every ROUND_SECONDS:
+
+    declare(caller, "shoot", target)
+
+At the end of a round every declared action is resolved in one pass.  The stat blocks of everyone involved are
+loaded together, all the Fate dice for the round are rolled in one batch (attacker and defender both roll 4dF plus
+their ATTACK_STAT / DEFEND_STAT), the damage dealt is written in one transaction, and everyone in the room gets one
+message with the whole round in it, plus a line about their own damage.
+
+Targets don't have to share the room: anything on the map (see world.spatial) within WEAPON_RANGE can be shot at,
+and hears about the round too.
+
+An actor declaring again in the same round replaces their earlier action.  A battle with nothing declared for
+IDLE_ROUNDS rounds stops.
+"""
+from collections import namedtuple, OrderedDict
+from django.db import transaction
+from evennia import create_script
+from world import spatial
+from world.dev import fate
+from world.statblock import load_stat_blocks
+from world.utilities.prefetch import prefetch_attributes
+
+BATTLE_KEY = "battle"
+BATTLE_TYPECLASS = "typeclasses.scripts.Battle"
+ROUND_SECONDS = 6
+IDLE_ROUNDS = 3
+ATTACK_STAT = "agility"
+DEFEND_STAT = "agility"
+DAMAGE_ATTRIBUTE = "damage"
+WEAPON_RANGE = 20    # map units, see world.spatial
+# what can be shot at: characters and mechs, never exits, items or the shooter
+TARGET_TYPECLASSES = ("typeclasses.characters.Character", spatial.MECH_TYPECLASS)
+
+# an action declared for the next round; target is None for a shot in the air
+Action = namedtuple("Action", ("actor", "verb", "target"))
+# attack and defend are (total, ladder name), shifts is attack minus defence; all None if there was no roll
+Result = namedtuple("Result", ("action", "attack", "defend", "shifts"))
+
+
+def battle(location, create=True):
+    """
+    The Battle script running in location.
+
+    :param create: start one if there is none
+    :return: Battle, or None
+    """
+    found = location.scripts.get(BATTLE_KEY)
+    if found:
+        return found[0]
+    if not create:
+        return None
+    return create_script(BATTLE_TYPECLASS, key=BATTLE_KEY, obj=location)
+
+
+def declare(actor, verb, target=None):
+    """
+    Declare actor's action for the next round of the battle in actor's location.
+
+    :return: the Battle
+    """
+    if target is not None and not can_target(actor, target):
+        raise ValueError("%s can't be shot at" % target.key)
+    ret = battle(actor.location)
+    ret.declare(Action(actor, verb, target))
+    return ret
+
+
+def can_target(actor, obj):
+    """True if actor may shoot at obj"""
+    return obj is not None and obj != actor and \
+        any(obj.is_typeclass(path, exact=False) for path in TARGET_TYPECLASSES)
+
+
+def _stat_blocks(objs):
+    """the stat blocks of objs, loading those not in memory with one query"""
+    ret = dict((obj.id, obj.ndb.stat_block) for obj in objs if obj.ndb.stat_block is not None)
+    missing = [obj for obj in objs if obj.id not in ret]
+    if missing:
+        ret.update(load_stat_blocks(missing))
+    return ret
+
+
+def _in_reach(action, location):
+    """True if action has a target that is still in location, or on the map within WEAPON_RANGE"""
+    if not can_target(action.actor, action.target):
+        return False
+    if action.target.location == location:
+        return True
+    dist = spatial.distance(action.actor, action.target)
+    return dist is not None and dist <= WEAPON_RANGE
+
+
+def resolve(location, actions):
+    """
+    Resolve a round of actions in one pass.
+
+    :param actions: Actions, in the order they were declared
+    :return: list of Results; actions by actors no longer in location are dropped
+    """
+    actions = [action for action in actions if action.actor.location == location]
+    aimed = [action for action in actions if _in_reach(action, location)]
+    objs = OrderedDict()
+    for action in aimed:
+        objs[action.actor.id] = action.actor
+        objs[action.target.id] = action.target
+    blocks = _stat_blocks(list(objs.values()))
+    # attack and defence ratings side by side, so the whole round is one batch of dice
+    ratings = []
+    for action in aimed:
+        ratings += [blocks[action.actor.id][ATTACK_STAT], blocks[action.target.id][DEFEND_STAT]]
+    rolls = iter(fate.roll_for(ratings))
+    ret = []
+    for action in actions:
+        if _in_reach(action, location):
+            attack, defend = next(rolls), next(rolls)
+            ret.append(Result(action, attack, defend, attack[0] - defend[0]))
+        else:
+            ret.append(Result(action, None, None, None))
+    return ret
+
+
+def apply(results):
+    """
+    Write the damage of a round in one transaction.
+
+    :return: {target id: (damage this round, damage in all)}
+    """
+    taken = OrderedDict()
+    targets = {}
+    for result in results:
+        if result.shifts is not None and result.shifts > 0:
+            target = result.action.target
+            targets[target.id] = target
+            taken[target.id] = taken.get(target.id, 0) + result.shifts
+    if not taken:
+        return {}
+    loaded = prefetch_attributes(list(targets.values()), (DAMAGE_ATTRIBUTE,))
+    ret = {}
+    with transaction.atomic():
+        for objid, damage in taken.items():
+            total = (loaded[objid].get(DAMAGE_ATTRIBUTE) or 0) + damage
+            targets[objid].attributes.add(DAMAGE_ATTRIBUTE, total)
+            ret[objid] = (damage, total)
+    return ret
+
+
+def _describe(result):
+    action = result.action
+    actor = action.actor.key
+    if action.target is None:
+        return "BOOM! %s fires into the air!" % actor
+    if result.shifts is None:
+        return "%s fires at %s, but %s is gone." % (actor, action.target.key, action.target.key)
+    line = "BOOM! %s fires at %s: %s (%+d) against %s (%+d)" % (
+        actor, action.target.key, result.attack[1].title(), result.attack[0],
+        result.defend[1].title(), result.defend[0])
+    if result.shifts > 0:
+        return line + ", a hit for %s!" % result.shifts
+    return line + ", a miss."
+
+
+def report(number, results, damage):
+    """
+    The text of a round.
+
+    :return: (lines for everyone, {target id: line for that target only})
+    """
+    lines = ["Round %s:" % number] + [_describe(result) for result in results]
+    own = dict((objid, "You take %s damage this round (%s in all)." % pair) for objid, pair in damage.items())
+    return lines, own
+
+
+def run_round(location, number, actions):
+    """
+    Resolve, apply and announce one round.
+
+    :return: list of Results
+    """
+    results = resolve(location, actions)
+    damage = apply(results)
+    lines, own = report(number, results, damage)
+    text = "\n".join(lines)
+    for obj in location.contents:
+        obj.msg(text + "\n" + own[obj.id] if obj.id in own else text)
+    # targets in other rooms, shot at from range
+    away = dict((result.action.target.id, result.action.target) for result in results
+                if result.shifts is not None and result.action.target.location != location)
+    for objid, obj in away.items():
+        obj.msg(text + "\n" + own[objid] if objid in own else text)
+    return results
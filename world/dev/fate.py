@@ -49,6 +49,138 @@ ladder = {"legendary":"8",
           "terrible":"-3"}
 
 
+"""
+********************************************************************************
+                                  Dice engine
+
+Fate dice (4dF): four dice showing -1, 0 or +1, summed.  One roll is drawn as a
+single number from 0 to 80 (the 81 equally likely faces of four three-sided
+dice) and looked up in ROLL_TABLE, so a batch of rolls is one batch of draws.
+NumPy is used for big batches if it is installed.
+
+LADDER_NAMES maps any total to the ladder rung at or below it, and ODDS holds
+the exact chances of every outcome, so neither needs working out per roll.
+********************************************************************************
+"""
+import random
+from collections import namedtuple
+from itertools import product
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+FUDGE_DICE = 4
+FACES = 3 ** FUDGE_DICE
+# sum of the dice for each of the 81 equally likely faces
+ROLL_TABLE = tuple(sum(dice) for dice in product((-1, 0, 1), repeat=FUDGE_DICE))
+# number of faces giving each sum, -4 .. +4
+ROLL_COUNTS = dict((total, ROLL_TABLE.count(total)) for total in range(-FUDGE_DICE, FUDGE_DICE + 1))
+
+# ladder as numbers, and every total from far below to far above it as a rung name
+LADDER_VALUES = dict((name, int(value)) for name, value in ladder.items())
+LADDER_MIN = min(LADDER_VALUES.values())
+LADDER_MAX = max(LADDER_VALUES.values())
+LADDER_NAMES = {}
+for _total in range(LADDER_MIN - FUDGE_DICE * 2, LADDER_MAX + FUDGE_DICE * 2 + 1):
+    _at_or_below = [(value, name) for name, value in LADDER_VALUES.items() if value <= _total]
+    LADDER_NAMES[_total] = max(_at_or_below)[1] if _at_or_below else min(
+        (value, name) for name, value in LADDER_VALUES.items())[1]
+del _total, _at_or_below
+
+NUMPY_BATCH = 64    # batches at least this big use NumPy, when it is installed
+_numpy_rng = numpy.random.default_rng() if numpy is not None and hasattr(numpy.random, "default_rng") else None
+
+Odds = namedtuple("Odds", ("fail", "tie", "succeed", "style"))
+
+
+def _odds(shift):
+    """exact odds for a roll needing to reach shift (difficulty - skill)"""
+    def chance(test):
+        return sum(count for total, count in ROLL_COUNTS.items() if test(total)) / float(FACES)
+    return Odds(chance(lambda total: total < shift),
+                chance(lambda total: total == shift),
+                chance(lambda total: shift < total < shift + 3),
+                chance(lambda total: total >= shift + 3))
+
+
+# every shift from sure success to sure failure; beyond these the odds don't change
+ODDS = dict((shift, _odds(shift)) for shift in range(-FUDGE_DICE - 3, FUDGE_DICE + 2))
+
+
+def odds(skill, difficulty):
+    """
+    Chances of failing, tying, succeeding and succeeding with style.
+
+    :param skill: rating (int or ladder name)
+    :param difficulty: opposition (int or ladder name)
+    :return: Odds(fail, tie, succeed, style), fractions adding up to 1
+    """
+    shift = rating(difficulty) - rating(skill)
+    return ODDS[min(max(shift, -FUDGE_DICE - 3), FUDGE_DICE + 1)]
+
+
+def rating(value):
+    """a ladder name or number as a number"""
+    if isinstance(value, int):
+        return value
+    return LADDER_VALUES[value.lower()] if value.lower() in LADDER_VALUES else int(value)
+
+
+def ladder_name(total):
+    """the ladder rung for a total"""
+    if total in LADDER_NAMES:
+        return LADDER_NAMES[total]
+    return LADDER_NAMES[LADDER_MAX] if total > LADDER_MAX else LADDER_NAMES[LADDER_MIN]
+
+
+def roll(count=1):
+    """
+    Roll 4dF count times.
+
+    :return: list of dice totals, -4 .. +4
+    """
+    if _numpy_rng is not None and count >= NUMPY_BATCH:
+        return numpy.asarray(ROLL_TABLE)[_numpy_rng.integers(0, FACES, size=count)].tolist()
+    table = ROLL_TABLE
+    draw = random.randrange
+    return [table[draw(FACES)] for _ in range(count)]
+
+
+def roll_for(ratings):
+    """
+    Roll for many actors at once.
+
+    :param ratings: skill ratings (ints or ladder names), one per actor
+    :return: list of (total, ladder name), one per actor
+    """
+    ratings = [rating(value) for value in ratings]
+    return [(total, ladder_name(total)) for total in map(sum, zip(ratings, roll(len(ratings))))]
+
+
+def outcome(total, difficulty):
+    """'fail', 'tie', 'succeed' or 'style' for a total against a difficulty"""
+    shifts = total - rating(difficulty)
+    if shifts < 0:
+        return "fail"
+    if shifts == 0:
+        return "tie"
+    return "style" if shifts >= 3 else "succeed"
+
+
+def benchmark(count=10000):
+    """
+    Time a batch of rolls and an odds lookup.
+
+    :return: {name: seconds per roll or lookup}
+    """
+    from timeit import timeit
+    ret = {"roll_for, batch of %s" % count: timeit(lambda: roll_for([2] * count), number=10) / (10 * count),
+           "odds": timeit(lambda: odds(3, "great"), number=count) / count}
+    return ret
+
+
 """
 ________________________________________________________________________________
 ________________________________________________________________________________
@@ -97,3 +229,9 @@ fate.fractal = {"aspects":[],
 
         special effects*
 ********************************************************************************
+"""
+
+
+if __name__ == "__main__":
+    for name, seconds in sorted(benchmark().items()):
+        print("%-28s %.3f us" % (name, seconds * 1e6))
@@ -0,0 +1,339 @@
+"""
+********************************************************************************
+Fate character sheets
+
+A sheet holds the sections of fate.fractal - aspects, skills, stunts, stress
+tracks and consequences - for one character, in one Attribute ("fate") as one
+compact record:
+
+    (FORMAT, aspects, skills, stunts, stress tracks, consequences)
+
+    aspects, stunts:    tuples of strings
+    skills:             tuple of (name, rating) pairs
+    stress tracks:      tuple of (name, boxes, marked) - marked is a bitset,
+                        bit 0 for box 1
+    consequences:       tuple of (severity, text) pairs
+
+Sections are only unpacked when something asks for them, so a roll that only
+needs a skill never builds the aspect or stress lists, and saving writes the
+sections nobody touched back exactly as they were read.
+
+Skill names are interned and given a slot number the first time any sheet uses
+them; a sheet's ratings are an array of ladder values indexed by slot, so
+looking up a skill is a dict lookup and an array index, not a scan.
+
+    sheet = fate_sheet(character)
+    sheet.skill("athletics")          -> 3
+    sheet.set_skill("Athletics", "great")
+    sheet.mark_stress("physical", 2)  -> True if box 2 was free
+    sheet.render()                    -> +sheet text, cached until a change
+********************************************************************************
+"""
+import sys
+from array import array
+from world.dev import fate
+
+try:
+    intern = sys.intern
+except AttributeError:
+    intern = intern
+
+FATE_ATTRIBUTE = "fate"
+FORMAT = 1
+# the sections of fate.fractal, in record order
+SECTIONS = ("aspects", "skills", "stunts", "stress tracks", "consequences")
+CONSEQUENCES = (("mild", 2), ("moderate", 4), ("severe", 6))
+CONSEQUENCE_SHIFTS = dict(CONSEQUENCES)
+RATING_TYPECODE = "b"   # signed 8 bit, the ladder runs -3 .. 8
+UNRATED = -128
+WIDTH = 80
+
+# every skill name any sheet has used: lower case name -> slot, and slot -> name as written
+SKILL_SLOTS = {}
+SKILL_NAMES = []
+
+
+def skill_slot(name):
+    """the slot of a skill name, giving it one if it's new"""
+    key = intern(name.strip().lower())
+    slot = SKILL_SLOTS.get(key)
+    if slot is None:
+        slot = SKILL_SLOTS[key] = len(SKILL_NAMES)
+        SKILL_NAMES.append(intern(name.strip()))
+    return slot
+
+
+class StressTrack(object):
+    """
+    A row of stress boxes, the marked ones kept as bits of one int.
+    """
+    __slots__ = ("name", "boxes", "marked")
+
+    def __init__(self, name, boxes, marked=0):
+        self.name = intern(name)
+        self.boxes = int(boxes)
+        self.marked = int(marked) & ((1 << self.boxes) - 1)
+
+    def is_marked(self, box):
+        return bool(self.marked >> (box - 1) & 1)
+
+    def mark(self, box):
+        """Mark box (1 based); returns False if it was already marked or doesn't exist."""
+        if not 1 <= box <= self.boxes or self.is_marked(box):
+            return False
+        self.marked |= 1 << (box - 1)
+        return True
+
+    def first_free(self, shifts=1):
+        """the lowest free box that can take shifts, or None"""
+        for box in range(shifts, self.boxes + 1):
+            if not self.is_marked(box):
+                return box
+        return None
+
+    def clear(self):
+        self.marked = 0
+
+    def record(self):
+        return self.name, self.boxes, self.marked
+
+    def render(self):
+        return "%-12s %s" % (self.name.title() + ":",
+                             " ".join("[%s]" % ("X" if self.is_marked(box) else box)
+                                      for box in range(1, self.boxes + 1)))
+
+
+def _unpack(section, raw):
+    """a record section as the sheet works with it"""
+    if section == "skills":
+        ratings = array(RATING_TYPECODE)
+        for name, value in raw:
+            slot = skill_slot(name)
+            if slot >= len(ratings):
+                ratings.extend([UNRATED] * (slot + 1 - len(ratings)))
+            ratings[slot] = fate.rating(value)
+        return ratings
+    if section == "stress tracks":
+        return [StressTrack(*track) for track in raw]
+    if section == "consequences":
+        return dict(raw)
+    return [intern(text) if section == "stunts" else text for text in raw]
+
+
+def _pack(section, value):
+    """a section back into its record form"""
+    if section == "skills":
+        return tuple((SKILL_NAMES[slot], rating) for slot, rating in enumerate(value) if rating != UNRATED)
+    if section == "stress tracks":
+        return tuple(track.record() for track in value)
+    if section == "consequences":
+        return tuple((severity, value[severity]) for severity, _ in CONSEQUENCES if severity in value)
+    return tuple(value)
+
+
+class FateSheet(object):
+    """
+    The Fate sheet of one character.
+    """
+    __slots__ = ("obj", "raw", "sections", "view", "stored")
+
+    def __init__(self, obj, record=None):
+        self.obj = obj
+        self.stored = record   # the Attribute value this sheet was read from or last saved as
+        record = record or (FORMAT,) + ((),) * len(SECTIONS)
+        if record[0] != FORMAT:
+            raise ValueError("unknown fate sheet format %r" % (record[0],))
+        self.raw = dict(zip(SECTIONS, record[1:]))
+        self.sections = {}
+        self.view = None
+
+    @classmethod
+    def from_fractal(cls, obj, data):
+        """
+        A sheet from a dict shaped like fate.fractal.
+
+        :param data: {"aspects": [...], "skills": [(name, rating), ...], "stunts": [...],
+                      "stress tracks": [(name, boxes), ...], "consequences": [(severity, text), ...]}
+        """
+        return cls(obj, (FORMAT,) + tuple(tuple(data.get(section) or ()) for section in SECTIONS))
+
+    def section(self, name):
+        """a section, unpacked from the record on first use"""
+        value = self.sections.get(name)
+        if value is None:
+            value = self.sections[name] = _unpack(name, self.raw[name])
+        return value
+
+    def record(self):
+        """the sheet as one record, reusing the sections that were never unpacked"""
+        return (FORMAT,) + tuple(_pack(name, self.sections[name]) if name in self.sections else self.raw[name]
+                                 for name in SECTIONS)
+
+    def as_fractal(self):
+        """the sheet as a dict shaped like fate.fractal"""
+        return dict((name, list(packed)) for name, packed in zip(SECTIONS, self.record()[1:]))
+
+    def changed(self):
+        """Save the sheet and drop its rendered view."""
+        self.view = None
+        self.stored = self.record()
+        self.obj.attributes.add(FATE_ATTRIBUTE, self.stored)
+
+    # aspects and stunts
+
+    @property
+    def aspects(self):
+        return tuple(self.section("aspects"))
+
+    @property
+    def stunts(self):
+        return tuple(self.section("stunts"))
+
+    def add_aspect(self, text):
+        self.section("aspects").append(text)
+        self.changed()
+
+    def remove_aspect(self, text):
+        """Remove an aspect; returns False if the sheet didn't have it."""
+        return self._remove("aspects", text)
+
+    def add_stunt(self, text):
+        self.section("stunts").append(intern(text))
+        self.changed()
+
+    def remove_stunt(self, text):
+        return self._remove("stunts", text)
+
+    def _remove(self, section, text):
+        texts = self.section(section)
+        if text not in texts:
+            return False
+        texts.remove(text)
+        self.changed()
+        return True
+
+    # skills
+
+    def skill(self, name, default=0):
+        """a skill's rating, default if the sheet doesn't have it"""
+        ratings = self.section("skills")
+        slot = SKILL_SLOTS.get(name.strip().lower())
+        if slot is None or slot >= len(ratings) or ratings[slot] == UNRATED:
+            return default
+        return ratings[slot]
+
+    def skills(self):
+        """[(name, rating)], best first"""
+        ratings = self.section("skills")
+        ret = [(SKILL_NAMES[slot], rating) for slot, rating in enumerate(ratings) if rating != UNRATED]
+        ret.sort(key=lambda pair: (-pair[1], pair[0]))
+        return ret
+
+    def set_skill(self, name, rating):
+        """
+        Rate a skill.
+
+        :param rating: int or ladder name on the ladder; None removes the skill
+        """
+        value = UNRATED if rating is None else fate.rating(rating)
+        if rating is not None and not fate.LADDER_MIN <= value <= fate.LADDER_MAX:
+            raise ValueError("skill ratings run from %+d to %+d" % (fate.LADDER_MIN, fate.LADDER_MAX))
+        slot = skill_slot(name)
+        ratings = self.section("skills")
+        if slot >= len(ratings):
+            ratings.extend([UNRATED] * (slot + 1 - len(ratings)))
+        ratings[slot] = value
+        self.changed()
+
+    # stress and consequences
+
+    def stress_track(self, name):
+        """the stress track called name, or None"""
+        name = name.lower()
+        for track in self.section("stress tracks"):
+            if track.name.lower() == name:
+                return track
+        return None
+
+    def set_stress_track(self, name, boxes):
+        """Add a stress track, or change its number of boxes."""
+        track = self.stress_track(name)
+        if track is None:
+            self.section("stress tracks").append(StressTrack(name, boxes))
+        else:
+            track.boxes = int(boxes)
+            track.marked &= (1 << track.boxes) - 1
+        self.changed()
+
+    def mark_stress(self, name, box):
+        """Mark a stress box; returns False if there's no such track or box, or it was already marked."""
+        track = self.stress_track(name)
+        if track is None or not track.mark(box):
+            return False
+        self.changed()
+        return True
+
+    def clear_stress(self, name=None):
+        """Clear one stress track, or all of them."""
+        for track in self.section("stress tracks"):
+            if name is None or track.name.lower() == name.lower():
+                track.clear()
+        self.changed()
+
+    def consequence(self, severity):
+        return self.section("consequences").get(severity)
+
+    def set_consequence(self, severity, text):
+        """
+        Take or recover from a consequence.
+
+        :param severity: mild, moderate or severe
+        :param text: the consequence's aspect; None clears it
+        """
+        if severity not in CONSEQUENCE_SHIFTS:
+            raise ValueError("consequences are %s" % ", ".join(name for name, _ in CONSEQUENCES))
+        consequences = self.section("consequences")
+        if text is None:
+            consequences.pop(severity, None)
+        else:
+            consequences[severity] = text
+        self.changed()
+
+    # +sheet
+
+    def render(self):
+        """the +sheet text, rebuilt only after the sheet changes or the character is renamed"""
+        if self.view is None or self.view[0] != self.obj.key:
+            self.view = (self.obj.key, self._render())
+        return self.view[1]
+
+    def _render(self):
+        rule = "_" * WIDTH
+        lines = ["=" * 10, "Fate sheet: %s" % self.obj.key, "=" * 10]
+        lines += [rule, "Aspects", rule]
+        lines += ["  %s" % aspect for aspect in self.aspects] or ["  None."]
+        lines += [rule, "Skills", rule]
+        lines += ["  %-10s (%+d) %s" % (fate.ladder_name(rating).title(), rating, name)
+                  for name, rating in self.skills()] or ["  None."]
+        lines += [rule, "Stunts", rule]
+        lines += ["  %s" % stunt for stunt in self.stunts] or ["  None."]
+        lines += [rule, "Stress", rule]
+        lines += ["  %s" % track.render() for track in self.section("stress tracks")] or ["  None."]
+        lines += ["-" * 10, "Consequences", "-" * 10]
+        lines += [("  %-9s (%d) %s" % (severity.title() + ":", shifts, self.consequence(severity) or "")).rstrip()
+                  for severity, shifts in CONSEQUENCES]
+        return "\n".join(lines)
+
+
+def fate_sheet(obj):
+    """
+    The FateSheet of obj, read on first use and then kept in obj.ndb.
+
+    The kept sheet is read again if the Attribute no longer holds what it was read from or saved as, e.g. after an
+    @set.
+    """
+    record = obj.attributes.get(FATE_ATTRIBUTE)
+    sheet = obj.ndb.fate_sheet
+    if sheet is None or sheet.stored != record:
+        sheet = obj.ndb.fate_sheet = FateSheet(obj, record)
+    return sheet
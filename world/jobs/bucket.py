@@ -2,9 +2,10 @@
 import evennia as ev
 import jobs_settings as settings
 from evennia.utils import lazy_property
-from evennia.utils import logger as log
 from typeclasses.channels import Channel
 import jobutils as ju
+import jobevents as events
+from jobindex import BUCKET_NAMES
 import world.utilities.pegasus_utilities as pegasus
 
 VALID_BUCKET_SETTINGS = settings.VALID_BUCKET_SETTINGS
@@ -83,16 +84,14 @@ class Bucket(Channel):
 
                 # create the bucket
                 self.bucket = ev.create_channel(bucket, desc=desc, typeclass=Bucket)
+                BUCKET_NAMES.invalidate()
             # Bad juju beyond
             except Exception as e:
-                # build the stack for trace
-                time = log.timeformat()
                 code = ERROR_PRE
                 sysmsg = "Unexpected error of type: {0}, Arguments: {1}".format(type(e).__name__, e.args)
-                stack = time + "-->" + code + sysmsg
 
                 #log
-                log.log_trace(stack)
+                events.failed("bucket create", e, msg=bucket)
 
                 # Reraise the error
                 raise
@@ -133,6 +132,11 @@ class Bucket(Channel):
                self.db.resolution_time,]
         return ret
 
+    def invalidate_view(self):
+        """drop this object's cached view; call after changing its attributes"""
+        import jobcache
+        jobcache.invalidate(self.id)
+
     def monitoring(self, obj):
         """Tracks those monitoring a bucket."""
         # self.monitors = self.
@@ -179,6 +183,7 @@ class Bucket(Channel):
         else:
             attr = "self.db." + VALID_BUCKET_SETTINGS[setting]
             exec("%s = '%s'" % (attr, str(value).capitalize()))
+        self.invalidate_view()
 
     @lazy_property
     def _total_jobs(self):
@@ -55,6 +55,9 @@ from evennia import default_cmds
 from evennia.utils import evtable
 import jobutils as ju
 import jobs_settings as settings
+from jobcache import get_view, get_views
+from jobindex import BUCKET_NAMES
+from world.utilities.muxparse import split_pair
 from world.jobs.bucket import Bucket
 
 MuxCommand = default_cmds.MuxCommand
@@ -257,13 +260,14 @@ class CmdBuckets(MuxCommand):
 
         # populate the table.
         if isinstance(buckets, list):
-            for bucket in buckets:
-                if self.caller in bucket.db.per_player_actions or self._pass_lock(self.caller):
-                    info = bucket.info()
+            admin = self._pass_lock(self.caller)
+            for view in get_views(buckets):
+                if admin or self.caller in (view.db.per_player_actions or ()):
+                    info = view.info()
                     ret.add_row(*info)
             self.caller.msg(ret)
         else:
-            info = buckets.info()
+            info = get_view(buckets).info()
             ret.add_row(*info)
             self.caller.msg(ret)
 
@@ -349,6 +353,8 @@ class CmdBuckets(MuxCommand):
             self.bucket = ev.create_channel(self.bucket_name, desc=self.rhs, typeclass=Bucket)
             # self._assign_bucket(self.bucket_name)
             self.bucket.db.createdby = self.caller
+            self.bucket.invalidate_view()
+            BUCKET_NAMES.invalidate()
             self.caller.msg(SUCC_PRE + "Bucket: %s has been created." % decorate(self.bucket_name))
 
     def _delete(self):
@@ -358,6 +364,7 @@ class CmdBuckets(MuxCommand):
                 # Todo: check bucket for jobs first
                 self.caller.msg(SUCC_PRE + "Bucket: %s deleted." % decorate(self.bucket_name))
                 ev.search_channel(self.bucket_name).first().delete()
+                BUCKET_NAMES.invalidate()
             else:
                 self.caller.msg(ERROR_PRE + "Cannot delete Bucket: %s, jobs are associated with that bucket"
                                 % decorate(self.bucket_name))
@@ -394,18 +401,17 @@ class CmdBuckets(MuxCommand):
             self.caller.msg(ERROR_PRE + "Bucket: %s already exists." % decorate(newname))
         else:
             self.bucket.key = newname
+            self.bucket.invalidate_view()
+            BUCKET_NAMES.invalidate()
             self.caller.msg(SUCC_PRE + "Bucket: %s renamed to %s." % decorate(self.bucket, newname))
 
     def _parse(self, side):
-        """parses side for /"""
-        if side == self.rhs:
-            side = self.rhs
-        else:
-            side = self.lhs
-        if '/' in side:
-            ret = side.split('/')
-        else:
+        """parses side for / (target and text are both side if it has none)"""
+        target, text = split_pair(side)
+        if text is False:
             ret = [side, side]
+        else:
+            ret = [target, text]
         return ret
 
     def _parse_right(self):
@@ -2,6 +2,8 @@
 
 import random
 from datetime import datetime as date
+from functools import reduce
+from django.db.models import Q
 import evennia as ev
 from evennia import default_cmds
 from evennia.utils import evtable
@@ -12,8 +14,17 @@ from jobs_settings import ERROR_PRE
 from jobs_settings import SORT_DIRECTION
 from jobs_settings import SORT_METHOD
 from jobs_settings import VALID_SORT_METHODS
+import jobcache
+import joblog
+import jobworkers
+import jobevents
+from jobcache import get_views
+from jobmail import queue_mail
+from jobscripts import job_cleaner
+from jobindex import PRIORITY_RANKS, SORT_DIRECTIONS, TOMBSTONE_CATEGORY, due_key, job_index, parse_sortby
 from world.jobs.job import Job
 from world.jobs.bucket import Bucket
+from world.utilities import dateparse
 from world.utilities import pegasus_utilities as pegasus
 
 MuxCommand = default_cmds.MuxCommand
@@ -223,11 +234,13 @@ class CmdJobs(MuxCommand):
         """approve hook, return message"""
         ret = {}
         job = self.job
-        msg = self.rhs
-        title = self.job.db.title,
+        body = self.rhs
+        title = self.job.db.title
         creator = self.job.db.createdby
         header = "Your job %s has been approved by %s." % decorate(title, self.caller)
         self._mail(creator, header, body)
+        exit_status = SUCC_PRE
+        msg = "Job %s approved." % decorate(title)
         # package message for decorator
         act = "apr"
         ret[msg] = {"act": act, "actlist": self.job.db.actions_list, "caller": self.caller, "stat": exit_status, "msg": msg}
@@ -261,13 +274,43 @@ class CmdJobs(MuxCommand):
         return ret
 
     def _clean(self):
-        """ job/checkout <#>
+        """
+        job/clean                       : start a pass, or show its progress
+        job/clean <batch>[/<interval>]  : change the pace of the running pass
+        job/clean stop                  : stop the running pass
         Remove non-players from job data
 
+        The work is done in the background by the JobCleaner script (see
+        world.jobs.jobscripts), so it is safe to run on a live game.
+
         :param self:
         :return:
         """
         ret = {}
+        exit_status = SUCC_PRE
+        arg = self.lhs_obj or self.lhs
+        cleaner = job_cleaner()
+        if not arg:
+            if cleaner:
+                checked, total, fixed, batch_size, interval = cleaner.progress()
+                msg = "Cleaning: %s of %s checked, %s references removed (%s every %ss)." \
+                      % decorate(checked, total, fixed, batch_size, interval)
+            else:
+                job_cleaner(start=True)
+                msg = "Cleaning job data in the background. +job/clean shows progress."
+        elif not cleaner:
+            exit_status = ERROR_PRE
+            msg = "No clean is running. Use +job/clean to start one."
+        elif arg.lower() == "stop":
+            cleaner.stop()
+            msg = "Cleaning stopped."
+        elif arg.isdigit() and (not self.lhs_act or self.lhs_act.isdigit()):
+            interval = int(self.lhs_act) if self.lhs_act else None
+            cleaner.throttle(batch_size=int(arg), interval=interval)
+            msg = "Cleaning %s every %ss." % decorate(arg, interval or cleaner.interval)
+        else:
+            exit_status = ERROR_PRE
+            msg = "The syntax is +job/clean [<batch>[/<interval>]|stop]"
         ret[msg] = {"caller": self.caller, "stat": exit_status, "msg": msg}
         return ret
 
@@ -381,78 +424,120 @@ class CmdJobs(MuxCommand):
         return ret
 
     @actupdate
-    def _delete(self, jobid):
+    def _delete(self):
         """
         job/delete <#>
         deletes a job
 
+        The job is tombstoned: it disappears from every listing at once and can
+        be undeleted with +job/trans until the compactor purges it.
+
         :param self:
-        :param jobid:
         :return:
         """
         ret = {}
         act = "del"
+        title = self.job.db.title
+        if self.job.is_deleted:
+            exit_status = ERROR_PRE
+            msg = "Job %s is already deleted." % decorate(title)
+        else:
+            self.job.tombstone(self.caller)
+            exit_status = SUCC_PRE
+            msg = "Job %s deleted. Use +job/trans to undelete it." % decorate(title)
         ret[msg] = {"act": act, "actlist": self.job.db.actions_list, "caller": self.caller, "stat": exit_status, "msg": msg}
         return ret
 
     @actupdate
-    def _deny(self, jobid, comment):
+    def _deny(self):
         """
         job/deny <#>=<comment>
         Denies a job with comment
 
         :param self:
-        :param jobid:
-        :param comment:
         :return:
         """
         ret = {}
         act = "dny"
+        title = self.job.db.title
+        header = "Your job %s has been denied by %s." % decorate(title, self.caller)
+        self._mail(self.job.db.createdby, header, self.rhs)
+        exit_status = SUCC_PRE
+        msg = "Job %s denied." % decorate(title)
         ret[msg] = {"act": act, "actlist": self.job.db.actions_list, "caller": self.caller, "stat": exit_status, "msg": msg}
         return ret
 
     @actupdate
-    def _due(self, jobid, date=None):
+    def _due(self):
         """
         job/due <#>=<<date>|none>
-        Sets a due date on a job
+        Sets a due date on a job.  <date> may be absolute (2018-04-10, 4/10,
+        April 10) or relative (3 days, next friday); see world.utilities.dateparse
         """
         ret = {}
         act = "due"
+        string = self.rhs or ""
+        due = False if dateparse.is_never(string) else dateparse.parse_date(string)
+        if due is None:
+            exit_status = ERROR_PRE
+            msg = "%s is not a date I understand." % decorate(string)
+        else:
+            self.job.db.due = due
+            self.job.update_sortkeys()
+            exit_status = SUCC_PRE
+            if due:
+                msg = "Job %s is due %s." % decorate(self.job.db.title, due.strftime("%B %d, %Y at %H:%M"))
+            else:
+                msg = "Job %s no longer has a due date." % decorate(self.job.db.title)
         ret[msg] = {"act": act, "actlist": self.job.db.actions_list, "caller": self.caller, "stat": exit_status, "msg": msg}
         return ret
 
     @actupdate
-    def _edit(self, jobid, entryid, old, new):
+    def _edit(self):
         """
         job/edit <#>/<entry #>=<old>/<new>
         Edits a specific entry on a job
 
+        The previous text is kept as a compact revision (see world.jobs.revisions).
+
         :param self:
-        :param jobid:
-        :param entryid:
-        :param old:
-        :param new:
         :return:
         """
         ret = {}
         act = "edt"
+        entry, old, new = self.lhs_act, self.rhs_obj, self.rhs_act
+        if not (entry and old):
+            exit_status = ERROR_PRE
+            msg = "The syntax is +job/edit <#>/<entry #>=<old>/<new>"
+        elif self.job.edit_message(entry, old, new or ""):
+            exit_status = SUCC_PRE
+            msg = "Entry %s on job %s edited." % decorate(entry, self.job.db.title)
+        else:
+            exit_status = ERROR_PRE
+            msg = "Entry %s on job %s doesn't contain %s." % decorate(entry, self.job.db.title, old)
         ret[msg] = {"act": act, "actlist": self.job.db.actions_list, "caller": self.caller, "stat": exit_status, "msg": msg}
         return ret
 
     @actupdate
-    def _esc(self, jobid, priority):
+    def _esc(self):
         """
         job/esc <#>=<green|yellow|red>
         Sets the priority of a job
 
         :param self:
-        :param jobid:
-        :param priority:
         :return:
         """
         ret = {}
         act = "sta"
+        priority = (self.rhs or "").lower()
+        if priority in PRIORITY_RANKS:
+            self.job.db.priority = priority
+            self.job.update_sortkeys()
+            exit_status = SUCC_PRE
+            msg = "Job %s escalated to %s." % decorate(self.job.db.title, priority)
+        else:
+            exit_status = ERROR_PRE
+            msg = "Priority must be one of: %s" % ", ".join(decorate(*sorted(PRIORITY_RANKS)))
         ret[msg] = {"act": act, "actlist": self.job.db.actions_list, "caller": self.caller, "stat": exit_status, "msg": msg}
         return ret
 
@@ -462,18 +547,16 @@ class CmdJobs(MuxCommand):
         and sorting direction.  If the attribute does not exist, it returns the default
         sortby method and direction.
 
+        The parsed preference is cached on character.ndb.jsort for the rest of the
+        session so listings don't re-read and re-parse the attribute.
+
         :param character: the object db.jsort is pulled from
         :return: (method, direction)
         """
-        # Todo: fix return
-        sort = character.db.jsort
-        if sort:
-            method, direction = sort.split(':')
-            return (method, direction)
-        else:
-            ret = (SORT_METHOD, SORT_DIRECTION)
-        ret = {}
-        ret[msg] = {"caller": self.caller, "stat": exit_status, "msg": msg}
+        ret = character.ndb.jsort
+        if ret is None:
+            ret = parse_sortby(character.db.jsort, (SORT_METHOD, SORT_DIRECTION))
+            character.ndb.jsort = ret
         return ret
 
     def _help(self, jobid):
@@ -501,6 +584,8 @@ class CmdJobs(MuxCommand):
         :return:
         """
         ret = {}
+        exit_status = SUCC_PRE
+        msg = self.table(body=self._sorted_jobs(**kwargs))
         ret[msg] = {"caller": self.caller, "stat": exit_status, "msg": msg}
         return ret
 
@@ -553,33 +638,58 @@ class CmdJobs(MuxCommand):
         return ret
 
     @actupdate
-    def _log(self, jobid):
+    def _log(self):
         """
         job/log <#>
         Logs a particular job - want to add email functionality to this.
 
+        The export runs in the background (see world.jobs.joblog); the caller
+        is messaged with the file and its size once it has been written.
+
         :param self:
-        :param jobid:
         :return:
         """
         ret = {}
         act = "log"
+        caller = self.caller
+        title = self.job.db.title
+
+        def _done(result):
+            path, size = result
+            caller.msg(SUCC_PRE + "Job %s logged to %s (%s bytes)." % decorate(title, path, size))
+
+        def _failed(failure):
+            caller.msg(ERROR_PRE + "Logging job %s failed: %s" % decorate(title, failure.getErrorMessage()))
+
+        joblog.export_job(self.job).addCallbacks(_done, _failed)
+        exit_status = SUCC_PRE
+        msg = "Logging job %s in the background." % decorate(title)
         ret[msg] = {"act": act, "actlist": self.job.db.actions_list, "caller": self.caller, "stat": exit_status, "msg": msg}
         return ret
 
     @actupdate
-    def _mail(self, creator, header, body):
+    def _mail(self, recipients=None, header=None, body=None):
         """
         job/mail <#>=<message>
         Sends mail to the jobs source(s)
 
+        Mail is queued (see world.jobs.jobmail) and delivered in bulk a moment
+        later, so /approve, /deny and /query never write mail inline.
+
         :param self:
-        :param jobid:
-        :param message:
+        :param recipients: character or list of characters (default: job source)
+        :param header: mail subject (default: the job's title)
+        :param body: mail text (default: self.rhs)
         :return:
         """
         ret = {}
         act = "mai"
+        recipients = recipients or self.job.db.createdby
+        header = header or "Job: %s" % self.job.db.title
+        body = body or self.rhs
+        queued = queue_mail(self.caller, recipients, header, body)
+        exit_status = SUCC_PRE
+        msg = "Mail queued for %s recipient(s)." % queued
         ret[msg] = {"act": act, "actlist": self.job.db.actions_list, "caller": self.caller, "stat": exit_status, "msg": msg}
         return ret
 
@@ -604,10 +714,23 @@ class CmdJobs(MuxCommand):
         job/overdue
         Displays only a list of overdue jobs
 
+        Overdue jobs are the front of the date index (every key below now), and
+        the days-overdue column is computed for the whole list in one pass.
+
         :param self:
         :return:
         """
         ret = {}
+        exit_status = SUCC_PRE
+        now = date.now()
+        ids = job_index().scan_range("date", high=due_key(now))
+        found = dict((job.id, job) for job in Job.objects.filter(id__in=ids))
+        jobs = [found[jobid] for jobid in ids if jobid in found]
+        views = get_views(jobs)
+        overdue = dateparse.days_past_all([view.db.due for view in views], now=now)
+        head = self.DefaultTable().head + ("Days over",)
+        body = [view.info() + (days,) for view, days in zip(views, overdue)]
+        msg = self.table(head=head, body=body)
         ret[msg] = {"caller": self.caller, "stat": exit_status, "msg": msg}
         return ret
 
@@ -620,6 +743,8 @@ class CmdJobs(MuxCommand):
         :return:
         """
         ret = {}
+        exit_status = SUCC_PRE
+        msg = self.table(body=self._sorted_jobs(method="priority", direction="asc"))
         ret[msg] = {"caller": self.caller, "stat": exit_status, "msg": msg}
         return ret
 
@@ -640,21 +765,36 @@ class CmdJobs(MuxCommand):
         ret[msg] = {"act": act, "actlist": self.job.db.actions_list, "caller": self.caller, "stat": exit_status, "msg": msg}
         return ret
 
-    @actupdate
-    def _query(self, player_list, title, query):
+    def _query(self):
         """
         +job/query <players>/<title>=<query>
         Sends a query to <players>
 
+        <players> is a comma or space separated list of character names.  The
+        names are resolved in one query and the mail goes out as one batch.
+
         :param self:
-        :param player_list:
-        :param title:
-        :param query:
         :return:
         """
         ret = {}
-        act = "qry"
-        ret[msg] = {"act": act, "actlist": self.job.db.actions_list, "caller": self.caller, "stat": exit_status, "msg": msg}
+        if not (self.lhs_obj and self.lhs_act and self.rhs):
+            msg = "The syntax is +job/query <players>/<title>=<query>"
+            ret[msg] = {"caller": self.caller, "stat": ERROR_PRE, "msg": msg}
+            return ret
+        names = set(name.lower() for name in self.lhs_obj.replace(",", " ").split())
+        keys = reduce(lambda q, name: q | Q(db_key__iexact=name), names, Q(pk__in=[]))
+        players = [char for char in ev.ObjectDB.objects.filter(keys) if ju.ischaracter(char)]
+        found = set(char.key.lower() for char in players)
+        queue_mail(self.caller, players, self.lhs_act, self.rhs)
+        if found == names:
+            exit_status = SUCC_PRE
+            msg = "Query %s sent to %s player(s)." % (decorate(self.lhs_act)[0], len(players))
+        else:
+            exit_status = ERROR_PRE
+            msg = "Query %s sent to %s player(s); not found: %s" % (decorate(self.lhs_act)[0], len(players),
+                                                                 ", ".join(sorted(names - found)))
+        # a query isn't about any one job, so there is no actions list to add to
+        ret[msg] = {"caller": self.caller, "stat": exit_status, "msg": msg}
         return ret
 
     @actupdate
@@ -673,16 +813,58 @@ class CmdJobs(MuxCommand):
         ret[msg] = {"act": act, "actlist": self.job.db.actions_list, "caller": self.caller, "stat": exit_status, "msg": msg}
         return ret
 
-    def _reports(self, report=None):
+    def _reports(self):
         """
         +job/reports [<report>]
         Get a report
 
+        Reports:
+            cache   - size and hit rate of the job view cache
+            summary - open jobs per bucket by status, overdue and unassigned
+            events  - the most recent job events; +job/reports events=<n>
+                      shows n of them, +job/reports events=errors only errors
+
+        Reports that read every job run in a worker process (see
+        world.jobs.jobworkers) and are sent to the caller when ready.
+
         :param self:
-        :param report:
         :return:
         """
         ret = {}
+        report = (self.lhs or "").lower()
+        caller = self.caller
+        table = self.table
+        if report == "cache":
+            exit_status = SUCC_PRE
+            stats = jobcache.stats()
+            msg = "View cache: %s of %s entries, %s hits, %s misses (%.1f%% hit rate)." % (
+                stats["size"], stats["maxsize"], stats["hits"], stats["misses"], stats["hit_rate"] * 100)
+        elif report == "events":
+            exit_status = SUCC_PRE
+            arg = (self.rhs or "").strip().lower()
+            level = "error" if arg == "errors" else None
+            count = int(arg) if arg.isdigit() else 20
+            head = ("Time", "Level", "Action", "Job", "Actor", "Secs", "Detail")
+            body = [(event.time.strftime("%m/%d %H:%M:%S"), event.level, event.action, event.job or "",
+                     event.actor or "", "%.3f" % event.duration if event.duration is not None else "",
+                     event.error or event.msg or "") for event in jobevents.tail(count, level=level)]
+            msg = self.table(head=head, body=body) if body else "No job events recorded."
+        elif report == "summary":
+            def _done(rows):
+                head = ("Bucket", "Open", "Status", "Overdue", "Unassigned")
+                body = [(bucket, total, ", ".join("%s: %s" % item for item in sorted(statuses.items())),
+                         overdue, unassigned) for bucket, total, statuses, overdue, unassigned in rows]
+                caller.msg(table(head=head, body=body) if body else SUCC_PRE + "There are no open jobs.")
+
+            def _failed(failure):
+                caller.msg(ERROR_PRE + "Report %s failed: %s" % decorate(report, failure.getErrorMessage()))
+
+            jobworkers.run_task("summary").addCallbacks(_done, _failed)
+            exit_status = SUCC_PRE
+            msg = "Building report %s in the background." % decorate(report)
+        else:
+            exit_status = ERROR_PRE
+            msg = "Valid reports are: %s" % ", ".join(decorate("cache", "events", "summary"))
         ret[msg] = {"caller": self.caller, "stat": exit_status, "msg": msg}
         return ret
 
@@ -736,7 +918,7 @@ class CmdJobs(MuxCommand):
 
         Alpha    - Sorts alphabetically by bucket
         Date     - Sorts by date due
-        Priorty  - Sorts by priorty
+        Priority - Sorts by priority
 
             /asc - sorts ascending
             /des - sorts descending (default)
@@ -745,28 +927,33 @@ class CmdJobs(MuxCommand):
         :param sorttype:
         :return:
         """
-        # Todo: fix ret
         # Sortby and Direction
+        exit_status = SUCC_PRE
         if self.lhs_obj and self.lhs_act:
             sortby = self.lhs_obj
             direction = self.lhs_act
             sortby = sortby.lower()
             direction = direction.lower()
 
-            if sortby in VALID_SORT_METHODS and direction in ("asc", "des"):
+            if sortby in VALID_SORT_METHODS and direction in SORT_DIRECTIONS:
                 self.caller.db.jsort=sortby + ":" + direction
-                ret = SUCC_PRE + "Sortby method set to %s, %s" % (decorate(sortby), 'descending' if direction == 'des' else 'ascending')
+                self.caller.ndb.jsort = (sortby, direction)
+                msg = "Sortby method set to %s, %s" % (decorate(sortby)[0], 'descending' if direction == 'des' else 'ascending')
             else:
-                ret = ERROR_PRE + "Method must be one of: %s Direction must be 'asc' or 'des' or left blank." % decorate(VALID_SORT_METHODS)
+                exit_status = ERROR_PRE
+                msg = "Method must be one of: %s Direction must be 'asc' or 'des' or left blank." % ", ".join(decorate(*VALID_SORT_METHODS))
         # Sortby only
         elif self.lhs:
-            sortby = self.lhs_obj
-            sortby = sortby.lower()
+            sortby = self.lhs.lower()
             if sortby in VALID_SORT_METHODS:
                 self.caller.db.jsort=sortby + ":" + "des"
-                ret = SUCC_PRE + "Sortby method set to %s, descending" % sortby
+                self.caller.ndb.jsort = (sortby, "des")
+                msg = "Sortby method set to %s, descending" % decorate(sortby)
+            else:
+                exit_status = ERROR_PRE
+                msg = "Method must be one of: %s" % ", ".join(decorate(*VALID_SORT_METHODS))
         else:
-            ret = self.get_sortby(self.caller)
+            msg = "Sortby method is %s, %s" % decorate(*self.get_sortby(self.caller))
         ret = {}
         ret[msg] = {"caller": self.caller, "stat": exit_status, "msg": msg}
         return ret
@@ -833,18 +1020,33 @@ class CmdJobs(MuxCommand):
         return ret
 
     @actupdate
-    def _trans(self, jobid, bucket):
+    def _trans(self):
         """
         +job/trans <#>=<bucket>
         Transfer (or undelete) a job
 
         :param self:
-        :param jobid:
-        :param bucket:
         :return:
         """
         ret = {}
         act = "trn"
+        bucket = (self.rhs or "").capitalize()
+        job = self.job
+        if not ju.isbucket(bucket):
+            exit_status = ERROR_PRE
+            msg = "{0} is an invalid bucket.".format(decorate(bucket)[0])
+        else:
+            undeleted = job.is_deleted
+            job.tags.remove(str(job.db.bucket), category="jobs")
+            job.tags.add(bucket, category="jobs")
+            job.db.bucket = bucket
+            if undeleted:
+                job.restore()
+            else:
+                job.update_sortkeys()
+            exit_status = SUCC_PRE
+            msg = "Job %s %s to %s." % (decorate(job.db.title)[0], "undeleted" if undeleted else "transferred",
+                                        decorate(bucket)[0])
         ret[msg] = {"act": act, "actlist": self.job.db.actions_list, "caller": self.caller, "stat": exit_status, "msg": msg}
         return ret
 
@@ -912,12 +1114,11 @@ class CmdJobs(MuxCommand):
         # No switch, no args
         if self.switches or self.args:
             if self.switches:
+                self.lhs_obj = self.lhs_act = self.rhs_obj = self.rhs_act = False
                 if self.args:
                     passargs = ju.argparse(self.lhs, self.rhs)
                     if passargs:
                         self.lhs_obj, self.lhs_act, self.rhs_obj, self.rhs_act = passargs
-                    else:
-                        self.lhs_obj = self.lhs_act = self.rhs_obj = self.rhs_act = False
                 output = self._action_handler(self.switches[0])
                 return output
         # +job(s) This part should just display the list of available buckets.
@@ -977,8 +1178,33 @@ class CmdJobs(MuxCommand):
         except AttributeError:
             character = self.caller
         jobs = ev.Msg.objects.get_by_tag(category="jobs").filter(db_receivers_objects=character)
+        # messages of soft-deleted jobs stay until the compactor purges them, but are never listed
+        deleted = ["job:%s" % key.lower() for key in
+                   Job.objects.filter(db_tags__db_category=TOMBSTONE_CATEGORY).values_list("db_key", flat=True)]
+        if deleted:
+            hidden = ev.Msg.objects.filter(db_tags__db_key__in=deleted, db_tags__db_category="jobs")
+            jobs = jobs.exclude(id__in=hidden.values("id"))
         return jobs
 
+    def _sorted_jobs(self, method=None, direction=None, start=0, count=None, allowed=None):
+        """
+        Return jobs in listing order, served from the sort index.  method and
+        direction default to the caller's sortby preference.
+
+        :param method: one of VALID_SORT_METHODS
+        :param direction: 'asc' or 'des'
+        :param start: number of jobs to skip
+        :param count: page size, None for every job
+        :param allowed: optional set of job ids the caller may see
+        :return: list of Job
+        """
+        pref_method, pref_direction = self.get_sortby(self.caller)
+        method = method or pref_method
+        direction = direction or pref_direction
+        ids = job_index().scan(method, direction, start=start, count=count, allowed=allowed)
+        found = dict((job.id, job) for job in Job.objects.filter(id__in=ids))
+        return [found[jobid] for jobid in ids if jobid in found]
+
     def _add_msg(self, *kwargs):
         """add message to job"""
         try:
@@ -991,7 +1217,7 @@ class CmdJobs(MuxCommand):
 
             msgheader = '%s, %s, %s, %s' % (self.caller, date.today().strftime("%B %d, %Y"), title,)
             msghash = '%s %s %s %s' % (self.caller, date.now(), title, str(random.randrange(1,1000000)))
-            msgid = pegasus.hashobj(key=msgheader, string=msghash)
+            msgid = pegasus.hash(key=msgheader, string=msghash)
             msg = ev.create_message(self.caller, msgtext, channels=bucket, header=msgheader, recievers=self.job.db.recievers)
 
             msg.tags.add("job:"+jid, category="jobs")
@@ -1038,7 +1264,7 @@ class CmdJobs(MuxCommand):
         try:
             i = max(0, min(jobs_max, int(number) - 1))
             ret = self.jobs_list[i]
-        except ValueError, IndexError:
+        except (ValueError, IndexError):
             ret = False
 
         return ret
@@ -1047,7 +1273,7 @@ class CmdJobs(MuxCommand):
         def __init__(self):
             from job import Job
             self.head = "Job", "Type", "Title", "Opened By", "Due on", "Assigned to"
-            self.jobs = Job.objects.all()
+            self.jobs = Job.objects.all().exclude(db_tags__db_category=TOMBSTONE_CATEGORY)
 
             """
             ######What are the steps to getting a job?
@@ -1068,7 +1294,7 @@ class CmdJobs(MuxCommand):
         """
         # Todo: Finish building table
 
-        dt = self.default_table()
+        dt = self.DefaultTable()
         # Create the table
         if head:
             pass
@@ -1078,10 +1304,8 @@ class CmdJobs(MuxCommand):
         if body:
             pass
         else:
-            from job import Job
-            jobs = Job.objects.all()
             # Todo: munge jobs to test for access
-            body = jobs
+            body = dt.jobs
 
         # Create the table
         table = evtable.EvTable()
@@ -1090,10 +1314,13 @@ class CmdJobs(MuxCommand):
         for i in head:
             table.add_column(i)
 
-        # Add rows
-        for i in body:
-            info = job.info()
-            table.addrow(*info)
+        # Add rows, loading the attributes of every job on the page in one query
+        body = list(body)
+        views = iter(get_views([job for job in body if hasattr(job, "info")]))
+        for job in body:
+            # body may hold jobs or rows that were already built
+            info = next(views).info() if hasattr(job, "info") else job
+            table.add_row(*info)
 
         if layout:
             pass
@@ -1,9 +1,14 @@
 
+from datetime import datetime
+from time import time
 import evennia as ev
 from evennia.utils import lazy_property
-from evennia.utils import logger as log
 from jobs_settings import VALID_JOB_ACTIONS
 import jobutils as ju
+import revisions
+import jobevents as events
+from jobindex import JOB_INDEX, SORT_TAG_CATEGORY, sort_keys
+from jobindex import TOMBSTONE_CATEGORY, TOMBSTONE_FORMAT
 from world.jobs.bucket import Bucket
 from world.utilities import pegasus_utilities as pegasus
 
@@ -18,7 +23,14 @@ class Job(Bucket):
     * create - this creates a job with a unique hash and assigns it to a bucket.
         - requires Job.create(bucket, title, msgtext)
     * info - returns info about a job
-
+    * update_sortkeys - recomputes the job's listing sort keys.  Call this after
+        changing bucket, title, due or priority.
+    * tombstone - soft-deletes the job; it leaves every listing at once and is
+        purged by the JobCompactor script after the retention window.
+    * restore - brings a tombstoned job back (+job/trans).
+    * edit_message - edits a message, keeping the old text as a revision
+    * message_revision - returns an earlier version of a message
+    * message_history - returns the stored revision history of a message
 
     """
 
@@ -59,6 +71,7 @@ class Job(Bucket):
         self.db.due = False
         self.db.locked = False
         self.db.messages = {}
+        self.db.msgorder = []
         self.db.status = "new"
         self.db.tagged = []
         self.db.title = ""
@@ -79,7 +92,7 @@ class Job(Bucket):
         #             pos = job_list.index(job)+1
         #             return pos
         # except Exception as e:
-        #     log.log_trace(log.timeformat() + " " + SYSTEM + " --> " + e)
+        #     events.failed("position", e, job=self)
         #     raise
         pass
 
@@ -111,6 +124,8 @@ class Job(Bucket):
         code = ERROR_PRE
         msg = "{0} error".format(object)
         job = False
+        jid = None
+        started = time()
 
         # Is it a bucket?
         if ju.isbucket(bucket):
@@ -140,9 +155,10 @@ class Job(Bucket):
                     msgtext=msgtext,
                     parent=jid,
                 )
+                events.record("create", job=jid, duration=time() - started, msg=bucket)
             # Capture exception data and reraise
             except Exception as e:
-                log.log_trace(log.timeformat() + " " + SYSTEM + " --> " + e)
+                events.failed("create", e, job=jid, duration=time() - started, msg=bucket)
                 raise
         return self
 
@@ -158,6 +174,99 @@ class Job(Bucket):
                self.db.assigned_to)
         return ret
 
+    def update_sortkeys(self):
+        """store the job's sort keys as tags and refresh the listing index
+
+        :return: {method: key}
+        """
+        keys = sort_keys(self)
+        for method, key in keys.items():
+            category = SORT_TAG_CATEGORY + method
+            self.tags.clear(category=category)
+            self.tags.add(key, category=category)
+        if not self.is_deleted:
+            JOB_INDEX.add(self.id, keys)
+        self.invalidate_view()
+        return keys
+
+    @property
+    def is_deleted(self):
+        """True if the job has been tombstoned"""
+        return bool(self.tags.get(category=TOMBSTONE_CATEGORY))
+
+    def tombstone(self, caller=None):
+        """soft-delete the job
+
+        The deletion time is stored as a tag so the compactor can find expired
+        jobs with one indexed query; the job is dropped from the listing index
+        straight away.
+        """
+        now = datetime.now()
+        self.tags.clear(category=TOMBSTONE_CATEGORY)
+        self.tags.add(now.strftime(TOMBSTONE_FORMAT), category=TOMBSTONE_CATEGORY)
+        self.db.deleted_by = caller
+        JOB_INDEX.remove(self.id)
+        self.invalidate_view()
+        from jobscripts import ensure_compactor
+        ensure_compactor()
+        return now
+
+    def restore(self):
+        """undo tombstone() and put the job back in the listings"""
+        self.tags.clear(category=TOMBSTONE_CATEGORY)
+        self.db.deleted_by = None
+        self.update_sortkeys()
+
+    def message_id(self, entry):
+        """:return: message hash for entry number (1 based) or None"""
+        order = self.db.msgorder or sorted(self.db.messages or {})
+        try:
+            entry = int(entry)
+        except (TypeError, ValueError):
+            return None
+        return order[entry - 1] if 0 < entry <= len(order) else None
+
+    def edit_message(self, entry, old, new):
+        """replace old with new in message entry, recording the revision
+
+        :param entry: entry number (1 based)
+        :return: True if the message changed
+        """
+        msgid = self.message_id(entry)
+        if msgid is None:
+            return False
+        text = self.db.messages[msgid]
+        if not old or old not in text:
+            return False
+        edited = text.replace(old, new)
+        history = revisions.add_revision(self.message_history(msgid), text, edited)
+        self.attributes.add(msgid, history, category=revisions.REVISION_CATEGORY)
+        self.db.messages[msgid] = edited
+        return True
+
+    def message_history(self, msgid):
+        """:return: the revision history of message msgid, None if it was never edited"""
+        history = self.attributes.get(msgid, category=revisions.REVISION_CATEGORY)
+        if history is None:
+            # jobs from before per-message revisions kept them all in one dict
+            history = (self.db.revisions or {}).get(msgid)
+        return history
+
+    def message_revision(self, entry, number):
+        """:return: revision number of message entry (0 is the original)
+
+        :raise: IndexError if there is no such entry or revision
+        """
+        msgid = self.message_id(entry)
+        if msgid is None:
+            raise IndexError("no entry %s" % entry)
+        history = self.message_history(msgid)
+        if not history:
+            if number in (0, -1):
+                return self.db.messages[msgid]
+            raise IndexError("no revision %s" % number)
+        return revisions.revision(history, number)
+
     def _update_actlist(self, act):
         # Todo: fix action update - need to determine how I want to store the action data.   Probably long form strings.
         self.db.actions_list[len(self.db.actions_list)] = act
@@ -186,5 +295,9 @@ class Job(Bucket):
         # Id the message
         msghash = pegasus.hash(key=self.db.bucket, string=self.db.title)
         self.db.messages[msghash] = msgtext
+        self.db.msgorder = (self.db.msgorder or []) + [msghash]
+
+        # bucket and title feed the sort keys
+        self.update_sortkeys()
 
         # Todo: handle actionlist update.
@@ -0,0 +1,91 @@
+"""Jobs view cache v0.1
+
+Listing and inspecting jobs reads the same handful of Attributes over and over
+(Job.info() alone reads five).  A JobView holds those Attributes for one bucket
+or job, loaded together in one query, and the views live in a size-bounded LRU
+cache so hot jobs stay cheap while memory stays capped.
+
+get_views() serves a whole listing: every view missing from the cache is
+loaded by one bulk query (world.utilities.prefetch) rather than one per row.
+
+Views are read-only snapshots.  Everything that changes a bucket or job calls
+its invalidate_view(), which drops the view so the next read loads it fresh.
+"""
+from world.utilities.lrucache import LRUCache
+from world.utilities.prefetch import prefetch_attributes
+import jobs_settings as settings
+
+BUCKET_FIELDS = ("desc", "num_of_jobs", "percent_complete", "completion_board", "approval_board",
+                 "denial_board", "timeout_string", "resolution_time", "createdby", "per_player_actions")
+JOB_FIELDS = ("jid", "bucket", "title", "createdby", "due", "assigned_to", "priority", "status")
+VIEW_FIELDS = tuple(sorted(set(BUCKET_FIELDS + JOB_FIELDS)))
+
+VIEW_CACHE = LRUCache(maxsize=settings.VIEW_CACHE_SIZE)
+
+
+class JobView(object):
+    """Read-only snapshot of a bucket's or job's frequently read Attributes
+
+    view.db.<name> mirrors obj.db.<name> for the VIEW_FIELDS and info() gives
+    the same row as the object's own info().
+    """
+    __slots__ = ("id", "key", "is_job", "db")
+
+    class _Fields(object):
+        __slots__ = ("_values",)
+
+        def __init__(self, values):
+            self._values = values
+
+        def __getattr__(self, name):
+            return self._values.get(name)
+
+    def __init__(self, obj, values):
+        from world.jobs.job import Job
+        self.id = obj.id
+        self.key = obj.key
+        self.is_job = isinstance(obj, Job)
+        self.db = self._Fields(values)
+
+    def info(self):
+        """:return: Job.info() or Bucket.info() row"""
+        db = self.db
+        if self.is_job:
+            return db.bucket, db.title, db.createdby, db.due, db.assigned_to
+        return [self.key, db.desc, db.num_of_jobs, db.percent_complete, db.completion_board,
+                db.approval_board, db.denial_board, db.timeout_string, db.resolution_time]
+
+
+def get_view(obj):
+    """:return: the cached JobView for a bucket or job, loading it on a miss"""
+    view = VIEW_CACHE.get(obj.id)
+    if view is None:
+        values = prefetch_attributes([obj], VIEW_FIELDS)[obj.id]
+        view = VIEW_CACHE.set(obj.id, JobView(obj, values))
+    return view
+
+
+def get_views(objs):
+    """views for a list of buckets or jobs, loading all the misses in one query
+
+    :param objs: iterable of Bucket or Job
+    :return: list of JobView in the same order
+    """
+    objs = list(objs)
+    views = dict((obj.id, VIEW_CACHE.get(obj.id)) for obj in objs)
+    missing = [obj for obj in objs if views[obj.id] is None]
+    if missing:
+        loaded = prefetch_attributes(missing, VIEW_FIELDS)
+        for obj in missing:
+            views[obj.id] = VIEW_CACHE.set(obj.id, JobView(obj, loaded[obj.id]))
+    return [views[obj.id] for obj in objs]
+
+
+def invalidate(objid):
+    """drop the cached view of object id objid"""
+    VIEW_CACHE.pop(objid)
+
+
+def stats():
+    """:return: cache size and hit rate, see LRUCache.stats()"""
+    return VIEW_CACHE.stats()
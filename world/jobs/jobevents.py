@@ -0,0 +1,152 @@
+"""Jobs event log v0.1
+
+Everything the jobs system wants to log goes through here as a structured
+event instead of a formatted line:
+
+    events.record("create", job=jid, actor=caller, duration=0.012)
+    events.failed("create", e, job=jid, actor=caller)
+
+Recording an event only appends a small tuple to memory.  The newest
+EVENT_BUFFER_SIZE events stay in a ring buffer that staff can query with
++job/reports events, and events are written out to EVENT_LOG_FILE as JSON
+lines in batches, every EVENT_FLUSH_INTERVAL seconds, from Twisted's thread
+pool.  The file is rotated at EVENT_ROTATE_BYTES, keeping EVENT_ROTATE_KEEP
+old files (events.log.1, events.log.2, ...).
+"""
+import json
+import os
+import traceback
+from collections import deque, namedtuple
+from datetime import datetime
+from twisted.internet import reactor, threads
+from django.conf import settings as ev_settings
+from evennia.utils import logger as log
+import jobs_settings as settings
+
+EVENT_LOG_FILE = settings.EVENT_LOG_FILE or os.path.join(ev_settings.LOG_DIR, "jobs", "events.log")
+
+Event = namedtuple("Event", ("time", "level", "system", "action", "job", "actor", "duration", "error", "msg"))
+
+
+def _name(obj):
+    """key of a job or actor, anything else (jids, names, None) as given"""
+    return getattr(obj, "key", obj)
+
+
+class EventLog(object):
+    """Ring buffer of events with a batching background writer"""
+    def __init__(self, path=EVENT_LOG_FILE, size=None, interval=None, rotate_bytes=None, rotate_keep=None):
+        self.path = path
+        self.buffer = deque(maxlen=size or settings.EVENT_BUFFER_SIZE)
+        self.pending = []
+        self.traces = {}
+        self.interval = settings.EVENT_FLUSH_INTERVAL if interval is None else interval
+        self.rotate_bytes = rotate_bytes or settings.EVENT_ROTATE_BYTES
+        self.rotate_keep = settings.EVENT_ROTATE_KEEP if rotate_keep is None else rotate_keep
+        self.timer = None
+        self.writing = False
+        self.written = 0
+
+    def record(self, action, job=None, actor=None, duration=None, error=None, msg="", level="info"):
+        """log an event
+
+        :param action: what happened, e.g. 'create' or 'mail'
+        :param job: job (or its jid) the event concerns
+        :param actor: character or script that acted
+        :param duration: seconds the action took
+        :param error: error text, for failures
+        :param msg: any further detail
+        :param level: 'info', 'warn' or 'error'
+        :return: the Event
+        """
+        event = Event(datetime.now(), level, settings.SYSTEM, action, _name(job), _name(actor),
+                      duration, error, msg)
+        self.buffer.append(event)
+        self.pending.append(event)
+        if self.timer is None or not self.timer.active():
+            self.timer = reactor.callLater(self.interval, self.flush)
+        return event
+
+    def failed(self, action, exc, **kwargs):
+        """log an exception raised by action; the traceback goes to the file only"""
+        event = self.record(action, error="{0}: {1}".format(type(exc).__name__, exc), level="error", **kwargs)
+        self.traces[id(event)] = traceback.format_exc()
+        return event
+
+    def tail(self, count=20, action=None, job=None, actor=None, level=None):
+        """:return: up to count newest buffered events matching every filter given, oldest first"""
+        ret = []
+        for event in reversed(self.buffer):
+            if action and event.action != action or job and event.job != _name(job) or \
+                    actor and event.actor != _name(actor) or level and event.level != level:
+                continue
+            ret.append(event)
+            if len(ret) >= count:
+                break
+        ret.reverse()
+        return ret
+
+    def flush(self):
+        """hand everything pending to the writer thread
+
+        :return: Deferred firing with the number of events written, or None if
+                 nothing was pending or a write is still running
+        """
+        if self.timer is not None and self.timer.active():
+            self.timer.cancel()
+        self.timer = None
+        if not self.pending:
+            return None
+        if self.writing:
+            # one write at a time keeps the file in order; try again shortly
+            self.timer = reactor.callLater(self.interval, self.flush)
+            return None
+        batch, self.pending = self.pending, []
+        traces = dict((key, self.traces.pop(key)) for key in [id(event) for event in batch] if key in self.traces)
+        self.writing = True
+        d = threads.deferToThread(self.write, batch, traces)
+        d.addBoth(self._written)
+        return d
+
+    def _written(self, result):
+        self.writing = False
+        if isinstance(result, int):
+            self.written += result
+            return result
+        # the event file can't be written; say so in the server log once per batch
+        log.log_err("{0} --> event log write failed: {1}".format(settings.SYSTEM, result.getErrorMessage()))
+        return 0
+
+    def write(self, batch, traces=None):
+        """append a batch to the log file, rotating first if it is full (runs in a thread)"""
+        traces = traces or {}
+        folder = os.path.dirname(self.path)
+        if folder and not os.path.isdir(folder):
+            os.makedirs(folder)
+        if os.path.exists(self.path) and os.path.getsize(self.path) >= self.rotate_bytes:
+            self.rotate()
+        with open(self.path, "a") as f:
+            for event in batch:
+                record = event._asdict()
+                record["time"] = event.time.isoformat()
+                if id(event) in traces:
+                    record["trace"] = traces[id(event)]
+                f.write(json.dumps(record, default=str) + "\n")
+        return len(batch)
+
+    def rotate(self):
+        """events.log -> events.log.1 -> events.log.2 ..., dropping the oldest"""
+        for n in range(self.rotate_keep - 1, 0, -1):
+            older = "%s.%s" % (self.path, n)
+            if os.path.exists(older):
+                os.rename(older, "%s.%s" % (self.path, n + 1))
+        if self.rotate_keep:
+            os.rename(self.path, self.path + ".1")
+        else:
+            os.remove(self.path)
+
+
+EVENTS = EventLog()
+record = EVENTS.record
+failed = EVENTS.failed
+tail = EVENTS.tail
@@ -0,0 +1,94 @@
+"""Jobs id migration v0.1
+
+Jobs, their messages and buckets used to get md5 ids from
+pegasus_utilities.hash(); new ones get time ordered ULIDs
+(world.utilities.ulid).  Old ids keep working as they are - every lookup
+treats an id as an opaque string - so migrating is optional.  It puts old
+jobs into the same order as new ones:
+
+    @py from world.jobs.jobids import migrate_all; migrate_all()
+
+Each md5 id is replaced by ulid.from_legacy(id, date created), so running
+the migration again (or on a copy of the database) gives the same ids.  A
+migrated job keeps its old id as an alias, so it can still be found by it.
+"""
+from evennia.typeclasses.tags import Tag
+from world.utilities import ulid
+import jobevents as events
+from revisions import REVISION_CATEGORY
+
+JOB_TAG_CATEGORY = "jobs"
+
+
+def migrate_job(job):
+    """give a job, and its messages, ULIDs in place of md5 ids
+
+    :param job: Job
+    :return: the job's new id, or None if it had no md5 id
+    """
+    old = job.db.jid
+    if not ulid.is_legacy(old):
+        return None
+    created = job.db_date_created
+    new = ulid.from_legacy(old, created)
+
+    # the job itself: key, jid, id tag, and the old id as an alias
+    job.db.jid = new
+    if job.db.parent == old:
+        job.db.parent = new
+    job.key = new
+    job.aliases.add(old)
+    job.tags.remove(old, category=JOB_TAG_CATEGORY)
+    job.tags.add(new, category=JOB_TAG_CATEGORY)
+
+    # message ids key the messages, their order and their revisions
+    renamed = dict((msgid, ulid.from_legacy(msgid, created))
+                   for msgid in (job.db.messages or {}) if ulid.is_legacy(msgid))
+    if renamed:
+        job.db.messages = dict((renamed.get(key, key), text) for key, text in job.db.messages.items())
+        job.db.msgorder = [renamed.get(key, key) for key in job.db.msgorder or []]
+        if job.db.revisions:
+            job.db.revisions = dict((renamed.get(key, key), history) for key, history in job.db.revisions.items())
+        for old_msgid, new_msgid in renamed.items():
+            history = job.attributes.get(old_msgid, category=REVISION_CATEGORY)
+            if history is not None:
+                job.attributes.add(new_msgid, history, category=REVISION_CATEGORY)
+                job.attributes.remove(old_msgid, category=REVISION_CATEGORY)
+
+    # Msgs tagged with the job share one tag row, which only this job uses; the
+    # TagHandler keeps tag keys in lower case, and ULIDs are upper case
+    Tag.objects.filter(db_key=("job:" + old).lower(), db_category=JOB_TAG_CATEGORY) \
+        .update(db_key=("job:" + new).lower())
+    job.invalidate_view()
+    return new
+
+
+def migrate_bucket(bucket):
+    """:return: the bucket's new hash, or None if it had no md5 hash"""
+    old = bucket.db.hash
+    if not ulid.is_legacy(old):
+        return None
+    bucket.db.hash = ulid.from_legacy(old, bucket.db_date_created)
+    return bucket.db.hash
+
+
+def migrate_all(limit=None):
+    """migrate every bucket and job that still has an md5 id
+
+    :param limit: most jobs to migrate this call, None for all
+    :return: (buckets migrated, jobs migrated)
+    """
+    from world.jobs.bucket import Bucket
+    from world.jobs.job import Job
+    buckets = len([bucket for bucket in Bucket.objects.all() if migrate_bucket(bucket)])
+    jobs = 0
+    for job in Job.objects.all().order_by("id"):
+        if limit is not None and jobs >= limit:
+            break
+        try:
+            if migrate_job(job):
+                jobs += 1
+        except Exception as e:
+            events.failed("migrate id", e, job=job)
+    events.record("migrate id", msg="%s buckets, %s jobs" % (buckets, jobs))
+    return buckets, jobs
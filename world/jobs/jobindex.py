@@ -0,0 +1,306 @@
+"""Jobs sort index v0.1
+
+Every job carries a precomputed sort key for each method in VALID_SORT_METHODS.
+The keys are stored on the job as tags (one category per method) so they are
+indexed by the database, and mirrored in memory by JobIndex so the listing
+engine can page through any method and direction without touching the job
+attributes.
+
+Keys are plain strings built so that string order is the listing order:
+
+    alpha    - bucket name, then title (case-insensitive)
+    date     - due date as YYYYMMDDHHMMSS, jobs with no due date sort last
+    priority - escalation rank (red, yellow, green, none), then due date
+
+JobIndex also keeps the set of job ids in each bucket, which gives the job
+counters and the visibility sets (the jobs a character may see are the union
+of the sets of the buckets they can access).  BucketNames maps bucket names
+to ids so checking a bucket name doesn't need a query.
+
+Both are registered with world.utilities.snapshot, so a @reload carries them
+over instead of rebuilding them, as long as no bucket, job or tag was added
+or removed behind the server's back.
+"""
+from bisect import bisect_left
+from jobs_settings import VALID_SORT_METHODS
+from world.utilities import snapshot
+
+SORT_TAG_CATEGORY = "jobs_sort_"
+SORT_DIRECTIONS = ("asc", "des",)
+PRIORITY_RANKS = {"red": "0", "yellow": "1", "green": "2"}
+NO_PRIORITY = "9"
+NO_DUE = "99999999999999"
+TOMBSTONE_CATEGORY = "jobs_deleted"
+TOMBSTONE_FORMAT = "%Y%m%d%H%M%S"
+
+
+def alpha_key(job):
+    """:return: sort key for the alpha (by bucket) method"""
+    bucket = job.db.bucket or ""
+    title = job.db.title or ""
+    return "{0}:{1}".format(str(bucket).lower(), title.lower())
+
+
+def due_key(due):
+    """:return: sortable string for a due datetime (NO_DUE if there isn't one)"""
+    if due and hasattr(due, "strftime"):
+        ret = due.strftime("%Y%m%d%H%M%S")
+    else:
+        ret = NO_DUE
+    return ret
+
+
+def date_key(job):
+    """:return: sort key for the date (due) method"""
+    return due_key(job.db.due)
+
+
+def priority_key(job):
+    """:return: sort key for the priority (/esc) method"""
+    priority = str(job.db.priority or "").lower()
+    return PRIORITY_RANKS.get(priority, NO_PRIORITY) + ":" + date_key(job)
+
+
+SORT_KEY_FUNCS = {"alpha": alpha_key,
+                  "date": date_key,
+                  "priority": priority_key, }
+
+
+def sort_keys(job):
+    """compute every sort key for a job
+
+    :param job: Job
+    :return: {method: key} for each method in VALID_SORT_METHODS
+    """
+    return dict((method, SORT_KEY_FUNCS[method](job)) for method in VALID_SORT_METHODS)
+
+
+def key_bucket(keys):
+    """:return: lower-cased bucket name a job's keys were built from"""
+    return keys["alpha"].split(":", 1)[0]
+
+
+def parse_sortby(string, default):
+    """parse a stored 'method:direction' preference
+
+    :param string: value of character.db.jsort
+    :param default: (method, direction) to fall back on
+    :return: (method, direction)
+    """
+    if string and ":" in string:
+        method, direction = string.split(":", 1)
+        if method in VALID_SORT_METHODS and direction in SORT_DIRECTIONS:
+            return method, direction
+    return default
+
+
+class JobIndex(object):
+    """In-memory mirror of the job sort keys
+
+    For each method a list of (key, job id) pairs is kept in sorted order, so a
+    listing in either direction is a slice of that list.  The current keys of
+    every job are remembered so an update can find and drop the stale entry
+    with a binary search instead of a scan.
+    """
+    def __init__(self):
+        self.entries = dict((method, []) for method in VALID_SORT_METHODS)
+        self.keys = {}
+        self.buckets = {}
+        self.built = False
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, jobid):
+        return jobid in self.keys
+
+    def add(self, jobid, keys):
+        """index jobid under keys ({method: key})"""
+        if jobid in self.keys:
+            self.remove(jobid)
+        for method, entries in self.entries.items():
+            entry = (keys[method], jobid)
+            entries.insert(bisect_left(entries, entry), entry)
+        self.keys[jobid] = keys
+        self.buckets.setdefault(key_bucket(keys), set()).add(jobid)
+
+    def remove(self, jobid):
+        """drop jobid from every ordering, returns False if it wasn't indexed"""
+        keys = self.keys.pop(jobid, None)
+        if keys is None:
+            return False
+        for method, entries in self.entries.items():
+            entry = (keys[method], jobid)
+            i = bisect_left(entries, entry)
+            if i < len(entries) and entries[i] == entry:
+                del entries[i]
+        bucket = key_bucket(keys)
+        self.buckets[bucket].discard(jobid)
+        if not self.buckets[bucket]:
+            del self.buckets[bucket]
+        return True
+
+    def update(self, job):
+        """recompute and reindex a job"""
+        self.add(job.id, sort_keys(job))
+
+    def clear(self):
+        """empty the index"""
+        for entries in self.entries.values():
+            del entries[:]
+        self.keys.clear()
+        self.buckets.clear()
+        self.built = False
+
+    def count(self, bucket):
+        """:return: number of (undeleted) jobs in bucket"""
+        return len(self.buckets.get(str(bucket).lower(), ()))
+
+    def visible(self, buckets):
+        """:return: set of job ids in any of buckets (a character's visibility set)"""
+        ret = set()
+        for bucket in buckets:
+            ret.update(self.buckets.get(str(bucket).lower(), ()))
+        return ret
+
+    def scan(self, method, direction="asc", start=0, count=None, allowed=None):
+        """return job ids in listing order
+
+        :param method: one of VALID_SORT_METHODS
+        :param direction: 'asc' or 'des'
+        :param start: number of matching ids to skip
+        :param count: maximum number of ids to return, None for all
+        :param allowed: optional container of job ids the caller may see
+        :return: list of job ids
+        """
+        entries = self.entries[method]
+        ordered = reversed(entries) if direction == "des" else iter(entries)
+        ret = []
+        for key, jobid in ordered:
+            if allowed is not None and jobid not in allowed:
+                continue
+            if start:
+                start -= 1
+                continue
+            ret.append(jobid)
+            if count is not None and len(ret) >= count:
+                break
+        return ret
+
+    def scan_range(self, method, low=None, high=None, allowed=None):
+        """return job ids whose key is in [low, high), in ascending order
+
+        :param method: one of VALID_SORT_METHODS
+        :param low: smallest key to include, None for no lower bound
+        :param high: first key to exclude, None for no upper bound
+        :param allowed: optional container of job ids the caller may see
+        :return: list of job ids
+        """
+        entries = self.entries[method]
+        first = bisect_left(entries, (low,)) if low is not None else 0
+        last = bisect_left(entries, (high,)) if high is not None else len(entries)
+        return [jobid for key, jobid in entries[first:last] if allowed is None or jobid in allowed]
+
+    def rebuild(self):
+        """reload the index from the sort key tags, one query per method"""
+        from world.jobs.job import Job
+        self.clear()
+        found = {}
+        for method in VALID_SORT_METHODS:
+            rows = Job.objects.filter(db_tags__db_category=SORT_TAG_CATEGORY + method)
+            for jobid, key in rows.values_list("id", "db_tags__db_key"):
+                found.setdefault(jobid, {})[method] = key
+        # tombstoned jobs never appear in a listing
+        for jobid in Job.objects.filter(db_tags__db_category=TOMBSTONE_CATEGORY).values_list("id", flat=True):
+            found.pop(jobid, None)
+        for jobid, keys in found.items():
+            # jobs created before the sort keys existed are picked up on their next update
+            if len(keys) == len(self.entries):
+                self.add(jobid, keys)
+        self.built = True
+        return len(self.keys)
+
+    def dump(self):
+        """:return: picklable state for a snapshot, None if the index isn't built"""
+        if not self.built:
+            # a partly filled index would be taken for a whole one
+            return None
+        return self.entries, self.keys
+
+    def load(self, state):
+        """install state from dump(); None leaves the index unbuilt"""
+        if state is None:
+            self.clear()
+            return
+        entries, keys = state
+        if sorted(entries) != sorted(self.entries):
+            raise ValueError("sort methods changed")
+        buckets = {}
+        for jobid, jobkeys in keys.items():
+            buckets.setdefault(key_bucket(jobkeys), set()).add(jobid)
+        self.entries, self.keys, self.buckets = entries, keys, buckets
+        self.built = True
+
+
+JOB_INDEX = JobIndex()
+
+
+def job_index():
+    """:return: the shared JobIndex, building it on first use"""
+    if not JOB_INDEX.built:
+        JOB_INDEX.rebuild()
+    return JOB_INDEX
+
+
+class BucketNames(object):
+    """Map of lower-cased bucket name to bucket id
+
+    Built with one query on first use; +bucket/create, /rename and /delete
+    call invalidate() so the next lookup rebuilds it.
+    """
+    def __init__(self):
+        self.names = None
+
+    def rebuild(self):
+        """reload the map from the database"""
+        from world.jobs.bucket import Bucket
+        self.names = dict((key.lower(), objid) for key, objid in Bucket.objects.all().values_list("db_key", "id"))
+        return len(self.names)
+
+    def invalidate(self):
+        """forget the map"""
+        self.names = None
+
+    def get(self, name):
+        """:return: id of bucket name or None"""
+        if self.names is None:
+            self.rebuild()
+        return self.names.get(str(name).lower())
+
+    def dump(self):
+        """:return: picklable state for a snapshot"""
+        return self.names
+
+    def load(self, state):
+        """install state from dump()"""
+        self.names = state
+
+
+BUCKET_NAMES = BucketNames()
+
+
+def high_water():
+    """:return: high-water mark of the data behind the index and name map
+
+    Channel ids and channel tag links only grow, so their highest ids plus
+    the number of links change whenever a bucket or job is created or one of
+    their tags (sort keys, tombstones) is set or removed.
+    """
+    from django.db.models import Count, Max
+    from evennia.comms.models import ChannelDB
+    links = ChannelDB.db_tags.through.objects.aggregate(last=Max("id"), count=Count("id"))
+    return ChannelDB.objects.aggregate(last=Max("id"))["last"], links["last"], links["count"]
+
+
+snapshot.register("jobs.index", JOB_INDEX.dump, JOB_INDEX.load, high_water)
+snapshot.register("jobs.bucket_names", BUCKET_NAMES.dump, BUCKET_NAMES.load, high_water)
@@ -0,0 +1,95 @@
+"""Jobs log export v0.1
+
++job/log writes a job's full history (header, messages and action list) to a
+file under EXPORT_DIR.  The caller only takes a cheap snapshot of the job on the
+reactor thread; formatting and file I/O run in Twisted's thread pool and the
+returned Deferred fires with (path, size) when the file is complete.
+
+The file is JSON lines, one record per line:
+
+    {"type": "header", "jid": ..., "bucket": ..., "title": ..., ...}
+    {"type": "msg", "id": ..., "text": ...}
+    {"type": "act", "id": ..., "act": ...}
+
+Records are written CHUNK_SIZE at a time, so the formatted output never has to
+be held in memory at once however long the job is.
+"""
+import json
+import os
+from datetime import datetime
+from twisted.internet import threads
+from django.conf import settings as ev_settings
+import jobs_settings as settings
+
+EXPORT_DIR = settings.EXPORT_DIR or os.path.join(ev_settings.LOG_DIR, "jobs")
+CHUNK_SIZE = settings.EXPORT_CHUNK_SIZE
+
+
+def snapshot(job):
+    """grab what an export needs from job without formatting any of it
+
+    :param job: Job
+    :return: (header dict, messages iterable, actions iterable)
+    """
+    bucket, title, createdby, due, assigned_to = job.info()
+    header = {"type": "header",
+              "jid": job.db.jid,
+              "bucket": str(bucket),
+              "title": title,
+              "createdby": str(createdby),
+              "due": due.isoformat() if hasattr(due, "isoformat") else None,
+              "assigned_to": str(assigned_to) if assigned_to else None,
+              "status": job.db.status,
+              "priority": job.db.priority,
+              "exported": datetime.now().isoformat(), }
+    messages = list((job.db.messages or {}).items())
+    actions = sorted((job.db.actions_list or {}).items())
+    return header, messages, actions
+
+
+def records(header, messages, actions):
+    """yield the export records in file order"""
+    yield header
+    for msgid, text in messages:
+        yield {"type": "msg", "id": msgid, "text": text}
+    for actid, act in actions:
+        yield {"type": "act", "id": actid, "act": act}
+
+
+def write_export(path, header, messages, actions, chunk_size=CHUNK_SIZE):
+    """write the export to path in chunks (runs off the reactor thread)
+
+    The file is written under a temporary name and moved into place when it is
+    complete, so a reader never sees half an export.
+
+    :return: (path, size in bytes)
+    """
+    tmp = path + ".part"
+    chunk = []
+    with open(tmp, "w") as f:
+        for record in records(header, messages, actions):
+            chunk.append(json.dumps(record, default=str) + "\n")
+            if len(chunk) >= chunk_size:
+                f.write("".join(chunk))
+                del chunk[:]
+        f.write("".join(chunk))
+    os.rename(tmp, path)
+    return path, os.path.getsize(path)
+
+
+def export_path(jid, when=None):
+    """:return: file path for an export of job jid"""
+    when = when or datetime.now()
+    return os.path.join(EXPORT_DIR, "{0}-{1}.jsonl".format(jid, when.strftime("%Y%m%d%H%M%S")))
+
+
+def export_job(job):
+    """export job in the background
+
+    :param job: Job
+    :return: Deferred firing with (path, size)
+    """
+    if not os.path.isdir(EXPORT_DIR):
+        os.makedirs(EXPORT_DIR)
+    header, messages, actions = snapshot(job)
+    return threads.deferToThread(write_export, export_path(header["jid"]), header, messages, actions)
@@ -0,0 +1,147 @@
+"""Jobs mail queue v0.1
+
+Mail generated by the jobs system (+job/mail, /approve, /deny and /query) is
+not created one Msg at a time.  It is queued and delivered on a short timer:
+identical letters are merged, each recipient gets a letter only once, and the
+whole batch is written with bulk_create, so a query to 40 players costs a
+handful of inserts instead of 40 round trips.
+
+Delivered letters are ordinary evennia.contrib.mail messages - a Msg sent
+from the staffer to the character and tagged 'new' in the 'mail' category -
+so they show up in @mail like any other.
+"""
+from collections import OrderedDict
+from time import time
+from twisted.internet import reactor
+from django.db import transaction
+from django.db.models import Max
+from evennia.comms.models import Msg
+from evennia.typeclasses.tags import Tag
+import jobs_settings as settings
+import jobevents as events
+
+MAIL_TAG = "new"
+MAIL_CATEGORY = "mail"
+FLUSH_DELAY = settings.MAIL_FLUSH_DELAY
+BATCH_SIZE = settings.MAIL_BATCH_SIZE
+MAX_ATTEMPTS = 3    # flushes a letter is tried in before it is dropped
+
+
+class MailQueue(object):
+    """Collects job mail and writes it out in bulk
+
+    Letters are keyed on (sender, subject, body); each key maps to an ordered
+    set of recipients, so the same letter to the same character is only ever
+    delivered once per flush.
+    """
+    def __init__(self, delay=FLUSH_DELAY, batch_size=BATCH_SIZE):
+        self.delay = delay
+        self.batch_size = batch_size
+        self.letters = OrderedDict()
+        self.timer = None
+        self.sent = 0
+        self.dropped = 0
+        self.attempts = {}
+
+    def __len__(self):
+        return sum(len(recipients) for recipients in self.letters.values())
+
+    def add(self, sender, recipients, subject, body):
+        """queue a letter to one or many recipients
+
+        :param sender: object the mail comes from
+        :param recipients: an object or an iterable of objects
+        :param subject: mail subject
+        :param body: mail text
+        :return: number of recipients newly queued
+        """
+        if not isinstance(recipients, (list, tuple, set)):
+            recipients = [recipients]
+        queued = self.letters.setdefault((sender, subject, body), OrderedDict())
+        count = 0
+        for recipient in recipients:
+            if recipient and recipient.id not in queued:
+                queued[recipient.id] = recipient
+                count += 1
+        if self.timer is None or not self.timer.active():
+            self.timer = reactor.callLater(self.delay, self.flush)
+        return count
+
+    def flush(self):
+        """deliver everything queued, BATCH_SIZE letters per insert
+
+        A batch that fails to write is queued again for the next flush, up to
+        MAX_ATTEMPTS flushes; after that its letters are dropped and logged.
+
+        :return: number of letters delivered
+        """
+        if self.timer is not None and self.timer.active():
+            self.timer.cancel()
+        self.timer = None
+        pending = [(sender, subject, body, recipient)
+                   for (sender, subject, body), recipients in self.letters.items()
+                   for recipient in recipients.values()]
+        self.letters.clear()
+        delivered = 0
+        for i in range(0, len(pending), self.batch_size):
+            batch = pending[i:i + self.batch_size]
+            started = time()
+            try:
+                self._write(batch)
+            except Exception as e:
+                events.failed("mail", e, duration=time() - started, msg="%s letters" % len(batch))
+                self._retry(batch)
+                continue
+            events.record("mail", duration=time() - started, msg="%s letters" % len(batch))
+            for sender, subject, body, recipient in batch:
+                self.attempts.pop((sender, subject, body, recipient.id), None)
+            delivered += len(batch)
+        self.sent += delivered
+        return delivered
+
+    def _retry(self, batch):
+        """queue the letters of a failed batch again, dropping those out of attempts"""
+        dropped = 0
+        for sender, subject, body, recipient in batch:
+            key = (sender, subject, body, recipient.id)
+            tries = self.attempts[key] = self.attempts.get(key, 0) + 1
+            if tries >= MAX_ATTEMPTS:
+                del self.attempts[key]
+                dropped += 1
+            else:
+                self.add(sender, recipient, subject, body)
+        if dropped:
+            self.dropped += dropped
+            events.record("mail", level="error", msg="%s letters dropped after %s attempts" % (dropped, MAX_ATTEMPTS))
+
+    def _write(self, batch):
+        """insert one batch: the messages, then their senders, receivers and tags"""
+        with transaction.atomic():
+            last = Msg.objects.aggregate(last=Max("id"))["last"] or 0
+            msgs = Msg.objects.bulk_create([Msg(db_header=subject, db_message=body)
+                                            for sender, subject, body, recipient in batch])
+            ids = [msg.id for msg in msgs]
+            if None in ids:
+                # backends that don't return primary keys from bulk_create (sqlite);
+                # we hold the transaction, so the new rows are the ones past 'last'
+                ids = list(Msg.objects.filter(id__gt=last).order_by("id").values_list("id", flat=True))
+            tag, created = Tag.objects.get_or_create(db_key=MAIL_TAG, db_category=MAIL_CATEGORY,
+                                                     db_model="msg", db_tagtype=None)
+            senders = Msg.db_sender_objects.through
+            receivers = Msg.db_receivers_objects.through
+            tags = Msg.db_tags.through
+            senders.objects.bulk_create([senders(msg_id=msgid, objectdb_id=letter[0].id)
+                                         for msgid, letter in zip(ids, batch)])
+            receivers.objects.bulk_create([receivers(msg_id=msgid, objectdb_id=letter[3].id)
+                                           for msgid, letter in zip(ids, batch)])
+            tags.objects.bulk_create([tags(msg_id=msgid, tag_id=tag.id) for msgid in ids])
+        for sender, subject, body, recipient in batch:
+            recipient.msg("You have received a new @mail from %s" % sender)
+
+
+MAIL_QUEUE = MailQueue()
+
+
+def queue_mail(sender, recipients, subject, body):
+    """queue job mail on the shared MailQueue, see MailQueue.add"""
+    return MAIL_QUEUE.add(sender, recipients, subject, body)
@@ -44,7 +44,7 @@ DEFAULT_VALID_JOB_ACTIONS = ("act", "add", "all", "approve", "assign", "catchup"
                               "set", "sort", "source", "summary", "sumset", "tag", "trans", "unlock", "untag", "who",)
 
 # Sortby
-DEFAULT_VALID_SORT_METHODS = ("alpha", "date", "priorty",)
+DEFAULT_VALID_SORT_METHODS = ("alpha", "date", "priority",)
 
 # Settings
 DEFAULT_VALID_BUCKET_SETTINGS =  {"desc": "desc",
@@ -55,5 +55,44 @@ DEFAULT_VALID_BUCKET_SETTINGS =  {"desc": "desc",
 DEFAULT_VALID_TIMEOUT_INTERVALS = ("hours", "days", "months", "years",)
 DEFAULT_VALID_JOB_SETTINGS = ()
 
+# Log export
+DEFAULT_EXPORT_DIR = None # None exports to <LOG_DIR>/jobs
+DEFAULT_EXPORT_CHUNK_SIZE = 200
+
+# Mail queue
+DEFAULT_MAIL_FLUSH_DELAY = 0.5 # seconds mail waits to be batched
+DEFAULT_MAIL_BATCH_SIZE = 200
+
+# Compaction of deleted jobs
+DEFAULT_COMPACT_RETENTION_DAYS = 30 # days a deleted job can be undeleted
+DEFAULT_COMPACT_INTERVAL = 3600 # seconds between compactor runs
+DEFAULT_COMPACT_BATCH_SIZE = 25 # jobs purged per run
+
+# Cleaning job data (+job/clean)
+DEFAULT_CLEAN_INTERVAL = 10 # seconds between cleaner batches
+DEFAULT_CLEAN_BATCH_SIZE = 50 # buckets/jobs checked per batch
+
+# Message revisions (+job/edit)
+DEFAULT_REVISION_SNAPSHOT_EVERY = 10 # a full copy every N revisions
+
+# View cache
+DEFAULT_VIEW_CACHE_SIZE = 500 # buckets/jobs kept hydrated in memory
+
+# Cache warm-up at server start
+DEFAULT_WARMUP_BUDGET = 5.0 # seconds spent warming at most
+DEFAULT_WARMUP_PAGE_SIZE = 20 # jobs per warmed listing page
+
+# Worker processes for reports
+DEFAULT_WORKER_PROCESSES = 2
+DEFAULT_WORKER_MAX_TASKS = 100 # tasks a worker runs before it is replaced
+DEFAULT_WORKER_TIMEOUT = 300 # seconds before a task whose worker died is failed
+
+# Event log
+DEFAULT_EVENT_LOG_FILE = None # None logs to <LOG_DIR>/jobs/events.log
+DEFAULT_EVENT_BUFFER_SIZE = 1000 # newest events kept in memory for +job/reports events
+DEFAULT_EVENT_FLUSH_INTERVAL = 2.0 # seconds events wait to be written in a batch
+DEFAULT_EVENT_ROTATE_BYTES = 5 * 1024 * 1024
+DEFAULT_EVENT_ROTATE_KEEP = 5 # rotated files kept
+
 # System variables
 DEFAULT_SYSTEM = "Jobs"
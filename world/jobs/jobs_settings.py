@@ -71,3 +71,101 @@ VALID_TIMEOUT_INTERVALS = defaults.DEFAULT_VALID_TIMEOUT_INTERVALS
 
 # System variables
 SYSTEM = defaults.DEFAULT_SYSTEM
+
+
+################################################################################
+#  JOBS - Log export
+#           +job/log writes a job's history to a file in EXPORT_DIR.  Leave it
+#           as None to use the jobs folder under the server's log directory.
+#           EXPORT_CHUNK_SIZE is how many records are written at a time.
+################################################################################
+EXPORT_DIR = defaults.DEFAULT_EXPORT_DIR
+EXPORT_CHUNK_SIZE = defaults.DEFAULT_EXPORT_CHUNK_SIZE
+
+
+################################################################################
+#  JOBS - Mail queue
+#           Job mail (+job/mail, /approve, /deny, /query) is queued and written
+#           in bulk.  MAIL_FLUSH_DELAY is how long (in seconds) mail waits to
+#           be batched with other mail, MAIL_BATCH_SIZE the most letters
+#           written per insert.
+################################################################################
+MAIL_FLUSH_DELAY = defaults.DEFAULT_MAIL_FLUSH_DELAY
+MAIL_BATCH_SIZE = defaults.DEFAULT_MAIL_BATCH_SIZE
+
+
+################################################################################
+#  JOBS - Deleted jobs
+#           +job/delete only marks a job as deleted.  It can be brought back
+#           with +job/trans for COMPACT_RETENTION_DAYS, after which the job
+#           compactor purges it for good.  The compactor runs every
+#           COMPACT_INTERVAL seconds and purges at most COMPACT_BATCH_SIZE
+#           jobs per run.
+################################################################################
+COMPACT_RETENTION_DAYS = defaults.DEFAULT_COMPACT_RETENTION_DAYS
+COMPACT_INTERVAL = defaults.DEFAULT_COMPACT_INTERVAL
+COMPACT_BATCH_SIZE = defaults.DEFAULT_COMPACT_BATCH_SIZE
+
+
+################################################################################
+#  JOBS - Cleaning job data
+#           +job/clean runs in the background, checking CLEAN_BATCH_SIZE
+#           buckets and jobs every CLEAN_INTERVAL seconds.  Both can be
+#           changed for a running pass with +job/clean <batch>[/<interval>].
+################################################################################
+CLEAN_INTERVAL = defaults.DEFAULT_CLEAN_INTERVAL
+CLEAN_BATCH_SIZE = defaults.DEFAULT_CLEAN_BATCH_SIZE
+
+
+################################################################################
+#  JOBS - Message revisions
+#           +job/edit keeps earlier versions of a message as diffs.  A full
+#           copy is stored every REVISION_SNAPSHOT_EVERY revisions; lower
+#           numbers rebuild old revisions faster but take more space.
+################################################################################
+REVISION_SNAPSHOT_EVERY = defaults.DEFAULT_REVISION_SNAPSHOT_EVERY
+
+
+################################################################################
+#  JOBS - View cache
+#           The most recently used VIEW_CACHE_SIZE buckets and jobs are kept
+#           in memory with the attributes listings read.  Raise it if
+#           +job/reports cache shows a low hit rate on a busy game.
+################################################################################
+VIEW_CACHE_SIZE = defaults.DEFAULT_VIEW_CACHE_SIZE
+
+
+################################################################################
+#  JOBS - Cache warm-up
+#           At start and reload the bucket names, sort index and the first
+#           WARMUP_PAGE_SIZE jobs of every listing order are loaded in the
+#           background, spending no more than WARMUP_BUDGET seconds.
+################################################################################
+WARMUP_BUDGET = defaults.DEFAULT_WARMUP_BUDGET
+WARMUP_PAGE_SIZE = defaults.DEFAULT_WARMUP_PAGE_SIZE
+
+
+################################################################################
+#  JOBS - Worker processes
+#           Reports run in WORKER_PROCESSES separate processes with read-only
+#           database connections.  A worker is replaced after WORKER_MAX_TASKS
+#           tasks so a leak in a report can't grow without bound.  A task
+#           with no answer after WORKER_TIMEOUT seconds (its worker died) fails.
+################################################################################
+WORKER_PROCESSES = defaults.DEFAULT_WORKER_PROCESSES
+WORKER_MAX_TASKS = defaults.DEFAULT_WORKER_MAX_TASKS
+WORKER_TIMEOUT = defaults.DEFAULT_WORKER_TIMEOUT
+
+
+################################################################################
+#  JOBS - Event log
+#           Job events are kept in memory (the newest EVENT_BUFFER_SIZE, for
+#           +job/reports events) and written to EVENT_LOG_FILE in batches
+#           every EVENT_FLUSH_INTERVAL seconds.  The file is rotated when it
+#           reaches EVENT_ROTATE_BYTES, keeping EVENT_ROTATE_KEEP old files.
+################################################################################
+EVENT_LOG_FILE = defaults.DEFAULT_EVENT_LOG_FILE
+EVENT_BUFFER_SIZE = defaults.DEFAULT_EVENT_BUFFER_SIZE
+EVENT_FLUSH_INTERVAL = defaults.DEFAULT_EVENT_FLUSH_INTERVAL
+EVENT_ROTATE_BYTES = defaults.DEFAULT_EVENT_ROTATE_BYTES
+EVENT_ROTATE_KEEP = defaults.DEFAULT_EVENT_ROTATE_KEEP
@@ -0,0 +1,181 @@
+"""Jobs background scripts v0.1
+
+JobCompactor - physically removes tombstoned jobs (+job/delete) once they
+               are older than COMPACT_RETENTION_DAYS.  Each tick purges at
+               most COMPACT_BATCH_SIZE jobs so a big backlog of deletions is
+               worked off gradually instead of stalling the server.
+
+JobCleaner   - +job/clean.  Walks every bucket and job in id order, a batch
+               per tick, and drops references to objects that are deleted or
+               aren't characters.  The cursor is saved after each batch so a
+               pass survives reloads; staff can change the batch size and
+               interval while it runs.
+"""
+from datetime import datetime, timedelta
+import evennia as ev
+from typeclasses.scripts import Script
+import jobs_settings as settings
+import jobevents as events
+import jobutils as ju
+from jobindex import JOB_INDEX, TOMBSTONE_CATEGORY, TOMBSTONE_FORMAT
+
+COMPACTOR_KEY = "job_compactor"
+CLEANER_KEY = "job_cleaner"
+
+# attributes holding a single character, a list of them, or a dict keyed by them
+CLEAN_SINGLE = ("assigned_to", "assigned_by", "createdby")
+CLEAN_LISTS = ("tagged", "receivers", "recievers")
+CLEAN_DICTS = ("per_player_actions",)
+
+
+class JobCompactor(Script):
+    """Purges expired job tombstones in rate-limited batches"""
+    def at_script_creation(self):
+        """This is called only when the script is first created"""
+        self.key = COMPACTOR_KEY
+        self.desc = "Purges deleted jobs after %s days" % settings.COMPACT_RETENTION_DAYS
+        self.interval = settings.COMPACT_INTERVAL
+        self.persistent = True
+        self.start_delay = True
+        self.db.purged = 0
+
+    def expired(self, limit):
+        """:return: up to limit tombstoned jobs past the retention window, oldest first"""
+        from world.jobs.job import Job
+        cutoff = datetime.now() - timedelta(days=settings.COMPACT_RETENTION_DAYS)
+        return Job.objects.filter(db_tags__db_category=TOMBSTONE_CATEGORY,
+                                  db_tags__db_key__lt=cutoff.strftime(TOMBSTONE_FORMAT)
+                                  ).order_by("db_tags__db_key")[:limit]
+
+    def purge(self, job):
+        """delete a job along with any Msgs tagged to it"""
+        jid = job.db.jid
+        if jid:
+            ev.Msg.objects.get_by_tag("job:" + jid, category="jobs").delete()
+        JOB_INDEX.remove(job.id)
+        job.invalidate_view()
+        job.delete()
+
+    def at_repeat(self):
+        """purge one batch"""
+        count = 0
+        for job in self.expired(settings.COMPACT_BATCH_SIZE):
+            try:
+                self.purge(job)
+                count += 1
+            except Exception as e:
+                events.failed("purge", e, job=job.db.jid, actor=self)
+        self.db.purged += count
+        if count:
+            events.record("purge", actor=self, msg="%s jobs purged" % count)
+
+
+def ensure_compactor():
+    """start the JobCompactor if it isn't running yet
+
+    :return: the compactor script
+    """
+    found = ev.search_script(COMPACTOR_KEY)
+    if found:
+        return found[0]
+    return ev.create_script(JobCompactor, key=COMPACTOR_KEY, persistent=True)
+
+
+def _is_player(obj):
+    """:return: True if obj is a character that still exists"""
+    return obj is not None and getattr(obj, "pk", None) is not None and ju.ischaracter(obj)
+
+
+def clean_references(obj):
+    """drop references to deleted or non-character objects from a bucket or job
+
+    Deleted objects come back from an Attribute as None, so None is dropped
+    from lists and dicts; a single-valued attribute is reset to False.
+
+    :param obj: Bucket or Job
+    :return: number of references removed
+    """
+    fixed = 0
+    for name in CLEAN_SINGLE:
+        value = obj.attributes.get(name)
+        if value and not _is_player(value):
+            obj.attributes.add(name, False)
+            fixed += 1
+    for name in CLEAN_LISTS:
+        value = obj.attributes.get(name)
+        if value:
+            kept = [item for item in value if _is_player(item)]
+            if len(kept) != len(value):
+                obj.attributes.add(name, kept)
+                fixed += len(value) - len(kept)
+    for name in CLEAN_DICTS:
+        value = obj.attributes.get(name)
+        if value:
+            kept = dict((key, item) for key, item in value.items() if _is_player(key))
+            if len(kept) != len(value):
+                obj.attributes.add(name, kept)
+                fixed += len(value) - len(kept)
+    if fixed:
+        obj.invalidate_view()
+    return fixed
+
+
+class JobCleaner(Script):
+    """Resumable +job/clean pass over every bucket and job"""
+    def at_script_creation(self):
+        """This is called only when the script is first created"""
+        self.key = CLEANER_KEY
+        self.desc = "Removes non-players from job data"
+        self.interval = settings.CLEAN_INTERVAL
+        self.persistent = True
+        self.db.batch_size = settings.CLEAN_BATCH_SIZE
+        self.db.cursor = 0
+        self.db.checked = 0
+        self.db.fixed = 0
+        self.db.total = self.queryset().count()
+        self.db.started = datetime.now()
+
+    def queryset(self):
+        """:return: every bucket and job, in id order"""
+        from world.jobs.bucket import Bucket
+        from world.jobs.job import Job
+        return ev.ChannelDB.objects.filter(db_typeclass_path__in=(Bucket.path, Job.path)).order_by("id")
+
+    def at_repeat(self):
+        """clean the next batch and advance the cursor"""
+        batch = list(self.queryset().filter(id__gt=self.db.cursor)[:self.db.batch_size])
+        if not batch:
+            events.record("clean", actor=self, duration=(datetime.now() - self.db.started).total_seconds(),
+                          msg="finished: %s checked, %s references removed" % (self.db.checked, self.db.fixed))
+            self.stop()
+            return
+        fixed = 0
+        for obj in batch:
+            try:
+                fixed += clean_references(obj)
+            except Exception as e:
+                events.failed("clean", e, job=obj, actor=self)
+        self.db.cursor = batch[-1].id
+        self.db.checked += len(batch)
+        self.db.fixed += fixed
+
+    def throttle(self, batch_size=None, interval=None):
+        """change the pace of a running pass"""
+        if batch_size:
+            self.db.batch_size = batch_size
+        if interval:
+            self.restart(interval=interval)
+
+    def progress(self):
+        """:return: (checked, total, references removed, batch size, interval)"""
+        return self.db.checked, self.db.total, self.db.fixed, self.db.batch_size, self.interval
+
+
+def job_cleaner(start=False):
+    """:return: the running JobCleaner, starting one if start is set (else None)"""
+    found = ev.search_script(CLEANER_KEY)
+    if found:
+        return found[0]
+    if start:
+        return ev.create_script(JobCleaner, key=CLEANER_KEY, persistent=True)
+    return None
@@ -3,25 +3,27 @@
 """Jobs utilities v0.2"""
 import evennia as ev
 import jobs_settings as settings
+from jobindex import BUCKET_NAMES
+from world.utilities.muxparse import split_pair
 
 def argparse(lhs, rhs):
     """
     :param lhs: Arguments from the left side of an = (self.lhs)
     :param rhs: Arguments from the right side of an = (self.rhs)
     :return: argument list (lhs_obj, lhs_act, rhs_obj, rhs_act) or False
+
+    A side is only split if it has a '/' (see world.utilities.muxparse).
     """
-    if '/' in lhs or '/' in rhs:
-        if '/' in lhs:
-            lhs_obj, lhs_act = lhs.split('/')
-        else:
-            lhs_obj, lhs_act = False, False
-        if '/' in rhs:
-            rhs_obj, rhs_act = rhs.split('/')
-        else:
-            rhs_obj, rhs_act = False, False
-        ret = (lhs_obj, lhs_act, rhs_obj, rhs_act)
-    else:
+    lhs_obj, lhs_act = split_pair(lhs)
+    rhs_obj, rhs_act = split_pair(rhs)
+    if lhs_act is False:
+        lhs_obj = False
+    if rhs_act is False:
+        rhs_obj = False
+    if lhs_act is False and rhs_act is False:
         ret = False
+    else:
+        ret = (lhs_obj, lhs_act, rhs_obj, rhs_act)
     return ret
 
 def assign_channel(string):
@@ -70,8 +72,8 @@ def isaccount(string):
     return ev.utils.utils.inherits_from(string, "typeclasses.accounts.Account")
 
 def isbucket(string):
-    """search and return true if obj string is a bucket"""
-    return ev.utils.utils.inherits_from(ev.search_channel(string).first(), "world.jobs.bucket.Bucket")
+    """return true if obj string is a bucket (looked up in the cached bucket name map)"""
+    return BUCKET_NAMES.get(string) is not None
 
 def isjob(string):
     """search and return true if obj string is a job"""
@@ -0,0 +1,195 @@
+"""Jobs worker pool v0.1
+
+Reports read every job in the game, and Evennia runs commands on a single
+reactor thread, so a long report would hold up everyone else's commands.
+Instead a task is handed to a small pool of worker processes:
+
+    run_task("summary").addCallback(show_report)
+
+Tasks are module level functions registered with @task.  Only the task name
+and plain arguments are sent to a worker, and a task must return plain data
+(lists, dicts, strings, numbers) - never typeclassed objects.
+
+Workers are forked from the server when JobWorkerPool starts (see
+server/conf/server_services_plugins.py).  Each one drops the database
+connection it inherited and opens its own, which is switched to read-only, so
+a task can't write to the game's database by accident.  When the pool isn't
+running (tests, or the service was left out) tasks run in a reactor thread.
+
+Workers flush Evennia's object cache before every task, so a report never
+sees data a previous task cached.  A task that gets no answer within
+WORKER_TIMEOUT seconds (its worker died) fails with TaskError.
+"""
+import multiprocessing
+from collections import OrderedDict
+from datetime import datetime
+from twisted.application.service import Service
+from twisted.internet import reactor, threads
+from twisted.internet.defer import Deferred
+import jobs_settings as settings
+import jobevents as events
+from jobindex import TOMBSTONE_CATEGORY
+
+TASKS = OrderedDict()
+
+# statements that make a connection read-only, per database vendor
+READ_ONLY = {"sqlite": "PRAGMA query_only = ON",
+             "postgresql": "SET SESSION CHARACTERISTICS AS TRANSACTION READ ONLY",
+             "mysql": "SET SESSION TRANSACTION READ ONLY", }
+
+
+class TaskError(Exception):
+    """A task raised in a worker; the message holds the worker's traceback"""
+    pass
+
+
+def task(name):
+    """register a function as worker task name"""
+    def _register(func):
+        TASKS[name] = func
+        return func
+    return _register
+
+
+def _read_only(sender, connection, **kwargs):
+    """connection_created handler for workers"""
+    statement = READ_ONLY.get(connection.vendor)
+    if statement:
+        connection.cursor().execute(statement)
+
+
+def _init_worker():
+    """runs once in every worker process"""
+    from django.db import connections
+    from django.db.backends.signals import connection_created
+    # the handles were inherited from the server; close nothing, just forget them
+    for connection in connections.all():
+        connection.connection = None
+    connection_created.connect(_read_only)
+
+
+def _flush_cache():
+    """forget the objects and Attributes cached in this worker by earlier tasks"""
+    from evennia.utils.idmapper.models import flush_cache
+    flush_cache()
+
+
+def _run(name, args, kwargs):
+    """runs a task in a worker
+
+    Exceptions, and results that won't pickle, come back as (False, traceback)
+    so the pool always has a result to hand over: Python 2's Pool has no
+    error_callback, and a failure outside _run would leave the task hanging.
+    """
+    import pickle
+    import traceback
+    try:
+        _flush_cache()
+        result = TASKS[name](*args, **kwargs)
+        pickle.dumps(result, pickle.HIGHEST_PROTOCOL)
+        return True, result
+    except Exception:
+        return False, traceback.format_exc()
+
+
+class JobWorkerPool(Service):
+    """Twisted service owning the worker processes"""
+    name = "JobWorkerPool"
+
+    def __init__(self, processes=None, max_tasks=None):
+        self.processes = processes or settings.WORKER_PROCESSES
+        self.max_tasks = max_tasks or settings.WORKER_MAX_TASKS
+        self.timeout = settings.WORKER_TIMEOUT
+        self.pool = None
+        self.pending = 0
+
+    def startService(self):
+        Service.startService(self)
+        self.pool = multiprocessing.Pool(self.processes, initializer=_init_worker,
+                                         maxtasksperchild=self.max_tasks)
+
+    def stopService(self):
+        Service.stopService(self)
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool = None
+
+    def submit(self, name, *args, **kwargs):
+        """run task name in a worker
+
+        :return: Deferred firing with the task's result, or failing with TaskError
+        """
+        done = Deferred()
+
+        def _finished(result):
+            # called on the pool's result thread
+            reactor.callFromThread(self._deliver, done, result)
+
+        def _timed_out():
+            # no answer at all: the worker died with the task
+            self._deliver(done, (False, "TaskError: %s got no answer in %ss" % (name, self.timeout)))
+
+        def _stop_timer(value):
+            if timer.active():
+                timer.cancel()
+            return value
+
+        self.pending += 1
+        timer = reactor.callLater(self.timeout, _timed_out)
+        done.addBoth(_stop_timer)
+        self.pool.apply_async(_run, (name, args, kwargs), callback=_finished)
+        return done
+
+    def _deliver(self, done, result):
+        if done.called:
+            # answered after it had timed out
+            return
+        self.pending -= 1
+        ok, value = result
+        if ok:
+            done.callback(value)
+        else:
+            error = value.strip().splitlines()[-1]
+            events.record("task", error=error, msg=value, level="error")
+            done.errback(TaskError(error))
+
+
+WORKER_POOL = JobWorkerPool()
+
+
+def run_task(name, *args, **kwargs):
+    """run a registered task off the reactor thread
+
+    :param name: task name, see TASKS
+    :return: Deferred firing with the task's result
+    """
+    if name not in TASKS:
+        raise KeyError("no worker task %s" % name)
+    if WORKER_POOL.running and WORKER_POOL.pool is not None:
+        return WORKER_POOL.submit(name, *args, **kwargs)
+    return threads.deferToThread(TASKS[name], *args, **kwargs)
+
+
+@task("summary")
+def summary_report(now=None):
+    """open jobs per bucket by status, with overdue and unassigned counts
+
+    :return: list of (bucket, total, {status: count}, overdue, unassigned) by bucket name
+    """
+    from world.jobs.job import Job
+    from world.utilities.prefetch import prefetch_attributes
+    now = now or datetime.now()
+    jobs = Job.objects.all().exclude(db_tags__db_category=TOMBSTONE_CATEGORY)
+    values = prefetch_attributes(jobs, ("bucket", "status", "due", "assigned_to"))
+    buckets = {}
+    for attrs in values.values():
+        row = buckets.setdefault(str(attrs.get("bucket") or ""), [0, {}, 0, 0])
+        status = str(attrs.get("status") or "new")
+        row[0] += 1
+        row[1][status] = row[1].get(status, 0) + 1
+        due = attrs.get("due")
+        if due and hasattr(due, "strftime") and due < now:
+            row[2] += 1
+        if not attrs.get("assigned_to"):
+            row[3] += 1
+    return [(bucket,) + tuple(row) for bucket, row in sorted(buckets.items())]
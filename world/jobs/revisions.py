@@ -0,0 +1,93 @@
+"""Jobs message revisions v0.1
+
++job/edit keeps every earlier version of a message for accountability.  A
+message's history is a plain list (so it stores in an Attribute as-is):
+
+    [("full", text), ("delta", ops), ("delta", ops), ..., ("full", text), ...]
+
+Revision 0 is always a full copy.  Every later revision is a delta against the
+one before it, except that every SNAPSHOT_EVERY revisions a full copy is stored
+again, so rebuilding any revision applies at most SNAPSHOT_EVERY - 1 deltas.
+
+A delta is a tuple of (start, end, text) replacements on the previous version,
+in ascending order.  Only the changed region is compared, so an edit to a long
+RP log costs (and stores) about the size of the edit, not of the log.
+
+Each message's history is its own Attribute on the job, keyed by message id in
+REVISION_CATEGORY, so an edit saves only the history of the edited message.
+"""
+from difflib import SequenceMatcher
+import jobs_settings as settings
+
+SNAPSHOT_EVERY = settings.REVISION_SNAPSHOT_EVERY
+REVISION_CATEGORY = "job_revisions"
+
+
+def make_delta(old, new):
+    """:return: delta turning old into new"""
+    # trim the common prefix and suffix so only the edited region is diffed
+    limit = min(len(old), len(new))
+    start = 0
+    while start < limit and old[start] == new[start]:
+        start += 1
+    end = 0
+    while end < limit - start and old[-1 - end] == new[-1 - end]:
+        end += 1
+    a, b = old[start:len(old) - end], new[start:len(new) - end]
+    if not a or not b:
+        return ((start, start + len(a), b),) if a or b else ()
+    ops = SequenceMatcher(None, a, b, autojunk=False).get_opcodes()
+    return tuple((start + i1, start + i2, b[j1:j2]) for tag, i1, i2, j1, j2 in ops if tag != "equal")
+
+
+def apply_delta(text, delta):
+    """:return: text with delta applied"""
+    parts = []
+    pos = 0
+    for start, end, insert in delta:
+        parts.append(text[pos:start])
+        parts.append(insert)
+        pos = end
+    parts.append(text[pos:])
+    return "".join(parts)
+
+
+def add_revision(history, old, new, snapshot_every=SNAPSHOT_EVERY):
+    """record an edit from old to new
+
+    :param history: the message's revision list (may be empty or None)
+    :param old: current text
+    :param new: edited text
+    :return: the updated history
+    """
+    history = list(history or [])
+    if not history:
+        history.append(("full", old))
+    if len(history) % snapshot_every == 0:
+        history.append(("full", new))
+    else:
+        history.append(("delta", make_delta(old, new)))
+    return history
+
+
+def revision(history, number):
+    """rebuild revision number (negative numbers count back from the latest)
+
+    :raise: IndexError if there is no such revision
+    """
+    if number < 0:
+        number += len(history)
+    if not 0 <= number < len(history):
+        raise IndexError("no revision %s" % number)
+    base = number
+    while history[base][0] != "full":
+        base -= 1
+    text = history[base][1]
+    for kind, delta in history[base + 1:number + 1]:
+        text = apply_delta(text, delta)
+    return text
+
+
+def stored_size(history):
+    """:return: characters of text held by a history (snapshots plus inserts)"""
+    return sum(len(data) if kind == "full" else sum(len(op[2]) for op in data) for kind, data in history)
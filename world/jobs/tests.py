@@ -28,6 +28,21 @@ class TestUtilties(EvenniaTest):
         hash_b = pegasus.hash(key="test", string="test")
         self.assertNotEqual(hash_a, hash_b)
 
+    def test_ulid_order(self):
+        """ids sort in creation order and md5 ids map to the same ULID every time"""
+        from datetime import datetime
+        from world.utilities import ulid
+        ids = [ulid.new_id() for n in range(1000)]
+        self.assertEqual(sorted(ids), ids)
+        self.assertEqual(len(ids), len(set(ids)))
+        created = datetime(2018, 4, 8, 22, 0)
+        old = "9e107d9d372bb6826bd81d3542a419d6"
+        self.assertTrue(ulid.is_legacy(old))
+        self.assertEqual(ulid.from_legacy(old, created), ulid.from_legacy(old, created))
+        self.assertEqual(created, ulid.id_time(ulid.from_legacy(old, created)))
+        low, high = ulid.id_range(datetime(2018, 4, 8), datetime(2018, 4, 9))
+        self.assertTrue(low <= ulid.from_legacy(old, created) < high)
+
     def test_parse_args(self):
         """test that parse args returns correct information
         :expected: { stringN: outN, . . .}
@@ -62,6 +77,356 @@ class TestUtilties(EvenniaTest):
         self.assertEqual(expected, actual)
 
 
+    def test_parse_args_escapes(self):
+        """extra slashes and equals signs stay in the text; escapes and quotes protect separators"""
+        from world.utilities.muxparse import parse
+        self.assertEqual(("Code", "a/b c", "x=y", False), parse("Code/a/b c=x=y"))
+        self.assertEqual(("Code", "1/2 price", "Joe", False), parse('Code/"1/2 price"=Joe'))
+        self.assertEqual(("Rp", "a=b", "Joe", False), parse("Rp/a\\=b=Joe"))
+        self.assertFalse(ju.argparse("Code", None))
+        self.assertEqual(("Code", "fix/grid", False, False), ju.argparse("Code/fix/grid", ""))
+
+    def test_parse_date(self):
+        """dateparse handles absolute, relative and weekday forms against a fixed 'now'"""
+        from datetime import datetime
+        from world.utilities import dateparse
+        now = datetime(2018, 4, 11, 12, 0)  # a Wednesday
+
+        self.assertEqual(datetime(2018, 4, 10), dateparse.parse_date("2018-04-10", now))
+        self.assertEqual(datetime(2018, 4, 10), dateparse.parse_date("April 10, 2018", now))
+        self.assertEqual(datetime(2019, 4, 10), dateparse.parse_date("4/10", now))
+        self.assertEqual(datetime(2018, 4, 14, 12), dateparse.parse_date("3 days", now))
+        self.assertEqual(datetime(2018, 6, 11, 12), dateparse.parse_date("2 months", now))
+        self.assertEqual(datetime(2018, 4, 13, 12), dateparse.parse_date("next friday", now))
+        self.assertEqual(None, dateparse.parse_date("2/30/2018", now))
+        self.assertEqual(datetime(2018, 4, 12, 12), dateparse.parse_date("thurs", now))
+        self.assertEqual(None, dateparse.parse_date("month", now))
+        self.assertEqual(datetime(2018, 9, 5), dateparse.parse_date("September 5", now))
+        self.assertEqual(datetime(2018, 9, 5), dateparse.parse_date("sept. 5", now))
+        if dateparse._dateutil_parse is None:
+            self.assertEqual(None, dateparse.parse_date("mayor 5", now))
+        self.assertEqual([2, None, -1], dateparse.days_until_all([datetime(2018, 4, 13, 12), None, "yesterday"], now))
+
+    def test_prefetch_attributes(self):
+        """Attributes of many objects load together, filtered by name and category"""
+        from world.utilities.prefetch import prefetch_attributes
+        channel = create.create_channel("Prefetch", desc="Test channel")
+        self.obj1.db.colour = "red"
+        self.obj1.db.size = 3
+        self.obj2.db.colour = "blue"
+        self.obj1.attributes.add("colour", "green", category="paint")
+        channel.db.colour = "grey"
+        ret = prefetch_attributes([self.obj1, self.obj2, self.room2], ("colour",))
+        self.assertEqual({self.obj1.id: {"colour": "red"}, self.obj2.id: {"colour": "blue"}, self.room2.id: {}}, ret)
+        self.assertEqual({channel.id: {"colour": "grey"}}, prefetch_attributes([channel], ("colour",)))
+        self.assertEqual(3, prefetch_attributes([self.obj1])[self.obj1.id]["size"])
+        self.assertEqual({self.obj1.id: {"colour": "green"}}, prefetch_attributes([self.obj1], category="paint"))
+        self.assertEqual({}, prefetch_attributes([]))
+
+
+class TestJobIndex(EvenniaTest):
+    """tests for the in-memory sort index in `world.jobs.jobindex`"""
+
+    def test_scan_order(self):
+        """scan returns ids in key order for either direction and follows updates"""
+        from world.jobs.jobindex import JobIndex
+        index = JobIndex()
+        index.add(1, {"alpha": "code:b", "date": "20180410000000", "priority": "0:20180410000000"})
+        index.add(2, {"alpha": "build:a", "date": "20180409000000", "priority": "2:20180409000000"})
+        index.add(3, {"alpha": "rp:c", "date": "99999999999999", "priority": "9:99999999999999"})
+
+        self.assertEqual([2, 1, 3], index.scan("alpha", "asc"))
+        self.assertEqual([3, 1, 2], index.scan("alpha", "des"))
+        self.assertEqual([1, 2, 3], index.scan("priority", "asc"))
+        self.assertEqual([1], index.scan("date", "asc", start=1, count=1))
+        self.assertEqual([2, 3], index.scan("date", "asc", allowed=(2, 3)))
+
+        # re-adding a job replaces its old entries
+        index.add(2, {"alpha": "zzz:a", "date": "20180409000000", "priority": "2:20180409000000"})
+        self.assertEqual([1, 3, 2], index.scan("alpha", "asc"))
+        self.assertEqual(3, len(index))
+
+    def test_bucket_sets(self):
+        """the index counts each bucket's jobs and unions buckets into visibility sets"""
+        from world.jobs.jobindex import JobIndex
+        index = JobIndex()
+        index.add(1, {"alpha": "code:b", "date": "20180410000000", "priority": "0:20180410000000"})
+        index.add(2, {"alpha": "build:a", "date": "20180409000000", "priority": "2:20180409000000"})
+        index.add(3, {"alpha": "code:c", "date": "99999999999999", "priority": "9:99999999999999"})
+
+        self.assertEqual(2, index.count("Code"))
+        self.assertEqual(0, index.count("RP"))
+        self.assertEqual(set([1, 2, 3]), index.visible(["code", "Build", "rp"]))
+        # moving a job to another bucket moves it between the sets
+        index.add(3, {"alpha": "rp:c", "date": "99999999999999", "priority": "9:99999999999999"})
+        self.assertEqual(set([3]), index.visible(["rp"]))
+        index.remove(2)
+        self.assertEqual(0, index.count("build"))
+        self.assertNotIn("build", index.buckets)
+
+    def test_snapshot_round_trip(self):
+        """a saved index loads back intact and a changed high-water mark forces a rebuild"""
+        import os
+        import tempfile
+        from world.jobs.jobindex import JobIndex
+        from world.utilities import snapshot
+        index, restored = JobIndex(), JobIndex()
+        index.add(1, {"alpha": "code:b", "date": "20180410000000", "priority": "0:20180410000000"})
+        index.add(2, {"alpha": "build:a", "date": "20180409000000", "priority": "2:20180409000000"})
+        # an index that was never fully built is not snapshotted
+        self.assertIsNone(index.dump())
+        restored.load(None)
+        self.assertFalse(restored.built)
+        index.built = True
+        mark = [1]
+        registry = snapshot.REGISTRY.copy()
+        snapshot.REGISTRY.clear()
+        snapshot.register("test", index.dump, restored.load, lambda: mark[0])
+        path = os.path.join(tempfile.mkdtemp(), "test.snapshot")
+        try:
+            snapshot.save(path)
+            self.assertEqual((["test"], []), snapshot.restore(path))
+            self.assertEqual(index.scan("alpha", "asc"), restored.scan("alpha", "asc"))
+            self.assertEqual(1, restored.count("code"))
+            self.assertTrue(restored.built)
+            self.assertFalse(os.path.exists(path))
+
+            snapshot.save(path)
+            mark[0] = 2
+            self.assertEqual(([], ["test"]), snapshot.restore(path))
+        finally:
+            snapshot.REGISTRY.clear()
+            snapshot.REGISTRY.update(registry)
+
+
+class TestEvents(EvenniaTest):
+    """tests for the structured event log in `world.jobs.jobevents`"""
+
+    def test_tail_and_rotate(self):
+        """tail filters the ring buffer and a full file is rotated before writing"""
+        import os
+        import tempfile
+        from world.jobs.jobevents import EventLog
+        path = os.path.join(tempfile.mkdtemp(), "events.log")
+        events = EventLog(path=path, size=3, rotate_bytes=1, rotate_keep=2)
+        for n in range(4):
+            events.record("create", job="job%s" % n)
+        try:
+            raise ValueError("bad bucket")
+        except ValueError as e:
+            events.failed("create", e, job="job4")
+
+        self.assertEqual(["job2", "job3", "job4"], [event.job for event in events.tail()])
+        self.assertEqual(["ValueError: bad bucket"], [event.error for event in events.tail(level="error")])
+
+        batch, events.pending = events.pending, []
+        events.write(batch[:2])
+        events.write(batch[2:])
+        self.assertTrue(os.path.exists(path + ".1"))
+        self.assertEqual(3, len(open(path).readlines()))
+
+
+class TestWorkers(EvenniaTest):
+    """tests for the report worker pool in `world.jobs.jobworkers`"""
+
+    def test_submit(self):
+        """submit works with Python 2's apply_async and always fires its Deferred"""
+        from world.jobs import jobworkers
+
+        class Pool(object):
+            # the arguments multiprocessing.Pool.apply_async takes on Python 2
+            def apply_async(self, func, args=(), kwds={}, callback=None):
+                callback(func(*args, **kwds))
+
+        class Timer(object):
+            def active(self):
+                return False
+
+        class Reactor(object):
+            def callFromThread(self, func, *args):
+                func(*args)
+
+            def callLater(self, delay, func, *args):
+                return Timer()
+
+        jobworkers.TASKS["test ok"] = lambda n: n * 2
+        jobworkers.TASKS["test unpicklable"] = lambda: (lambda: None)
+        saved = jobworkers.reactor, jobworkers._flush_cache
+        jobworkers.reactor, jobworkers._flush_cache = Reactor(), lambda: None
+        try:
+            pool = jobworkers.JobWorkerPool()
+            pool.pool = Pool()
+            results, errors = [], []
+            pool.submit("test ok", 21).addCallback(results.append)
+            pool.submit("test unpicklable").addErrback(errors.append)
+            self.assertEqual([42], results)
+            self.assertTrue(errors[0].check(jobworkers.TaskError))
+            self.assertEqual(0, pool.pending)
+        finally:
+            jobworkers.reactor, jobworkers._flush_cache = saved
+            del jobworkers.TASKS["test ok"], jobworkers.TASKS["test unpicklable"]
+
+
+class TestJobLog(EvenniaTest):
+    """tests for the background +job/log export in `world.jobs.joblog`"""
+
+    def test_write_export(self):
+        """the export is written in chunks as JSON lines, header first, and only appears when complete"""
+        import json
+        import os
+        import tempfile
+        from world.jobs import joblog
+        header = {"type": "header", "jid": "01C9", "title": "Test job"}
+        messages = [("m%s" % n, "message %s" % n) for n in range(5)]
+        actions = [(0, "created"), (1, "assigned")]
+        path = os.path.join(tempfile.mkdtemp(), "01C9.jsonl")
+        result = joblog.write_export(path, header, messages, actions, chunk_size=2)
+        with open(path) as f:
+            lines = [json.loads(line) for line in f]
+        self.assertEqual((path, os.path.getsize(path)), result)
+        self.assertFalse(os.path.exists(path + ".part"))
+        self.assertEqual(list(joblog.records(header, messages, actions)), lines)
+        self.assertEqual(["header"] + ["msg"] * 5 + ["act"] * 2, [line["type"] for line in lines])
+
+
+class TestMail(EvenniaTest):
+    """tests for the bulk job mail queue in `world.jobs.jobmail`"""
+
+    def test_queue_and_flush(self):
+        """letters are merged per recipient, written in batches and retried until MAX_ATTEMPTS"""
+        from world.jobs import jobmail
+
+        class Timer(object):
+            def active(self):
+                return False
+
+        class Reactor(object):
+            def callLater(self, delay, func, *args):
+                return Timer()
+
+        class Player(object):
+            def __init__(self, objid):
+                self.id = objid
+
+        saved = jobmail.reactor
+        jobmail.reactor = Reactor()
+        try:
+            queue = jobmail.MailQueue(batch_size=2)
+            written = []
+            queue._write = lambda batch: written.append([letter[3].id for letter in batch])
+            players = [Player(objid) for objid in range(3)]
+            self.assertEqual(3, queue.add("Staff", players, "Query", "Please reply."))
+            self.assertEqual(0, queue.add("Staff", players[0], "Query", "Please reply."))
+            self.assertEqual(1, queue.add("Staff", players[0], "Approved", "Done."))
+            self.assertEqual(4, len(queue))
+            self.assertEqual(4, queue.flush())
+            self.assertEqual([[0, 1], [2, 0]], written)
+            self.assertEqual(0, len(queue))
+
+            def fail(batch):
+                raise IOError("database gone")
+            queue._write = fail
+            queue.add("Staff", players[:2], "Query", "Please reply.")
+            for attempt in range(jobmail.MAX_ATTEMPTS):
+                self.assertEqual(0, queue.flush())
+            self.assertEqual(0, len(queue))
+            self.assertEqual(2, queue.dropped)
+            self.assertEqual(4, queue.sent)
+            self.assertEqual({}, queue.attempts)
+        finally:
+            jobmail.reactor = saved
+
+
+class TestCleaner(EvenniaTest):
+    """tests for the +job/clean pass in `world.jobs.jobscripts`"""
+
+    def test_clean_references(self):
+        """deleted objects and non-characters are dropped and characters are kept"""
+        from world.jobs.jobscripts import clean_references
+
+        class Attributes(dict):
+            def add(self, name, value):
+                self[name] = value
+
+        class Holder(object):
+            def __init__(self, **values):
+                self.attributes = Attributes(values)
+                self.invalidated = False
+
+            def invalidate_view(self):
+                self.invalidated = True
+
+        player = create.create_object("typeclasses.characters.Character", key="Player")
+        holder = Holder(assigned_to=self.obj1, createdby=player, tagged=[player, None, self.obj1],
+                        per_player_actions={player: 1, self.obj1: 2})
+        self.assertEqual(4, clean_references(holder))
+        self.assertEqual(False, holder.attributes["assigned_to"])
+        self.assertEqual(player, holder.attributes["createdby"])
+        self.assertEqual([player], holder.attributes["tagged"])
+        self.assertEqual({player: 1}, holder.attributes["per_player_actions"])
+        self.assertTrue(holder.invalidated)
+        clean = Holder(createdby=player, tagged=[player])
+        self.assertEqual(0, clean_references(clean))
+        self.assertFalse(clean.invalidated)
+
+
+class TestViewCache(EvenniaTest):
+    """tests for the bounded job view cache in `world.jobs.jobcache`"""
+
+    def test_get_views(self):
+        """misses are loaded in one call, hits are not loaded again and the cache stays bounded"""
+        from world.jobs import jobcache
+        from world.utilities.lrucache import LRUCache
+
+        class Row(object):
+            def __init__(self, objid):
+                self.id = objid
+                self.key = "row %s" % objid
+
+        loads = []
+
+        def prefetch(objs, names):
+            loads.append([obj.id for obj in objs])
+            return dict((obj.id, {"title": "title %s" % obj.id}) for obj in objs)
+
+        saved = jobcache.prefetch_attributes, jobcache.VIEW_CACHE
+        jobcache.prefetch_attributes, jobcache.VIEW_CACHE = prefetch, LRUCache(maxsize=3)
+        try:
+            rows = [Row(objid) for objid in range(1, 4)]
+            views = jobcache.get_views(rows)
+            self.assertEqual(["title 1", "title 2", "title 3"], [view.db.title for view in views])
+            self.assertEqual(None, views[0].db.due)
+            self.assertEqual([[1, 2, 3]], loads)
+            self.assertEqual(views, jobcache.get_views(rows))
+            self.assertEqual(1, len(loads))
+            jobcache.invalidate(2)
+            jobcache.get_views(rows)
+            self.assertEqual([2], loads[-1])
+            jobcache.get_view(Row(4))
+            self.assertEqual(3, len(jobcache.VIEW_CACHE))
+        finally:
+            jobcache.prefetch_attributes, jobcache.VIEW_CACHE = saved
+
+
+class TestRevisions(EvenniaTest):
+    """tests for delta-compressed message history in `world.jobs.revisions`"""
+
+    def test_revision_round_trip(self):
+        """every revision rebuilds exactly and full copies are only kept periodically"""
+        from world.jobs import revisions
+        versions = ["The mech is parked in bay 1. " * 50]
+        for n in range(2, 25):
+            versions.append(versions[-1].replace("bay %s" % (n - 1), "bay %s" % n, 1))
+        history = []
+        for old, new in zip(versions, versions[1:]):
+            history = revisions.add_revision(history, old, new, snapshot_every=10)
+
+        self.assertEqual(versions, [revisions.revision(history, n) for n in range(len(versions))])
+        self.assertEqual(versions[-1], revisions.revision(history, -1))
+        self.assertEqual(3, len([kind for kind, data in history if kind == "full"]))
+        self.assertEqual(((4, 7, "X"),), revisions.make_delta("The bay", "The X"))
+
+
 class TestBucket(EvenniaTest):
     """Test the Bucket portion of the system"""
 
@@ -272,6 +637,21 @@ class TestJob(EvenniaTest):
         self.assertEqual(expected,actual)
 
     # Todo: def test_per_player_actions
+    def test_tombstone(self):
+        """a tombstoned job leaves the sort index and the job table until it is restored"""
+        from world.jobs.jobindex import JOB_INDEX
+        job = self.test_job
+        job.update_sortkeys()
+        self.assertIn(job.id, JOB_INDEX.keys)
+        job.tombstone()
+        self.assertTrue(job.is_deleted)
+        self.assertNotIn(job.id, JOB_INDEX.keys)
+        self.assertNotIn(job.id, [listed.id for listed in CmdJobs.DefaultTable().jobs])
+        job.restore()
+        self.assertFalse(job.is_deleted)
+        self.assertIn(job.id, JOB_INDEX.keys)
+        self.assertIn(job.id, [listed.id for listed in CmdJobs.DefaultTable().jobs])
+
     def test_assign_job(self):
         """test assigning a job"""
         pass
@@ -292,3 +672,170 @@ class TestJob(EvenniaTest):
         msg = res.pop("msg")
         ret = exit_status, msg
         return ret
+
+
+class TestFate(EvenniaTest):
+    """tests for the Fate dice engine in `world.dev.fate`"""
+
+    def test_odds(self):
+        """every row of ODDS adds up to 1 and shifts past its ends use the end rows"""
+        from world.dev import fate
+        for shift, row in fate.ODDS.items():
+            self.assertAlmostEqual(1.0, sum(row))
+        self.assertEqual(fate.ODDS[fate.FUDGE_DICE + 1], fate.odds(0, 20))
+        self.assertEqual(fate.ODDS[-fate.FUDGE_DICE - 3], fate.odds(20, 0))
+        self.assertEqual((0.0, 0.0, 0.0, 1.0), tuple(fate.odds("legendary", "terrible")))
+        self.assertEqual(fate.odds(3, 2), fate.odds("good", "fair"))
+
+    def test_ladder_name(self):
+        """totals between or past the rungs get the rung at or below them"""
+        from world.dev import fate
+        self.assertEqual("terrible", fate.ladder_name(-2))
+        self.assertEqual("terrible", fate.ladder_name(-20))
+        self.assertEqual("poor", fate.ladder_name(-1))
+        self.assertEqual("legendary", fate.ladder_name(20))
+        for total, name in fate.roll_for([5] * 20):
+            self.assertTrue(1 <= total <= 9)
+            self.assertEqual(fate.ladder_name(total), name)
+
+
+class TestFateSheet(EvenniaTest):
+    """tests for Fate character sheets in `world.dev.fatesheet`"""
+
+    def test_round_trip(self):
+        """a sheet saves and reads back as the fractal it was made from"""
+        from world.dev.fatesheet import FateSheet, FATE_ATTRIBUTE, fate_sheet
+        data = {"aspects": ["Ace pilot", "Owes the Syndicate"],
+                "skills": [("Pilot", 4), ("Shoot", 3)],
+                "stunts": ["Barrel roll"],
+                "stress tracks": [("physical", 3, 0), ("mental", 2, 0)],
+                "consequences": [("mild", "Bruised ribs")]}
+        sheet = FateSheet.from_fractal(self.char1, data)
+        self.assertEqual(data, sheet.as_fractal())
+        self.assertEqual(4, sheet.skill("pilot"))
+        self.assertEqual(0, sheet.skill("cook"))
+        sheet.set_skill("Cook", "fair")
+        self.assertEqual(sheet.record(), self.char1.attributes.get(FATE_ATTRIBUTE))
+        reread = FateSheet(self.char1, self.char1.attributes.get(FATE_ATTRIBUTE))
+        self.assertEqual([("Pilot", 4), ("Shoot", 3), ("Cook", 2)], reread.skills())
+        self.assertEqual(data["aspects"], list(reread.aspects))
+        # a changed Attribute is read again
+        self.char1.attributes.add(FATE_ATTRIBUTE, FateSheet.from_fractal(self.char1, {"aspects": ["New"]}).record())
+        self.assertEqual(("New",), fate_sheet(self.char1).aspects)
+
+    def test_set_skill_range(self):
+        """ratings off the ladder are refused and None removes a skill"""
+        from world.dev import fate
+        from world.dev.fatesheet import FateSheet
+        sheet = FateSheet(self.char1)
+        self.assertRaises(ValueError, sheet.set_skill, "Pilot", fate.LADDER_MAX + 1)
+        self.assertRaises(ValueError, sheet.set_skill, "Pilot", fate.LADDER_MIN - 1)
+        sheet.set_skill("Pilot", fate.LADDER_MIN)
+        self.assertEqual(fate.LADDER_MIN, sheet.skill("pilot", default=None))
+        sheet.set_skill("Pilot", None)
+        self.assertEqual(None, sheet.skill("pilot", default=None))
+        self.assertEqual([], sheet.skills())
+
+    def test_stress(self):
+        """stress boxes are bits: marked once, kept within the track and cleared together"""
+        from world.dev.fatesheet import FateSheet, StressTrack
+        track = StressTrack("physical", 3, 0b1111)
+        self.assertEqual(0b111, track.marked)
+        sheet = FateSheet.from_fractal(self.char1, {"stress tracks": [("physical", 3, 0)]})
+        self.assertTrue(sheet.mark_stress("physical", 2))
+        self.assertFalse(sheet.mark_stress("physical", 2))
+        self.assertFalse(sheet.mark_stress("physical", 4))
+        self.assertFalse(sheet.mark_stress("mental", 1))
+        track = sheet.stress_track("Physical")
+        self.assertEqual(0b010, track.marked)
+        self.assertEqual(1, track.first_free())
+        self.assertEqual(3, track.first_free(2))
+        sheet.set_stress_track("physical", 1)
+        self.assertEqual(0, track.marked)
+        sheet.mark_stress("physical", 1)
+        sheet.clear_stress()
+        self.assertEqual((("physical", 1, 0),), sheet.record()[4])
+
+
+class TestSpatial(EvenniaTest):
+    """tests for the mech position grid in `world.spatial`"""
+
+    def test_grid_matches_scan(self):
+        """within and nearest find what scanning every position finds"""
+        import math
+        import random
+        from world.spatial import SpatialGrid
+
+        class Thing(object):
+            def __init__(self, objid):
+                self.id = objid
+
+        rand = random.Random(42)
+        grid = SpatialGrid(cell_size=10)
+        things = [Thing(objid) for objid in range(200)]
+        for thing in things:
+            grid.move(thing, (rand.uniform(-100, 100), rand.uniform(-100, 100)))
+        # moving again must leave nothing behind in the old cell
+        grid.move(things[0], (500, 500))
+        grid.move(things[1], None)
+        self.assertEqual(199, len(grid))
+
+        def scan(position, radius, exclude=None):
+            found = sorted((math.hypot(x - position[0], y - position[1]), objid)
+                           for objid, (x, y) in grid.positions.items() if objid != exclude)
+            return [(dist, objid) for dist, objid in found if dist <= radius]
+
+        def ids(found):
+            return [(dist, obj.id) for dist, obj in found]
+
+        probes = [(rand.uniform(-150, 150), rand.uniform(-150, 150)) for _ in range(30)] + [(1000, -1000)]
+        for position in probes:
+            for radius in (0, 5, 25, 80, float("inf")):
+                self.assertEqual(scan(position, radius), ids(grid.within(position, radius)))
+            everything = scan(position, float("inf"))
+            self.assertEqual(everything[:5], ids(grid.nearest(position, 5)))
+            self.assertEqual(everything[:1], ids(grid.nearest(position)))
+            for max_range in (3, 30, 300):
+                self.assertEqual(scan(position, max_range)[:5], ids(grid.nearest(position, 5, max_range)))
+        self.assertEqual(scan((0, 0), 50, exclude=2), ids(grid.within((0, 0), 50, exclude=things[2])))
+        self.assertEqual([], grid.within((0, 0), -1))
+        self.assertEqual([], SpatialGrid().within((0, 0), 100))
+        self.assertEqual([], SpatialGrid().nearest((0, 0), 3))
+
+
+class TestArticleParse(EvenniaTest):
+    """tests for natural language command parsing in `world.ArticleParse`"""
+
+    def test_prepositions(self):
+        """the longest preposition wins and sentences without one are split by parse_plain"""
+        from world.ArticleParse import NaturalCommand, Sentence, NO_SENTENCE, grammar, parse_sentence
+        prepositions = NaturalCommand.prepositions
+        self.assertEqual(Sentence(None, "climb", "on top of", "the", "old wall"),
+                         parse_sentence("climb on top of the old wall", prepositions))
+        self.assertEqual(Sentence("the", "apple", "near to", "the", "box"),
+                         parse_sentence("The apple near to the box", prepositions))
+        self.assertEqual(Sentence(None, "walk", "up against", "a", "wall"),
+                         parse_sentence("walk up against a wall", prepositions))
+        self.assertEqual(Sentence("the", "red apple", "from", "the", "tree"),
+                         parse_sentence("the red apple from the tree", prepositions))
+        self.assertEqual(Sentence("an", "apple", None, None, None), parse_sentence("an apple", prepositions))
+        self.assertEqual(Sentence(None, "the", None, None, None), parse_sentence("the", prepositions))
+        self.assertEqual(NO_SENTENCE, parse_sentence("apple!", prepositions))
+        self.assertEqual(NO_SENTENCE, parse_sentence("   ", prepositions))
+        self.assertEqual(Sentence("the", "red apple", None, None, None),
+                         grammar(prepositions).parse_plain("the red apple".split(), "the red apple"))
+        self.assertIs(grammar(prepositions), grammar(list(prepositions)))
+
+    def test_parse_batch(self):
+        """a batch parses in order, once per distinct string, and resolves nouns against a room"""
+        from world.ArticleParse import Sentence, NO_SENTENCE, parse_batch
+        prepositions = ["in", "on", "on top of"]
+        parsed = parse_batch(["Put the apple in the box", "put the apple in the box", None, "crate on top of a shelf"],
+                             prepositions)
+        self.assertEqual([Sentence(None, "put the apple", "in", "the", "box")] * 2 +
+                         [NO_SENTENCE, Sentence(None, "crate", "on top of", "a", "shelf")], parsed)
+        self.assertIs(parsed[0], parsed[1])
+        resolved = parse_batch(["the obj on top of obj2", "obj"], prepositions, location=self.room1)
+        self.assertEqual((Sentence("the", "obj", "on top of", None, "obj2"), (self.obj1.id,), (self.obj2.id,)),
+                         resolved[0])
+        self.assertEqual((Sentence(None, "obj", None, None, None), (self.obj1.id,), None), resolved[1])
@@ -0,0 +1,84 @@
+"""Jobs cache warm-up v0.1
+
+After a start or reload every in-memory structure of the jobs system is
+empty, so the first +jobs or +bucket of the session would pay for building
+all of them at once.  warm_up() builds them ahead of time instead:
+
+    1. the bucket name map (BucketNames)
+    2. the sort index (JobIndex)
+    3. the first page of every sort method and direction, hydrated into the
+       view cache
+
+Each step runs in its own reactor turn so commands keep being served between
+them, and the steps stop once WARMUP_BUDGET seconds have been spent.  A
+structure already restored from a reload snapshot is left as it is.  Anything
+not warmed is simply built on first use, as before.
+"""
+from time import time
+from twisted.internet import reactor
+from twisted.internet.defer import Deferred
+import jobs_settings as settings
+import jobevents as events
+from jobcache import get_views
+from jobindex import BUCKET_NAMES, JOB_INDEX, SORT_DIRECTIONS
+
+
+def _warm_names():
+    if BUCKET_NAMES.names is not None:
+        return "bucket names already loaded"
+    return "%s bucket names" % BUCKET_NAMES.rebuild()
+
+
+def _warm_index():
+    if JOB_INDEX.built:
+        return "index already built"
+    return "%s jobs indexed" % JOB_INDEX.rebuild()
+
+
+def _warm_page(method, direction, size):
+    from world.jobs.job import Job
+    ids = JOB_INDEX.scan(method, direction, count=size)
+    jobs = list(Job.objects.filter(id__in=ids))
+    get_views(jobs)
+    return "%s %s page: %s views" % (method, direction, len(jobs))
+
+
+def warm_up(budget=None, page_size=None):
+    """build the jobs caches in the background
+
+    :param budget: seconds to spend at most (default WARMUP_BUDGET)
+    :param page_size: jobs per warmed page (default WARMUP_PAGE_SIZE)
+    :return: Deferred firing with a list of (step, seconds) timings
+    """
+    budget = settings.WARMUP_BUDGET if budget is None else budget
+    page_size = settings.WARMUP_PAGE_SIZE if page_size is None else page_size
+    steps = [_warm_names, _warm_index]
+    steps += [lambda m=method, d=direction: _warm_page(m, d, page_size)
+              for method in settings.VALID_SORT_METHODS for direction in SORT_DIRECTIONS]
+    done = Deferred()
+    timings = []
+    started = time()
+
+    def run_next():
+        if not steps:
+            done.callback(timings)
+            return
+        if time() - started > budget:
+            events.record("warm-up", level="warn", msg="stopped at budget, %s steps left" % len(steps))
+            done.callback(timings)
+            return
+        step = steps.pop(0)
+        begin = time()
+        try:
+            result = step()
+            elapsed = time() - begin
+            events.record("warm-up", duration=elapsed, msg=result)
+        except Exception as e:
+            result = "failed: %s" % e
+            elapsed = time() - begin
+            events.failed("warm-up", e, duration=elapsed)
+        timings.append((result, elapsed))
+        reactor.callLater(0, run_next)
+
+    reactor.callLater(0, run_next)
+    return done
@@ -0,0 +1,204 @@
+"""
+Noun index for natural language commands
+
+Every noun a NaturalCommand parses has to be matched against the objects around the caller.  Instead of searching
+the room's contents for each noun of each command, a room keeps a NounIndex of the names (keys and aliases) and
+adjectives of everything in it, and both nouns of a sentence are resolved against it in one call:
+
+    first, second = resolve_sentence(caller, sentence)
+
+A noun phrase is matched by its longest trailing run of words that is a name; any words before that are adjectives
+the object must have (obj.db.adjectives, a list of words).  "red apple" finds an object called "red apple", or an
+apple that lists "red" among its adjectives.  If no name matches exactly, names with a word starting with the last
+word of the phrase are tried, much as the default search does.
+
+The index is built the first time it is needed (one query for aliases, one for adjectives) and kept up to date by
+the Room's at_object_receive and at_object_leave hooks, and checked against the room's contents before each use
+for objects created, deleted or renamed in place.  It lives in room.ndb, so it is simply rebuilt after a reload.
+The @name and @alias commands reindex the object they change; code changing aliases or adjectives any other way
+should call refresh(obj).
+"""
+from world.utilities.prefetch import prefetch_attributes
+
+
+def _names(obj, aliases=None):
+    """lower case key and aliases of obj"""
+    if aliases is None:
+        aliases = obj.aliases.all()
+    return set(name.lower() for name in [obj.key] + list(aliases or []))
+
+
+def _adjectives(obj, adjectives=None):
+    """lower case adjectives of obj"""
+    if adjectives is None:
+        adjectives = obj.attributes.get("adjectives")
+    return set(adj.lower() for adj in adjectives or [])
+
+
+class NounIndex(object):
+    """
+    Names and adjectives of the contents of one location, each mapped to the ids of the objects having them.
+    """
+
+    def __init__(self):
+        self.objects = {}
+        self.keys = {}
+        self.names = {}
+        self.adjectives = {}
+        self.words = {}
+
+    def __len__(self):
+        return len(self.objects)
+
+    def add(self, obj, aliases=None, adjectives=None):
+        """
+        Index obj (aliases and adjectives are looked up if not given).
+        """
+        if obj.id in self.objects:
+            self.remove(obj)
+        names = _names(obj, aliases)
+        adjectives = _adjectives(obj, adjectives)
+        self.objects[obj.id] = obj
+        self.keys[obj.id] = obj.key
+        self.words[obj.id] = (names, adjectives)
+        for name in names:
+            self.names.setdefault(name, set()).add(obj.id)
+        for adj in adjectives:
+            self.adjectives.setdefault(adj, set()).add(obj.id)
+
+    def remove(self, obj):
+        """
+        Drop obj from the index.
+        """
+        if self.objects.pop(obj.id, None) is None:
+            return
+        del self.keys[obj.id]
+        names, adjectives = self.words.pop(obj.id)
+        for table, words in ((self.names, names), (self.adjectives, adjectives)):
+            for word in words:
+                ids = table.get(word)
+                if ids is not None:
+                    ids.discard(obj.id)
+                    if not ids:
+                        del table[word]
+
+    def build(self, contents):
+        """
+        Index a whole list of objects, reading all their aliases and adjectives in two queries.
+        """
+        contents = list(contents)
+        aliases = {}
+        if contents:
+            dbclass = contents[0].__dbclass__
+            through = dbclass.db_tags.through
+            rows = through.objects.filter(objectdb_id__in=[obj.id for obj in contents],
+                                          tag__db_tagtype="alias").values_list("objectdb_id", "tag__db_key")
+            for objid, alias in rows:
+                aliases.setdefault(objid, []).append(alias)
+        adjectives = prefetch_attributes(contents, ("adjectives",))
+        for obj in contents:
+            self.add(obj, aliases.get(obj.id, []), adjectives[obj.id].get("adjectives"))
+        return len(self.objects)
+
+    def match(self, phrase):
+        """
+        Objects matching a noun phrase.
+
+        :param phrase: lower case noun, optionally preceded by adjectives
+        :return: set of object ids
+        """
+        words = phrase.split()
+        for start in range(len(words)):
+            ids = self.names.get(" ".join(words[start:]))
+            if ids:
+                return self._with_adjectives(ids, words[:start])
+        if not words:
+            return set()
+        # no exact name: names with a word beginning with the last word
+        ids = set()
+        for name, named in self.names.items():
+            if any(part.startswith(words[-1]) for part in name.split()):
+                ids.update(named)
+        return self._with_adjectives(ids, words[:-1])
+
+    def _with_adjectives(self, ids, adjectives):
+        for adj in adjectives:
+            ids = ids & self.adjectives.get(adj, set())
+            if not ids:
+                break
+        return set(ids)
+
+
+def noun_index(location):
+    """
+    The NounIndex of location, built on first use.
+
+    Objects created straight into the room or deleted don't pass through the move hooks, so the index is checked
+    against the room's (cached) contents and brought up to date first; objects renamed since they were indexed are
+    indexed again.
+    """
+    contents = location.contents
+    index = location.ndb.noun_index
+    if index is None:
+        index = NounIndex()
+        index.build(contents)
+        location.ndb.noun_index = index
+        return index
+    present = dict((obj.id, obj) for obj in contents)
+    if len(present) != len(index.objects) or any(objid not in index.objects for objid in present):
+        for objid in [objid for objid in index.objects if objid not in present]:
+            index.remove(index.objects[objid])
+        for objid, obj in present.items():
+            if objid not in index.objects:
+                index.add(obj)
+    for objid, obj in present.items():
+        if index.keys[objid] != obj.key:
+            index.add(obj)
+    return index
+
+
+def refresh(obj):
+    """
+    Reindex obj in its location (after a rename or a change of aliases or adjectives).
+    """
+    location = obj.location
+    if location is not None and location.ndb.noun_index is not None:
+        location.ndb.noun_index.add(obj)
+
+
+def resolve(caller, phrases):
+    """
+    Resolve noun phrases against the caller's location and inventory in one pass.
+
+    :param caller: object issuing the command
+    :param phrases: noun phrases (None entries are passed through)
+    :return: list with a list of matching objects (or None) per phrase, the caller's own items first
+    """
+    location = caller.location
+    index = noun_index(location) if location is not None else NounIndex()
+    # the inventory is small and its handlers are cached, so it is indexed on the spot
+    carried = NounIndex()
+    if any(phrases):
+        for obj in caller.contents:
+            carried.add(obj)
+    ret = []
+    for phrase in phrases:
+        if not phrase:
+            ret.append(None)
+            continue
+        phrase = phrase.lower()
+        found = [carried.objects[objid] for objid in sorted(carried.match(phrase))]
+        found += [index.objects[objid] for objid in sorted(index.match(phrase)) if objid != caller.id]
+        # never hand back an object deleted or moved away since it was indexed
+        ret.append([obj for obj in found if obj.pk and obj.location in (location, caller)])
+    return ret
+
+
+def resolve_sentence(caller, sentence):
+    """
+    Resolve both nouns of a parsed Sentence.
+
+    :return: (objects matching noun1 or None, objects matching noun2 or None)
+    """
+    first, second = resolve(caller, (sentence.noun1, sentence.noun2))
+    return first, second
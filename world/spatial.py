@@ -0,0 +1,286 @@
+"""
+Mech positions
+
+Rooms that are part of the battlefield have map coordinates, an (x, y) pair in their "coords" Attribute (set them
+with set_room_coords so mechs already there move with the room).  A mech is at the coordinates of the room it is in.
+
+Every mech's position is kept in one SpatialGrid: a dict of square cells, CELL_SIZE map units across, each holding
+the mechs inside it.  Range and nearest-target queries only look at the cells that can hold an answer, so they cost
+the same whether the map has ten mechs or a thousand and never walk the room graph:
+
+    in_range(mech, 20)          -> [(distance, mech), ...] nearest first
+    nearest_targets(mech, 3)    -> the three nearest other mechs, with their distances
+    distance(mech, other)       -> map units, or None if either isn't on the map
+
+The grid is built from the database the first time it is used (one query for the mechs, one for their rooms'
+coordinates) and kept up to date by the Mech move and delete hooks.  It is only kept in memory, so it is rebuilt
+after a reload.
+
+Run this module to time the grid against scanning every mech.
+"""
+import math
+from world.utilities.prefetch import prefetch_attributes
+
+COORDS_ATTRIBUTE = "coords"
+CELL_SIZE = 10
+MAX_SCAN_RANGE = 1000   # furthest a scan reaches, map units
+MECH_TYPECLASS = "typeclasses.mech.Mech"
+
+_grid = []   # the SpatialGrid of every mech, once built
+
+
+class SpatialGrid(object):
+    """
+    Objects at (x, y) positions, bucketed into square cells.
+    """
+
+    def __init__(self, cell_size=CELL_SIZE):
+        self.cell_size = cell_size
+        self.positions = {}
+        self.objects = {}
+        self.cells = {}
+        self.bounds = None   # lowest and highest cell ever used, (x0, y0, x1, y1)
+
+    def __len__(self):
+        return len(self.positions)
+
+    def _cell(self, position):
+        return int(math.floor(position[0] / float(self.cell_size))), \
+            int(math.floor(position[1] / float(self.cell_size)))
+
+    def position(self, obj):
+        """obj's (x, y), or None if it isn't in the grid"""
+        return self.positions.get(obj.id)
+
+    def move(self, obj, position):
+        """
+        Put obj at position; None takes it out of the grid.
+        """
+        self.remove(obj)
+        if position is None:
+            return
+        position = (float(position[0]), float(position[1]))
+        self.positions[obj.id] = position
+        self.objects[obj.id] = obj
+        cell = self._cell(position)
+        self.cells.setdefault(cell, set()).add(obj.id)
+        if self.bounds is None:
+            self.bounds = cell + cell
+        else:
+            x0, y0, x1, y1 = self.bounds
+            self.bounds = min(x0, cell[0]), min(y0, cell[1]), max(x1, cell[0]), max(y1, cell[1])
+
+    def remove(self, obj):
+        position = self.positions.pop(obj.id, None)
+        if position is None:
+            return
+        del self.objects[obj.id]
+        cell = self._cell(position)
+        ids = self.cells[cell]
+        ids.discard(obj.id)
+        if not ids:
+            del self.cells[cell]
+
+    def _ring(self, center, ring):
+        """ids in the cells ring steps (Chebyshev distance) from center"""
+        cx, cy = center
+        if ring == 0:
+            return self.cells.get(center, ())
+        ret = []
+        for x in range(cx - ring, cx + ring + 1):
+            for y in (cy - ring, cy + ring):
+                ret.extend(self.cells.get((x, y), ()))
+        for y in range(cy - ring + 1, cy + ring):
+            for x in (cx - ring, cx + ring):
+                ret.extend(self.cells.get((x, y), ()))
+        return ret
+
+    def _distance(self, objid, position):
+        x, y = self.positions[objid]
+        return math.hypot(x - position[0], y - position[1])
+
+    def within(self, position, radius, exclude=None):
+        """
+        Everything within radius of position.
+
+        :param exclude: object to leave out (usually the one asking)
+        :return: [(distance, obj)], nearest first
+        """
+        if not self.positions or radius < 0:
+            return []
+        skip = exclude.id if exclude is not None else None
+        ret = []
+        if math.isinf(radius):
+            cells = list(self.cells.values())
+        else:
+            low, high = self._cell((position[0] - radius, position[1] - radius)), \
+                self._cell((position[0] + radius, position[1] + radius))
+            # no need to look past the cells anything was ever put in
+            x0, y0, x1, y1 = self.bounds
+            low, high = (max(low[0], x0), max(low[1], y0)), (min(high[0], x1), min(high[1], y1))
+            if (high[0] - low[0] + 1) * (high[1] - low[1] + 1) > len(self.cells):
+                cells = [ids for (x, y), ids in self.cells.items()
+                         if low[0] <= x <= high[0] and low[1] <= y <= high[1]]
+            else:
+                cells = [self.cells.get((x, y), ()) for x in range(low[0], high[0] + 1)
+                         for y in range(low[1], high[1] + 1)]
+        for ids in cells:
+            for objid in ids:
+                if objid != skip:
+                    dist = self._distance(objid, position)
+                    if dist <= radius:
+                        ret.append((dist, objid))
+        ret.sort()
+        return [(dist, self.objects[objid]) for dist, objid in ret]
+
+    def nearest(self, position, count=1, max_range=None, exclude=None):
+        """
+        The count objects nearest to position.
+
+        Rings of cells are searched outwards from position's cell; after ring r everything within r cells' width
+        has been seen, so the search stops once count objects at least that close are found.
+
+        :return: [(distance, obj)], nearest first
+        """
+        if not self.positions:
+            return []
+        center = self._cell(position)
+        # no cell further out than this holds anything
+        x0, y0, x1, y1 = self.bounds
+        last = max(center[0] - x0, x1 - center[0], center[1] - y0, y1 - center[1], 0)
+        if max_range is not None and not math.isinf(max_range):
+            last = min(last, int(max_range // self.cell_size) + 1)
+        skip = exclude.id if exclude is not None else None
+        found = []
+        for ring in range(last + 1):
+            found.extend((self._distance(objid, position), objid) for objid in self._ring(center, ring)
+                         if objid != skip)
+            found.sort()
+            if len(found) >= count and found[count - 1][0] <= ring * self.cell_size:
+                break
+        if max_range is not None:
+            found = [pair for pair in found if pair[0] <= max_range]
+        return [(dist, self.objects[objid]) for dist, objid in found[:count]]
+
+
+def room_coords(room):
+    """(x, y) of room, or None if it isn't on the map"""
+    if room is None:
+        return None
+    coords = room.attributes.get(COORDS_ATTRIBUTE)
+    return tuple(coords) if coords else None
+
+
+def mech_grid():
+    """
+    The SpatialGrid of every mech, built on first use.
+    """
+    if not _grid:
+        from typeclasses.mech import Mech
+        grid = SpatialGrid()
+        mechs = [mech for mech in Mech.objects.all() if mech.location is not None]
+        rooms = dict((mech.location.id, mech.location) for mech in mechs)
+        coords = prefetch_attributes(list(rooms.values()), (COORDS_ATTRIBUTE,))
+        for mech in mechs:
+            grid.move(mech, coords[mech.location.id].get(COORDS_ATTRIBUTE))
+        _grid.append(grid)
+    return _grid[0]
+
+
+def mech_moved(mech):
+    """Update mech's position after it moves (Mech.at_after_move)."""
+    if _grid:
+        _grid[0].move(mech, room_coords(mech.location))
+
+
+def mech_removed(mech):
+    """Forget a mech that is being deleted."""
+    if _grid:
+        _grid[0].remove(mech)
+
+
+def set_room_coords(room, coords):
+    """
+    Put room on the map at coords, (x, y), or take it off with None; mechs in the room move with it.
+    """
+    room.attributes.add(COORDS_ATTRIBUTE, tuple(coords) if coords else None)
+    if _grid:
+        for obj in room.contents:
+            if obj.is_typeclass(MECH_TYPECLASS, exact=False):
+                _grid[0].move(obj, coords)
+
+
+def distance(obj, other):
+    """map distance between two mechs, None if either isn't on the map"""
+    grid = mech_grid()
+    here, there = grid.position(obj), grid.position(other)
+    if here is None or there is None:
+        return None
+    return math.hypot(here[0] - there[0], here[1] - there[1])
+
+
+def in_range(obj, radius):
+    """
+    Every other mech within radius of obj.
+
+    :return: [(distance, mech)], nearest first; empty if obj isn't on the map
+    """
+    grid = mech_grid()
+    position = grid.position(obj)
+    if position is None:
+        return []
+    return grid.within(position, radius, exclude=obj)
+
+
+def nearest_targets(obj, count=1, max_range=None):
+    """
+    The count other mechs nearest to obj.
+
+    :return: [(distance, mech)], nearest first
+    """
+    grid = mech_grid()
+    position = grid.position(obj)
+    if position is None:
+        return []
+    return grid.nearest(position, count, max_range, exclude=obj)
+
+
+def benchmark(mechs=500, size=1000, radius=30, number=200):
+    """
+    Time range and nearest queries on the grid against scanning every mech.
+
+    :param mechs: number of mechs, placed at random on a size x size map
+    :return: {name: seconds per query}
+    """
+    import random
+    from timeit import timeit
+
+    class Dummy(object):
+        def __init__(self, objid):
+            self.id = objid
+
+    grid = SpatialGrid()
+    objs = [Dummy(objid) for objid in range(mechs)]
+    for obj in objs:
+        grid.move(obj, (random.uniform(0, size), random.uniform(0, size)))
+    probes = [(random.uniform(0, size), random.uniform(0, size)) for _ in range(number)]
+
+    def scan_within():
+        for x, y in probes:
+            sorted((math.hypot(px - x, py - y), objid) for objid, (px, py) in grid.positions.items()
+                   if math.hypot(px - x, py - y) <= radius)
+
+    def scan_nearest():
+        for x, y in probes:
+            min((math.hypot(px - x, py - y), objid) for objid, (px, py) in grid.positions.items())
+
+    ret = {"scan, within %s" % radius: timeit(scan_within, number=1) / number,
+           "grid, within %s" % radius: timeit(lambda: [grid.within(p, radius) for p in probes], number=1) / number,
+           "scan, nearest": timeit(scan_nearest, number=1) / number,
+           "grid, nearest": timeit(lambda: [grid.nearest(p) for p in probes], number=1) / number}
+    return ret
+
+
+if __name__ == "__main__":
+    for name, seconds in sorted(benchmark().items()):
+        print("%-20s %.3f us" % (name, seconds * 1e6))
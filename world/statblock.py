@@ -0,0 +1,138 @@
+"""
+Character stat blocks
+
+A character's abilities are kept together in one Attribute, "stats", as a tuple in the fixed order of STAT_FIELDS,
+and handled in memory as a StatBlock: a small integer array with a typed accessor per ability.
+
+    block = stat_block(character)
+    block.strength            -> 5
+    block.agility = 6         (saved at once, as one Attribute write)
+    block.update(magic=3, strength=4)
+
+stat_block() caches the block in the character's ndb, so reading abilities after the first time doesn't touch the
+database.  load_stat_blocks() loads the blocks of many characters with one query, and room_stat_blocks() does that
+for everyone in a room, e.g. at the start of a combat round.
+
+Characters made before stat blocks have their abilities in separate Attributes (strength, agility, magic); those are
+read once and moved into a block the first time the character is loaded.
+"""
+from array import array
+from world.utilities.prefetch import prefetch_attributes
+
+STAT_ATTRIBUTE = "stats"
+STAT_FIELDS = ("strength", "agility", "magic")
+STAT_DEFAULTS = (5, 4, 2)
+STAT_TYPECODE = "h"   # signed 16 bit
+STAT_INDEX = dict((name, index) for index, name in enumerate(STAT_FIELDS))
+CHARACTER_TYPECLASS = "typeclasses.characters.Character"
+
+
+def _stat(index):
+    """typed accessor for the ability at index"""
+    def _get(self):
+        return self.values[index]
+
+    def _set(self, value):
+        self.values[index] = int(value)
+        self.save()
+    return property(_get, _set, doc="%s (int)" % STAT_FIELDS[index])
+
+
+class StatBlock(object):
+    """
+    The abilities of one character.
+    """
+    __slots__ = ("obj", "values")
+
+    def __init__(self, obj, values=None):
+        self.obj = obj
+        self.values = array(STAT_TYPECODE, [int(value) for value in (values or STAT_DEFAULTS)])
+        if len(self.values) != len(STAT_FIELDS):
+            raise ValueError("a stat block holds %s values, not %s" % (len(STAT_FIELDS), len(self.values)))
+
+    strength = _stat(STAT_INDEX["strength"])
+    agility = _stat(STAT_INDEX["agility"])
+    magic = _stat(STAT_INDEX["magic"])
+
+    def __iter__(self):
+        return iter(self.values)
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, name):
+        """block["strength"] or block[0]"""
+        return self.values[STAT_INDEX[name] if name in STAT_INDEX else name]
+
+    def as_dict(self):
+        return dict(zip(STAT_FIELDS, self.values))
+
+    def update(self, **stats):
+        """Set several abilities with a single save."""
+        for name, value in stats.items():
+            self.values[STAT_INDEX[name]] = int(value)
+        self.save()
+
+    def save(self):
+        """Write the block to the character's stats Attribute."""
+        self.obj.attributes.add(STAT_ATTRIBUTE, tuple(self.values))
+
+
+def _make(obj, attrs):
+    """
+    Build obj's block from its loaded Attributes, moving separate legacy Attributes into a block.
+
+    An object with neither gets a default block that is only saved once something changes it, so loading blocks
+    (e.g. for a combat round) never writes to the database by itself.
+    """
+    values = attrs.get(STAT_ATTRIBUTE)
+    if values is not None:
+        return StatBlock(obj, values)
+    block = StatBlock(obj, [default if attrs.get(name) is None else attrs[name]
+                            for name, default in zip(STAT_FIELDS, STAT_DEFAULTS)])
+    legacy = [name for name in STAT_FIELDS if name in attrs]
+    if legacy:
+        block.save()
+        for name in legacy:
+            obj.attributes.remove(name)
+    return block
+
+
+def stat_block(obj):
+    """
+    The StatBlock of obj, loaded on first use and then kept in obj.ndb.
+    """
+    block = obj.ndb.stat_block
+    if block is None:
+        block = obj.ndb.stat_block = load_stat_blocks([obj])[obj.id]
+    return block
+
+
+def load_stat_blocks(objs):
+    """
+    Load the stat blocks of many characters with one query.
+
+    :param objs: iterable of characters
+    :return: {obj.id: StatBlock}
+    """
+    objs = list(objs)
+    loaded = prefetch_attributes(objs, (STAT_ATTRIBUTE,) + STAT_FIELDS)
+    ret = {}
+    for obj in objs:
+        block = ret[obj.id] = _make(obj, loaded[obj.id])
+        obj.ndb.stat_block = block
+    return ret
+
+
+def room_stat_blocks(room):
+    """
+    The stat blocks of every character in room, loading any not yet in memory with one query.
+
+    :return: {character id: StatBlock}
+    """
+    characters = [obj for obj in room.contents if obj.is_typeclass(CHARACTER_TYPECLASS, exact=False)]
+    ret = dict((obj.id, obj.ndb.stat_block) for obj in characters if obj.ndb.stat_block is not None)
+    missing = [obj for obj in characters if obj.id not in ret]
+    if missing:
+        ret.update(load_stat_blocks(missing))
+    return ret
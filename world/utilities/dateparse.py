@@ -0,0 +1,237 @@
+"""Natural language date parsing for Pegasus Project systems
+
+Understands:
+
+    absolute dates  - 2018-04-10, 2018-04-10 18:30, 4/10/2018, 4/10,
+                      April 10, 2018, 10 apr 2018, apr 10
+    keywords        - now, today, tomorrow, yesterday
+    relative dates  - 3 days, in 2 weeks, 6 hours from now, 1 month ago, a year
+    weekdays        - friday, next friday, this monday, last tuesday
+
+The interval words are those of the jobs VALID_TIMEOUT_INTERVALS (hours, days,
+months, years) plus minutes and weeks, singular or plural.
+
+A string is parsed once into a plan that doesn't depend on the current time and
+the plan is kept in an LRU cache, so parsing the same string again only costs
+resolving the plan against 'now'.  Anything the patterns don't cover is handed
+to dateutil when it is installed; those plans are not cached, since dateutil
+fills in whatever the string leaves out from today's date.
+"""
+import re
+from datetime import datetime, timedelta
+from calendar import monthrange
+from world.utilities.lrucache import LRUCache
+
+try:
+    from dateutil.parser import parse as _dateutil_parse
+except ImportError:
+    _dateutil_parse = None
+
+__author__ = "Jamie Crosby"
+__copyright__ = "Copyright 2018, The Pegasus Project"
+__credits__ = ["Jamie Crosby",]
+__license__ = "GPLv3"
+__version__ = "0.1"
+__maintainer__ = "Jamie Crosby"
+__email__ = "taladan@gmail.com"
+__status__ = "Prototype"
+
+MONTHS = ("jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec")
+WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+# full names and the usual abbreviations, so "mayor" is not a month and "month" or "sunny" not a weekday
+MONTH_NAMES = (r"jan(?:uary)?", r"feb(?:ruary)?", r"mar(?:ch)?", r"apr(?:il)?", r"may", r"june?", r"july?",
+               r"aug(?:ust)?", r"sep(?:t|tember)?", r"oct(?:ober)?", r"nov(?:ember)?", r"dec(?:ember)?")
+WEEKDAY_NAMES = (r"mon(?:day)?", r"tue(?:s|sday)?", r"wed(?:s|nesday)?", r"thu(?:r|rs|rsday)?",
+                 r"fri(?:day)?", r"sat(?:urday)?", r"sun(?:day)?")
+NUMBERS = {"a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6,
+           "seven": 7, "eight": 8, "nine": 9, "ten": 10, "twelve": 12}
+INTERVALS = {"minute": "minutes", "min": "minutes", "hour": "hours", "hr": "hours", "day": "days",
+             "week": "weeks", "wk": "weeks", "month": "months", "mo": "months", "year": "years",
+             "yr": "years"}
+KEYWORDS = {"now": 0, "today": 0, "tomorrow": 1, "yesterday": -1}
+NEVER = ("none", "never", "no", "-1")
+
+_SUFFIX = r"(?:st|nd|rd|th)?"
+_MONTH = r"(?P<month>" + "|".join(MONTH_NAMES) + r")\.?"
+_TIME = r"(?:[ t@]+(?P<hour>\d{1,2}):(?P<minute>\d{2})(?::(?P<second>\d{2}))?)?"
+
+ISO_RE = re.compile(r"^(?P<year>\d{4})-(?P<month>\d{1,2})-(?P<day>\d{1,2})" + _TIME + r"$")
+SLASH_RE = re.compile(r"^(?P<month>\d{1,2})/(?P<day>\d{1,2})(?:/(?P<year>\d{2}|\d{4}))?" + _TIME + r"$")
+MONTH_DAY_RE = re.compile(r"^" + _MONTH + r"\s+(?P<day>\d{1,2})" + _SUFFIX +
+                          r"(?:,?\s+(?P<year>\d{4}))?" + _TIME + r"$")
+DAY_MONTH_RE = re.compile(r"^(?P<day>\d{1,2})" + _SUFFIX + r"\s+(?:of\s+)?" + _MONTH +
+                          r"(?:,?\s+(?P<year>\d{4}))?" + _TIME + r"$")
+RELATIVE_RE = re.compile(r"^(?:in\s+)?(?P<amount>\d+|" + "|".join(NUMBERS) + r")\s+(?P<unit>" +
+                         "|".join(sorted(INTERVALS, key=len, reverse=True)) +
+                         r")s?(?:\s+(?P<dir>from now|later|ago))?$")
+WEEKDAY_RE = re.compile(r"^(?:(?P<mode>next|this|last)\s+)?(?P<weekday>" + "|".join(WEEKDAY_NAMES) + r")$")
+SPACE_RE = re.compile(r"\s+")
+
+PLAN_CACHE = LRUCache(maxsize=512)
+
+
+def _int(value, default=0):
+    return int(value) if value else default
+
+
+def _absolute(match):
+    """build an absolute plan from a date match, None if it isn't a real date"""
+    groups = match.groupdict()
+    month = groups["month"]
+    month = int(month) if month.isdigit() else MONTHS.index(month[:3]) + 1
+    day = int(groups["day"])
+    year = groups.get("year")
+    clock = _int(groups.get("hour")), _int(groups.get("minute")), _int(groups.get("second"))
+    if year and len(year) == 2:
+        year = "20" + year
+    try:
+        # validate the calendar date now so bad dates never reach the cache as plans
+        datetime(int(year) if year else 2000, month, day, *clock)
+    except ValueError:
+        return None
+    if year:
+        return ("abs", int(year), month, day) + clock
+    return ("md", month, day) + clock
+
+
+def _plan(string):
+    """parse a normalised string into a plan tuple, or None"""
+    if string in KEYWORDS:
+        return "rel", KEYWORDS[string], "days"
+    for regex in (ISO_RE, SLASH_RE, MONTH_DAY_RE, DAY_MONTH_RE):
+        match = regex.match(string)
+        if match:
+            return _absolute(match)
+    match = RELATIVE_RE.match(string)
+    if match:
+        amount = match.group("amount")
+        amount = NUMBERS[amount] if amount in NUMBERS else int(amount)
+        if match.group("dir") == "ago":
+            amount = -amount
+        return "rel", amount, INTERVALS[match.group("unit")]
+    match = WEEKDAY_RE.match(string)
+    if match:
+        return "wday", WEEKDAYS.index(match.group("weekday")[:3]), match.group("mode")
+    return None
+
+
+def _fallback_plan(string):
+    """dateutil's reading of string as an absolute plan, or None"""
+    try:
+        parsed = _dateutil_parse(string)
+    except (ValueError, OverflowError):
+        return None
+    return ("abs", parsed.year, parsed.month, parsed.day, parsed.hour, parsed.minute, parsed.second)
+
+
+def plan(string):
+    """:return: the cached plan for string (None if it is not a date)"""
+    key = SPACE_RE.sub(" ", str(string).strip().lower())
+    ret = PLAN_CACHE.get(key, False)
+    if ret is False:
+        ret = _plan(key)
+        if ret is None and _dateutil_parse is not None:
+            # dateutil's plans have today's year and month in them, so they aren't kept
+            return _fallback_plan(key)
+        PLAN_CACHE.set(key, ret)
+    return ret
+
+
+def add_interval(start, amount, unit):
+    """add amount units (minutes, hours, days, weeks, months, years) to start
+
+    Months and years are calendar steps; the day is clamped to the length of
+    the target month (Jan 31 + 1 month = Feb 28/29).
+    """
+    unit = INTERVALS.get(unit.rstrip("s"), unit)
+    if unit in ("months", "years"):
+        months = start.month - 1 + (amount * 12 if unit == "years" else amount)
+        year, month = start.year + months // 12, months % 12 + 1
+        return start.replace(year=year, month=month, day=min(start.day, monthrange(year, month)[1]))
+    return start + timedelta(**{unit: amount})
+
+
+def resolve(plan, now=None):
+    """turn a plan into a datetime relative to now"""
+    now = now or datetime.now()
+    kind = plan[0]
+    if kind == "abs":
+        return datetime(*plan[1:])
+    if kind == "md":
+        ret = datetime(now.year, *plan[1:])
+        # no year given: the next time that date comes around
+        if ret.date() < now.date():
+            ret = ret.replace(year=now.year + 1)
+        return ret
+    if kind == "rel":
+        return add_interval(now, plan[1], plan[2])
+    # weekdays: bare and 'next' look forward, 'this' includes today, 'last' looks back
+    weekday, mode = plan[1], plan[2]
+    offset = (weekday - now.weekday()) % 7
+    if mode == "last":
+        offset = offset - 7 if offset else -7
+    elif mode != "this" and offset == 0:
+        offset = 7
+    return now + timedelta(days=offset)
+
+
+def parse_date(string, now=None):
+    """parse string into a datetime
+
+    :param string: any of the forms in the module docstring
+    :param now: datetime to resolve relative dates against (default: now)
+    :return: datetime or None if string is not a date
+    """
+    ret = plan(string)
+    if ret is not None:
+        try:
+            ret = resolve(ret, now)
+        except (ValueError, OverflowError):
+            ret = None
+    return ret
+
+
+def is_never(string):
+    """:return: True if string asks to clear a date ('none', 'never', ...)"""
+    return str(string).strip().lower() in NEVER
+
+
+def _as_date(date, now):
+    return date if isinstance(date, datetime) else parse_date(date, now)
+
+
+def days_until(date, now=None):
+    """:return: whole days from now until date (negative once past), None if not a date"""
+    now = now or datetime.now()
+    date = _as_date(date, now)
+    return (date - now).days if date else None
+
+
+def days_past(date, now=None):
+    """:return: whole days since date (negative if still ahead), None if not a date"""
+    now = now or datetime.now()
+    date = _as_date(date, now)
+    return (now - date).days if date else None
+
+
+def _days_all(dates, now, sign):
+    now = now or datetime.now()
+    ret = []
+    for date in dates:
+        date = _as_date(date, now) if date else None
+        ret.append(((date - now) if sign > 0 else (now - date)).days if date else None)
+    return ret
+
+
+def days_until_all(dates, now=None):
+    """days_until for a whole page of dates, sharing one 'now'
+
+    :param dates: iterable of datetimes or date strings (falsy entries allowed)
+    :return: list of ints (None where there is no date)
+    """
+    return _days_all(dates, now, 1)
+
+
+def days_past_all(dates, now=None):
+    """days_past for a whole page of dates, sharing one 'now'"""
+    return _days_all(dates, now, -1)
@@ -0,0 +1,75 @@
+"""Size-bounded LRU cache for Pegasus Project systems
+
+"""
+from collections import OrderedDict
+
+__author__ = "Jamie Crosby"
+__copyright__ = "Copyright 2018, The Pegasus Project"
+__credits__ = ["Jamie Crosby",]
+__license__ = "GPLv3"
+__version__ = "0.1"
+__maintainer__ = "Jamie Crosby"
+__email__ = "taladan@gmail.com"
+__status__ = "Prototype"
+
+_MISSING = object()
+
+
+class LRUCache(object):
+    """dict-like cache that forgets its least recently used entry once full
+
+    Hits and misses are counted so callers can report how well the cache is
+    doing with stats().
+    """
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.data)
+
+    def __contains__(self, key):
+        return key in self.data
+
+    def get(self, key, default=None):
+        """:return: cached value for key (marking it recently used) or default"""
+        value = self.data.pop(key, _MISSING)
+        if value is _MISSING:
+            self.misses += 1
+            return default
+        self.data[key] = value
+        self.hits += 1
+        return value
+
+    def set(self, key, value):
+        """store value under key, evicting the oldest entry if full"""
+        self.data.pop(key, None)
+        self.data[key] = value
+        while len(self.data) > self.maxsize:
+            self.data.popitem(last=False)
+        return value
+
+    def pop(self, key, default=None):
+        """remove key from the cache"""
+        return self.data.pop(key, default)
+
+    def clear(self):
+        """empty the cache and reset the counters"""
+        self.data.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def hit_rate(self):
+        """:return: hits / lookups as a float (0.0 before any lookup)"""
+        lookups = self.hits + self.misses
+        return float(self.hits) / lookups if lookups else 0.0
+
+    def stats(self):
+        """:return: dict of size, maxsize, hits, misses and hit_rate"""
+        return {"size": len(self.data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hit_rate(), }
@@ -0,0 +1,169 @@
+"""MUX argument tokenizer for Pegasus Project systems
+
+Commands across the project take arguments of the form
+
+    noun/verb=noun/verb
+
+parse() splits such a string into a MuxArgs tuple, (lhs_noun, lhs_verb,
+rhs_noun, rhs_verb), with False for any part that isn't there:
+
+    parse("Code/Fix the grid=Taladan")  ->  ("Code", "Fix the grid", "Taladan", False)
+
+Only the first '=' and the first '/' of each side split; anything after them
+is kept as text, so a title or message may contain both.  A backslash escapes
+the next character and double quotes protect what they enclose:
+
+    parse('Code/"1/2 price"')     ->  ("Code", "1/2 price", False, False)
+    parse("Rp/a\\=b=Joe")           ->  ("Rp", "a=b", "Joe", False)
+
+Whitespace around each part is stripped.  Strings without backslashes or
+quotes (nearly all of them) skip the tokenizer and are split with
+str.partition.  Recent results are kept in an LRU cache; they are tuples, so
+sharing them is safe.
+
+Run this module to time it against the split-based parsers it replaced.
+"""
+import re
+from collections import namedtuple
+from world.utilities.lrucache import LRUCache
+
+__author__ = "Jamie Crosby"
+__copyright__ = "Copyright 2018, The Pegasus Project"
+__credits__ = ["Jamie Crosby",]
+__license__ = "GPLv3"
+__version__ = "0.1"
+__maintainer__ = "Jamie Crosby"
+__email__ = "taladan@gmail.com"
+__status__ = "Prototype"
+
+MuxArgs = namedtuple("MuxArgs", ("lhs_noun", "lhs_verb", "rhs_noun", "rhs_verb"))
+
+# one group per alternative, so match.lastindex says which one matched:
+# 1 escaped character, 2 quoted text, 3 separator, 4 plain run, 5 lone quote or backslash
+TOKENS = re.compile(r'\\(.)|"((?:[^"\\]|\\.)*)"|([=/])|([^\\"=/]+)|(["\\])', re.S)
+UNESCAPE = re.compile(r"\\(.)", re.S)
+
+PARSE_CACHE = LRUCache(maxsize=512)
+
+
+def _partition(string, split_eq):
+    """split a string that has nothing to unescape"""
+    if split_eq:
+        lhs, eq, rhs = string.partition("=")
+    else:
+        lhs, eq, rhs = string, "", ""
+    noun, slash, verb = lhs.partition("/")
+    parts = [noun.strip(), verb.strip() if slash else False, False, False]
+    if eq:
+        noun, slash, verb = rhs.partition("/")
+        parts[2:] = noun.strip(), verb.strip() if slash else False
+    return parts
+
+
+def _join(pieces):
+    """join (text, protected) pieces, stripping whitespace that isn't quoted or escaped"""
+    if pieces and not pieces[0][1]:
+        pieces[0] = (pieces[0][0].lstrip(), False)
+    if pieces and not pieces[-1][1]:
+        pieces[-1] = (pieces[-1][0].rstrip(), False)
+    return "".join(text for text, protected in pieces)
+
+
+def _tokenize(string, split_eq):
+    """split a string with escapes or quotes in it"""
+    parts = ["", False, False, False]
+    slot = 0
+    pieces = []
+    for match in TOKENS.finditer(string):
+        kind = match.lastindex
+        text = match.group(kind)
+        if kind == 3 and (text == "/" and slot in (0, 2) or text == "=" and split_eq and slot < 2):
+            parts[slot] = _join(pieces)
+            slot = slot + 1 if text == "/" else 2
+            pieces = []
+        elif kind == 1:
+            pieces.append((text, True))
+        elif kind == 2:
+            pieces.append((UNESCAPE.sub(r"\1", text), True))
+        else:
+            pieces.append((text, False))
+    parts[slot] = _join(pieces)
+    return parts
+
+
+def _split(string, split_eq):
+    if "\\" in string or '"' in string:
+        return _tokenize(string, split_eq)
+    return _partition(string, split_eq)
+
+
+def parse(string):
+    """split noun/verb=noun/verb
+
+    :param string: command arguments
+    :return: MuxArgs(lhs_noun, lhs_verb, rhs_noun, rhs_verb), False for missing parts
+    """
+    ret = PARSE_CACHE.get(string)
+    if ret is None:
+        ret = PARSE_CACHE.set(string, MuxArgs(*_split(string or "", True)))
+    return ret
+
+
+def parse_side(string):
+    """MuxArgs for a string that is one side only ('=' is not a separator)"""
+    key = ("side", string)
+    ret = PARSE_CACHE.get(key)
+    if ret is None:
+        ret = PARSE_CACHE.set(key, MuxArgs(*_split(string or "", False)))
+    return ret
+
+
+def split_pair(string):
+    """split one side of an '=' at its first '/'
+
+    :param string: noun/verb
+    :return: (noun, verb), verb is False if there was no '/'
+    """
+    return parse_side(string)[:2]
+
+
+def benchmark(number=100000):
+    """time parse() against the split-based parsers it replaced
+
+    :param number: parses per sample string
+    :return: {name: seconds per parse}
+    """
+    from timeit import timeit
+
+    def old_parse_args(string):
+        # StringTools.parse_args as it was; raises on a second '/' or '='
+        def _slash(string):
+            if "/" in string:
+                noun, verb = string.split("/")
+            else:
+                noun, verb = string, False
+            return noun, verb
+        if "=" in string:
+            lhs, rhs = string.split("=")
+            return _slash(lhs) + _slash(rhs)
+        return _slash(string) + (False, False)
+
+    samples = ["Code/Fix the grid=Taladan", "Code", "Rp/Scene tonight=Joe/high",
+               'Code/"1/2 price"=Joe', "Build/Tower \\/ spire"]
+    ret = {}
+    plain = [string for string in samples if "\\" not in string and '"' not in string]
+    ret["old split"] = timeit(lambda: [old_parse_args(s) for s in plain], number=number) / (number * len(plain))
+    ret["parse, cached"] = timeit(lambda: [parse(s) for s in samples], number=number) / (number * len(samples))
+
+    def uncached():
+        for s in samples:
+            _split(s, True)
+    ret["parse, uncached"] = timeit(uncached, number=number) / (number * len(samples))
+    ret["parse, uncached plain"] = timeit(lambda: [_split(s, True) for s in plain],
+                                          number=number) / (number * len(plain))
+    return ret
+
+
+if __name__ == "__main__":
+    for name, seconds in sorted(benchmark().items()):
+        print("%-24s %.3f us" % (name, seconds * 1e6))
@@ -0,0 +1,45 @@
+"""Bulk Attribute loading for Pegasus Project systems
+
+Reading obj.db.<name> for many objects costs an Attribute lookup per object
+per name.  prefetch_attributes() reads the Attributes of a whole list of
+typeclassed objects (Objects, Channels, Scripts, Accounts) in one query per
+database model instead.
+
+"""
+
+__author__ = "Jamie Crosby"
+__copyright__ = "Copyright 2018, The Pegasus Project"
+__credits__ = ["Jamie Crosby",]
+__license__ = "GPLv3"
+__version__ = "0.1"
+__maintainer__ = "Jamie Crosby"
+__email__ = "taladan@gmail.com"
+__status__ = "Prototype"
+
+
+def prefetch_attributes(objs, names=None, category=None):
+    """load Attributes for many objects at once
+
+    :param objs: iterable of typeclassed objects
+    :param names: Attribute keys to load, None for all of them
+    :param category: Attribute category (None is the category obj.db uses)
+    :return: {obj.id: {name: value}} with an entry for every object given
+    """
+    ret = {}
+    models = {}
+    for obj in objs:
+        ret[obj.id] = {}
+        models.setdefault(obj.__dbclass__, []).append(obj.id)
+    for dbclass, ids in models.items():
+        through = dbclass.db_attributes.through
+        owner = dbclass._meta.model_name + "_id"
+        query = {owner + "__in": ids}
+        if names is not None:
+            query["attribute__db_key__in"] = names
+        if category is None:
+            query["attribute__db_category__isnull"] = True
+        else:
+            query["attribute__db_category"] = category
+        for row in through.objects.filter(**query).select_related("attribute"):
+            ret[getattr(row, owner)][row.attribute.db_key] = row.attribute.value
+    return ret
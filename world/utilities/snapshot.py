@@ -0,0 +1,119 @@
+"""Cache snapshots across @reload for Pegasus Project systems
+
+In-memory caches are rebuilt from the database every time the server process
+restarts.  A system can register a cache here with a dump and a load function;
+at_server_reload_stop() calls save() to write every registered cache to one
+snapshot file, and at_server_reload_start() calls restore() to load them back.
+
+The file is a magic line followed by a pickled envelope:
+
+    {"version": SNAPSHOT_VERSION, "checksum": sha256 of body, "body": bytes}
+
+where body is a pickled {name: (cache version, high-water mark, data)}.  A
+cache is only loaded if the file is intact, its format and cache versions
+match and its high-water mark (any cheap value that changes when the data
+behind the cache changes, e.g. max ids and row counts) is the same as now.
+Anything that doesn't match is left to rebuild the normal way.  The file is
+removed once read so a snapshot is never used twice.
+"""
+import hashlib
+import os
+from collections import OrderedDict
+from django.conf import settings as ev_settings
+from evennia.utils import logger as log
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+__author__ = "Jamie Crosby"
+__copyright__ = "Copyright 2018, The Pegasus Project"
+__credits__ = ["Jamie Crosby",]
+__license__ = "GPLv3"
+__version__ = "0.1"
+__maintainer__ = "Jamie Crosby"
+__email__ = "taladan@gmail.com"
+__status__ = "Prototype"
+
+SNAPSHOT_VERSION = 1
+SNAPSHOT_MAGIC = b"PEGASUS-SNAPSHOT\n"
+SNAPSHOT_FILE = os.path.join(ev_settings.GAME_DIR, "server", "cache.snapshot")
+
+REGISTRY = OrderedDict()
+
+
+def register(name, dump, load, high_water=None, version=1):
+    """register a cache to be kept across reloads
+
+    :param name: unique cache name
+    :param dump: callable returning the cache's picklable state
+    :param load: callable taking that state and installing it
+    :param high_water: optional callable returning the cache's high-water mark
+    :param version: bump when the dumped state changes shape
+    """
+    REGISTRY[name] = (dump, load, high_water or (lambda: None), version)
+
+
+def save(path=SNAPSHOT_FILE):
+    """write every registered cache to path
+
+    :return: list of names saved
+    """
+    caches = {}
+    for name, (dump, load, high_water, version) in REGISTRY.items():
+        try:
+            caches[name] = (version, high_water(), dump())
+        except Exception as e:
+            log.log_trace("Snapshot --> could not dump {0}: {1}".format(name, e))
+    body = pickle.dumps(caches, pickle.HIGHEST_PROTOCOL)
+    envelope = {"version": SNAPSHOT_VERSION, "checksum": hashlib.sha256(body).hexdigest(), "body": body}
+    partial = path + ".part"
+    with open(partial, "wb") as f:
+        f.write(SNAPSHOT_MAGIC)
+        pickle.dump(envelope, f, pickle.HIGHEST_PROTOCOL)
+    os.rename(partial, path)
+    return list(caches)
+
+
+def read(path=SNAPSHOT_FILE):
+    """read and verify a snapshot file
+
+    :return: {name: (version, high-water mark, data)}, or None if the file is
+             missing, corrupt or from another snapshot format
+    """
+    try:
+        with open(path, "rb") as f:
+            if f.readline() != SNAPSHOT_MAGIC:
+                return None
+            envelope = pickle.load(f)
+    except (IOError, OSError, EOFError, pickle.UnpicklingError):
+        return None
+    if not isinstance(envelope, dict) or envelope.get("version") != SNAPSHOT_VERSION:
+        return None
+    body = envelope.get("body", b"")
+    if hashlib.sha256(body).hexdigest() != envelope.get("checksum"):
+        return None
+    return pickle.loads(body)
+
+
+def restore(path=SNAPSHOT_FILE):
+    """load every registered cache whose snapshot is still current
+
+    :return: (names loaded, names left to rebuild)
+    """
+    caches = read(path) or {}
+    if os.path.exists(path):
+        os.remove(path)
+    loaded, stale = [], []
+    for name, (dump, load, high_water, version) in REGISTRY.items():
+        saved = caches.get(name)
+        try:
+            if saved is None or saved[0] != version or saved[1] != high_water():
+                stale.append(name)
+                continue
+            load(saved[2])
+            loaded.append(name)
+        except Exception as e:
+            log.log_trace("Snapshot --> could not load {0}: {1}".format(name, e))
+            stale.append(name)
+    return loaded, stale
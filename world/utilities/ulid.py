@@ -0,0 +1,158 @@
+"""Time-ordered unique ids for Pegasus Project systems
+
+new_id() returns a ULID: 26 characters of Crockford base32, the first 10
+encoding the creation time in milliseconds and the last 16 eighty random
+bits.
+
+    01CAT3F2Q6R4M8D0ZNE5W6K1HY
+    |--------||--------------|
+     time      randomness
+
+Ids sort (as plain strings) in the order they were made, so an index on them
+only ever appends, and every id made between two times falls between the
+bounds id_range() returns.  Within one millisecond the random part of the
+previous id is incremented instead of drawn again, so ids from one process
+are strictly increasing.
+
+Ids made by the old md5 pegasus_utilities.hash() are 32 hex digits.
+is_legacy() spots them and from_legacy() turns one into a ULID carrying the
+object's creation time, using bits of the md5 as the random part so the same
+old id always maps to the same new one.
+
+Run this module to time new_id() against the md5 hash it replaced.
+"""
+import binascii
+import calendar
+import os
+import threading
+import time
+from datetime import datetime
+
+__author__ = "Jamie Crosby"
+__copyright__ = "Copyright 2018, The Pegasus Project"
+__credits__ = ["Jamie Crosby",]
+__license__ = "GPLv3"
+__version__ = "0.1"
+__maintainer__ = "Jamie Crosby"
+__email__ = "taladan@gmail.com"
+__status__ = "Prototype"
+
+ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+DECODE = dict((char, value) for value, char in enumerate(ALPHABET))
+PAIRS = [high + low for high in ALPHABET for low in ALPHABET]   # 10 bits -> 2 characters
+TIME_CHARS = 10
+RANDOM_CHARS = 16
+RANDOM_BITS = 80
+RANDOM_MAX = (1 << RANDOM_BITS) - 1
+LEGACY_LENGTH = 32
+HEX_DIGITS = frozenset("0123456789abcdef")
+STRINGS = (str, type(u""))
+
+_lock = threading.Lock()
+_last = [0, 0]   # millisecond and random part of the last id made
+
+
+def _encode(value, length):
+    """base32 encode value in length (an even number of) characters, two at a time"""
+    pairs = []
+    for _ in range(length // 2):
+        pairs.append(PAIRS[value & 1023])
+        value >>= 10
+    pairs.reverse()
+    return "".join(pairs)
+
+
+def _millis(when):
+    """:return: milliseconds since the epoch for a datetime (naive ones are local time)"""
+    if when.tzinfo is not None:
+        seconds = calendar.timegm(when.utctimetuple())
+    else:
+        seconds = time.mktime(when.timetuple())
+    return int(seconds) * 1000 + when.microsecond // 1000
+
+
+def encode(millis, randomness):
+    """:return: ULID for a millisecond timestamp and an 80 bit random part"""
+    return _encode(millis, TIME_CHARS) + _encode(randomness, RANDOM_CHARS)
+
+
+def new_id():
+    """:return: a new ULID, greater than every id this process made before"""
+    millis = int(time.time() * 1000)
+    with _lock:
+        if millis <= _last[0]:
+            # same millisecond (or the clock stepped back): count on from the last id
+            millis = _last[0]
+            randomness = _last[1] + 1
+            if randomness > RANDOM_MAX:
+                millis, randomness = millis + 1, 0
+        else:
+            randomness = int(binascii.hexlify(os.urandom(RANDOM_BITS // 8)), 16)
+        _last[0], _last[1] = millis, randomness
+    return encode(millis, randomness)
+
+
+def is_ulid(string):
+    """:return: True if string looks like a ULID"""
+    return isinstance(string, STRINGS) and len(string) == TIME_CHARS + RANDOM_CHARS and \
+        all(char in DECODE for char in string)
+
+
+def is_legacy(string):
+    """:return: True if string is an md5 id from the old pegasus_utilities.hash()"""
+    return isinstance(string, STRINGS) and len(string) == LEGACY_LENGTH and set(string) <= HEX_DIGITS
+
+
+def id_time(ulid):
+    """:return: local datetime an id was made at"""
+    millis = 0
+    for char in ulid[:TIME_CHARS]:
+        millis = millis * 32 + DECODE[char]
+    return datetime.fromtimestamp(millis / 1000.0)
+
+
+def id_range(start, end=None):
+    """bounds for every id made from start up to (not including) end
+
+    :param start: datetime
+    :param end: datetime, None for no upper bound
+    :return: (low, high) to compare ids with: low <= id < high (high None if end is)
+    """
+    low = encode(_millis(start), 0)
+    high = encode(_millis(end), 0) if end is not None else None
+    return low, high
+
+
+def from_legacy(old, created):
+    """ULID standing in for an md5 id
+
+    :param old: 32 hex digit id
+    :param created: datetime the object was created
+    :return: ULID with created's time and 80 bits of old as its random part
+    """
+    return encode(_millis(created), int(old[:RANDOM_BITS // 4], 16))
+
+
+def benchmark(number=100000):
+    """time new_id() against the md5 hash it replaced
+
+    :return: {name: seconds per id}
+    """
+    from timeit import timeit
+
+    def old_hash(key="test", string="test"):
+        # pegasus_utilities.hash as it was
+        import hashlib
+        import random
+        from datetime import datetime as date
+        hashable = "{0}, {1}, {2}, {3}".format(key, string, date.today().strftime("%B %d, %Y at %H:%M:%S"),
+                                               repr(random.random()))
+        return hashlib.md5(hashable.encode("utf-8")).hexdigest()
+
+    return {"md5 hash": timeit(old_hash, number=number) / number,
+            "new_id": timeit(new_id, number=number) / number}
+
+
+if __name__ == "__main__":
+    for name, seconds in sorted(benchmark().items()):
+        print("%-10s %.3f us" % (name, seconds * 1e6))